@@ -10,7 +10,8 @@ setup(
     author_email="26741980@qq.com",
     python_requires=">=3.11",
     install_requires=[
-        "mcp>=1.0.0",
+        "mcp_server_common>=0.1.0",
+        "mcp>=1.10.0",
         "pydantic>=2.11.3",
         "paramiko>=3.5.1",
         "setuptools>=79.0.0",
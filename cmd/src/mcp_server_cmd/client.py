@@ -10,20 +10,55 @@ import asyncio
 import json
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
+from mcp_server_common.session_pool import McpSessionPool
 
 class CmdMcpClient:
-    def __init__(self, remote_ip: str, port: int = 9202):
+    def __init__(self, remote_ip: str, port: int = 9202, pool_size: int = 4, idle_timeout: float = 300.0):
         self.server_url = f"http://{remote_ip}:{port}/sse"
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.pool: McpSessionPool | None = None
 
-    async def execute_command(self, command: str) -> str:       
+    # 在 async with 中使用时复用常驻连接池，否则每次调用单独建立 SSE 连接
+    async def __aenter__(self) -> "CmdMcpClient":
+        self.pool = McpSessionPool(self.server_url, max_size=self.pool_size, idle_timeout=self.idle_timeout)
+        await self.pool.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pool, self.pool = self.pool, None
+        await pool.close()
+
+    async def _call_tool(self, name: str, arguments: dict, **kwargs):
+        if self.pool is not None:
+            return await self.pool.call_tool(name, arguments, **kwargs)
         async with sse_client(self.server_url) as streams:
             async with ClientSession(*streams) as session:
-                # Test initialization
                 await session.initialize()
-                response = await session.call_tool(name = 'execute_command',  arguments = {'command':command})
-                return response
-        
+                return await session.call_tool(name = name, arguments = arguments, **kwargs)
+
+    async def execute_command(self, command: str) -> str:       
+        return await self._call_tool('execute_command', {'command':command})
+
+    # on_result(result: dict) 在每台主机执行完成时被调用，返回值为全部主机的结果
+    async def execute_ssh_batch(self, hosts: list[str], username: str, command: str, password: str = None,
+                                privateKey: str = None, concurrency: int = 32, timeout: float = 60.0, on_result = None):
+        async def progress_callback(progress, total, message):
+            if on_result is not None and message:
+                on_result(json.loads(message))
+
+        arguments = {'hosts': hosts, 'username': username, 'command': command,
+                     'concurrency': concurrency, 'timeout': timeout}
+        if password is not None:
+            arguments['password'] = password
+        if privateKey is not None:
+            arguments['privateKey'] = privateKey
+        return await self._call_tool('execute_ssh_batch', arguments, progress_callback=progress_callback)
+
+async def _demo():
+    async with CmdMcpClient('127.0.0.1') as client:
+        results = await asyncio.gather(*[client.execute_command(command='pwd') for _ in range(10)])
+        print(results[0])
+
 if __name__ == "__main__":
-    client = CmdMcpClient('127.0.0.1')
-    result = asyncio.run(client.execute_command(command='pwd'))
-    print(result)
+    asyncio.run(_demo())
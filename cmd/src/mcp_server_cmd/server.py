@@ -1,14 +1,25 @@
 import os
+import sys
+import json
+import time
+import asyncio
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from paramiko import SSHClient, AutoAddPolicy
 from typing import List
 from enum import Enum
 from pydantic import BaseModel
 from mcp.server.fastmcp import FastMCP
 import mcp.types as types
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..')
+sys.path.insert(0, parent_dir)
+from mcp_server_common.executor import ToolExecutor, parse_tool_limits
+from mcp_server_cmd.stream_exec import RingBuffer, run_command_streaming
+from mcp_server_cmd.ssh_pool import SSHConnectionPool
+from mcp_server_cmd.shell_session import ShellSessionManager
 
 # 环境设置（如清除代理设置）
 os.environ.pop("http_proxy", None)
@@ -18,7 +29,11 @@ os.environ.pop("https_proxy", None)
 # 工具定义
 class ExecuteCommandArgs(BaseModel):
     command: str
-    newSession: bool = False
+    newSession: bool = False  # 新建一个常驻 shell 会话执行命令，结果中返回会话 id
+    sessionId: str | None = None  # 在已有的常驻 shell 会话中执行，保留 cwd 和环境变量
+    stream: bool = False  # 以 progress 通知的形式实时推送 stdout/stderr
+    timeout: float | None = None  # 超时后结束整个进程组
+    maxOutputBytes: int = 1024 * 1024  # 最终结果中每个输出流最多保留的字节数
 
 class SSHConnectionArgs(BaseModel):
     host: str
@@ -29,24 +44,52 @@ class SSHConnectionArgs(BaseModel):
     command: str
     newSession: bool = False
 
-# 使用 paramiko 处理 SSH 连接
+class SSHBatchHost(BaseModel):
+    host: str
+    port: int | None = None  # 未指定时使用 SSHBatchArgs.port
+
+# 解析 host、host:port、IPv6 的 [addr] 或 [addr]:port；不带方括号的 IPv6 地址整体作为 host
+def parse_host(entry: str, default_port: int) -> tuple[str, int]:
+    if entry.startswith('['):
+        host, sep, rest = entry[1:].partition(']')
+        if not sep or (rest and not (rest.startswith(':') and rest[1:].isdigit())):
+            raise ValueError(f"invalid host '{entry}', expected [address] or [address]:port")
+        return host, int(rest[1:]) if rest else default_port
+    host, sep, port = entry.rpartition(':')
+    if sep and port.isdigit() and ':' not in host:
+        return host, int(port)
+    return entry, default_port
+
+class SSHBatchArgs(BaseModel):
+    hosts: List[str | SSHBatchHost]  # host、host:port、[IPv6]:port 或 {"host", "port"}
+    port: int = 22
+    username: str
+    password: str = None
+    privateKey: str = None
+    command: str
+    newSession: bool = False
+    concurrency: int = 32  # 同时执行的主机数
+    timeout: float = 60.0  # 单台主机的超时时间（秒）
+
+    def host_configs(self) -> List[SSHConnectionArgs]:
+        configs = []
+        shared = self.model_dump(include={'username', 'password', 'privateKey', 'command', 'newSession'}, exclude_none=True)
+        for entry in self.hosts:
+            if isinstance(entry, SSHBatchHost):
+                host, port = entry.host, entry.port or self.port
+            else:
+                host, port = parse_host(entry, self.port)
+            configs.append(SSHConnectionArgs(host=host, port=port, **shared))
+        return configs
+
+# 使用 paramiko 处理 SSH 连接，已认证的连接按主机和凭据缓存复用，newSession 强制使用新连接
 class SSHOperation:
+    pool: SSHConnectionPool = SSHConnectionPool()
+
     @staticmethod
     def execute_ssh_command(config: SSHConnectionArgs) -> str:
         try:
-            client = SSHClient()
-            client.set_missing_host_key_policy(AutoAddPolicy())  # 自动接受未知主机的密钥
-            if config.privateKey:
-                client.load_system_host_keys()
-                client.connect(config.host, port=config.port, username=config.username, key_filename=config.privateKey)
-            else:
-                client.connect(config.host, port=config.port, username=config.username, password=config.password)
-
-            stdin, stdout, stderr = client.exec_command(config.command)
-            output = stdout.read().decode('utf-8')
-            error = stderr.read().decode('utf-8')
-
-            client.close()
+            exit_status, output, error = SSHOperation.pool.execute(config)
 
             if error:
                 return f"Error: {error}"
@@ -54,13 +97,119 @@ class SSHOperation:
         except Exception as e:
             return f"SSH Connection Error: {str(e)}"
 
+    @staticmethod
+    def execute_on_host(config: SSHConnectionArgs, timeout: float | None = None) -> dict:
+        start = time.monotonic()
+        result = {'host': config.host, 'port': config.port}
+        try:
+            exit_status, output, error = SSHOperation.pool.execute(config, timeout)
+            result.update(exit_code=exit_status, stdout=output, stderr=error)
+        except Exception as e:
+            result.update(exit_code=None, error=f"SSH Connection Error: {str(e)}")
+        result['duration'] = round(time.monotonic() - start, 3)
+        return result
+
+    # 在多台主机上并发执行同一命令，每完成一台就通过 progress 通知推送该主机的结果
+    @staticmethod
+    async def execute_batch(args: SSHBatchArgs, ctx=None) -> List[dict]:
+        configs = args.host_configs()
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=max(1, min(args.concurrency, len(configs))), thread_name_prefix="ssh-batch")
+
+        # 结果带上在 hosts 中的下标，同一主机出现多次时各自独立
+        async def run_one(index: int, config: SSHConnectionArgs) -> dict:
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(pool, SSHOperation.execute_on_host, config, args.timeout), args.timeout)
+            except asyncio.TimeoutError:
+                result = {'host': config.host, 'port': config.port, 'exit_code': None,
+                          'error': f"timed out after {args.timeout}s", 'duration': round(time.monotonic() - start, 3)}
+            return {'index': index, **result}
+
+        results = []
+        try:
+            for done in asyncio.as_completed([run_one(i, config) for i, config in enumerate(configs)]):
+                result = await done
+                results.append(result)
+                if ctx is not None:
+                    await ctx.report_progress(progress=len(results), total=len(configs), message=json.dumps(result, ensure_ascii=False))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return sorted(results, key=lambda r: r['index'])
+
+
+# 基于 asyncio 子进程执行命令，stream 为 True 时把输出分块作为 progress 通知推送给客户端
+class StreamingCommand:
+    SESSION_TIMEOUT = 600.0  # 会话模式下未指定 timeout 时的默认超时，避免 shell 卡住后一直占用会话
+
+    # 把输出块转成 progress 通知，stderr 的内容加上前缀区分
+    def progress_reporter(ctx):
+        if ctx is None:
+            return None
+        sent = 0
+
+        async def on_output(stream_name: str, text: str) -> None:
+            nonlocal sent
+            sent += len(text)
+            message = text if stream_name == 'stdout' else f"[stderr] {text}"
+            await ctx.report_progress(progress=sent, message=message)
+        return on_output
+
+    def format_output(stdout: RingBuffer, stderr: RingBuffer) -> str:
+        out, err = stdout.text(), stderr.text()
+        if stdout.dropped:
+            out = f"[... {stdout.dropped} bytes truncated ...]\n{out}"
+        if stderr.dropped:
+            err = f"[... {stderr.dropped} bytes truncated ...]\n{err}"
+        return out or (f"Error: {err}" if err else "")
+
+    async def execute(args: ExecuteCommandArgs, ctx=None) -> str:
+        result = await run_command_streaming(
+            args.command,
+            on_output=StreamingCommand.progress_reporter(ctx),
+            timeout=args.timeout,
+            max_output_bytes=args.maxOutputBytes,
+        )
+        text = StreamingCommand.format_output(result.stdout, result.stderr)
+        if result.timed_out:
+            text += f"\n[timed out after {args.timeout}s, process group killed]"
+        return text
+
+    # 在常驻 shell 会话中执行，超时或 shell 退出时丢弃该会话
+    async def execute_in_session(args: ExecuteCommandArgs, sessions: ShellSessionManager, ctx=None) -> str:
+        session = await sessions.get(args.sessionId, new=args.newSession)
+        timeout = args.timeout or StreamingCommand.SESSION_TIMEOUT
+        try:
+            exit_code, stdout, stderr = await session.run(
+                args.command, timeout=timeout, max_output_bytes=args.maxOutputBytes,
+                on_output=StreamingCommand.progress_reporter(ctx))
+        except asyncio.TimeoutError:
+            await sessions.discard(session)
+            return f"Error: timed out after {timeout}s, shell session {session.session_id} was closed"
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            await sessions.discard(session)
+            return f"Error: shell session {session.session_id} exited"
+        except asyncio.CancelledError:
+            # 客户端取消时命令仍在 shell 中运行，下一次调用会读到它的输出，关闭会话后再抛出
+            await asyncio.shield(sessions.discard(session))
+            raise
+        text = StreamingCommand.format_output(stdout, stderr)
+        return f"{text}\n[session: {session.session_id}, exit code: {exit_code}]"
+
 
 # MCP 服务器设置
 class CommandExecutionServer:
     mcp: FastMCP = FastMCP("cmd-server")
+    executor: ToolExecutor = ToolExecutor()
+    sessions: ShellSessionManager = ShellSessionManager()
 
-    def __init__(self, port: int = 9202):
+    def __init__(self, port: int = 9202, workers: int | None = None, tool_limits: dict = None,
+                 max_sessions: int = 16, session_idle_timeout: float = 900.0):
         self.mcp.settings.port = port
+        CommandExecutionServer.executor.configure(max_workers=workers, tool_limits=tool_limits)
+        CommandExecutionServer.sessions.max_sessions = max_sessions
+        CommandExecutionServer.sessions.idle_timeout = session_idle_timeout
 
     def run(self):
         self.mcp.run('sse')
@@ -77,6 +226,13 @@ class CommandExecutionServer:
                 name="execute_ssh_command",
                 description="Execute a command on a remote server via SSH",
                 inputSchema=SSHConnectionArgs.model_json_schema(),
+            ),
+            types.Tool(
+                name="execute_ssh_batch",
+                description="Execute the same command on many servers via SSH with bounded concurrency. "
+                            "Per-host results (exit code, stdout, stderr, duration) are streamed as progress "
+                            "notifications as each host completes, and returned together as JSON at the end",
+                inputSchema=SSHBatchArgs.model_json_schema(),
             )
         ]
 
@@ -85,20 +241,43 @@ class CommandExecutionServer:
     async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
         if name == "execute_command":
             parsed = ExecuteCommandArgs.model_validate(arguments)
-            result = subprocess.run(parsed.command, shell=True, capture_output=True, text=True)
+            if parsed.newSession or parsed.sessionId:
+                ctx = CommandExecutionServer.mcp.get_context() if parsed.stream else None
+                async with CommandExecutionServer.executor.limit(name):
+                    text = await StreamingCommand.execute_in_session(parsed, CommandExecutionServer.sessions, ctx)
+                return [types.TextContent(type="text", text=text)]
+            if parsed.stream or parsed.timeout:
+                ctx = CommandExecutionServer.mcp.get_context() if parsed.stream else None
+                async with CommandExecutionServer.executor.limit(name):
+                    text = await StreamingCommand.execute(parsed, ctx)
+                return [types.TextContent(type="text", text=text)]
+            result = await CommandExecutionServer.executor.run(
+                name, subprocess.run, parsed.command, shell=True, capture_output=True, text=True)
             return [types.TextContent(type="text", text=result.stdout or f"Error: {result.stderr}")]
         
         if name == "execute_ssh_command":
             parsed = SSHConnectionArgs.model_validate(arguments)
-            result = SSHOperation.execute_ssh_command(parsed)
+            result = await CommandExecutionServer.executor.run(name, SSHOperation.execute_ssh_command, parsed)
             return [types.TextContent(type="text", text=result)]
 
+        if name == "execute_ssh_batch":
+            parsed = SSHBatchArgs.model_validate(arguments)
+            async with CommandExecutionServer.executor.limit(name):
+                results = await SSHOperation.execute_batch(parsed, CommandExecutionServer.mcp.get_context())
+            summary = {
+                'hosts': len(results),
+                'succeeded': sum(1 for r in results if r.get('exit_code') == 0),
+                'failed': sum(1 for r in results if r.get('exit_code') != 0),
+            }
+            return [types.TextContent(type="text", text=json.dumps({'summary': summary, 'results': results}, ensure_ascii=False))]
+
         raise ValueError(f"Unknown tool: {name}")
 
 
 # 运行服务器
-def main(port: int = 9202):
-    server = CommandExecutionServer(port)
+def main(port: int = 9202, workers: int | None = None, tool_limits: dict = None,
+         max_sessions: int = 16, session_idle_timeout: float = 900.0):
+    server = CommandExecutionServer(port, workers, tool_limits, max_sessions, session_idle_timeout)
     server.run()
 
 
@@ -106,5 +285,10 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=9202)
+    parser.add_argument('--workers', type=int, default=None, help='worker threads for blocking tool calls')
+    parser.add_argument('--tool_limits', type=str, nargs='*', default=[], help='per-tool concurrency, e.g. execute_command=4')
+    parser.add_argument('--max_sessions', type=int, default=16, help='maximum number of live shell sessions')
+    parser.add_argument('--session_idle_timeout', type=float, default=900.0, help='seconds before an idle shell session is closed')
     args = parser.parse_args()
-    main(port=args.port)
+    main(port=args.port, workers=args.workers, tool_limits=parse_tool_limits(args.tool_limits),
+         max_sessions=args.max_sessions, session_idle_timeout=args.session_idle_timeout)
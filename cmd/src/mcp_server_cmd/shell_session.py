@@ -0,0 +1,182 @@
+import asyncio
+import codecs
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from mcp_server_cmd.stream_exec import RingBuffer, kill_process_group
+
+
+class ShellSession:
+    """一个常驻的 shell 进程，cwd、环境变量、激活的虚拟环境等在多条命令之间保持.
+
+    命令被写入 shell 的 stdin，执行完后分别向 stdout 和 stderr 打印带随机标记的哨兵行，
+    读到哨兵即认为本条命令结束，stdout 的哨兵行同时带回退出码。
+    """
+
+    def __init__(self, session_id: str, shell: str = '/bin/sh'):
+        self.session_id = session_id
+        self.shell = shell
+        self.proc: asyncio.subprocess.Process | None = None
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    async def start(self) -> None:
+        self.proc = await asyncio.create_subprocess_exec(
+            self.shell,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    async def close(self) -> None:
+        if self.alive:
+            try:
+                self.proc.stdin.close()
+            except Exception:
+                pass
+            await kill_process_group(self.proc, grace=0.5)
+
+    async def _read_until(self, reader: asyncio.StreamReader, marker: bytes, buffer: RingBuffer,
+                          on_output: Callable[[str], Awaitable[None]] | None) -> bytes:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        keep = len(marker) - 1
+        pending = b''
+        while True:
+            data = await reader.read(8192)
+            if not data:
+                raise EOFError(f"shell session {self.session_id} exited")
+            pending += data
+            index = pending.find(marker)
+            if index >= 0:
+                output, rest = pending[:index], pending[index + len(marker):]
+            else:
+                # 只保留可能是哨兵开头的尾部（哨兵以换行开头且只含这一个换行）
+                tail = pending.rfind(b'\n', max(0, len(pending) - keep))
+                if tail < 0 or not marker.startswith(pending[tail:]):
+                    tail = len(pending)
+                output, pending = pending[:tail], pending[tail:]
+            buffer.write(output)
+            if on_output is not None and output:
+                text = decoder.decode(output)
+                if text:
+                    await on_output(text)
+            if index >= 0:
+                # 哨兵行剩余部分（退出码）读到换行为止
+                while b'\n' not in rest:
+                    more = await reader.read(64)
+                    if not more:
+                        raise EOFError(f"shell session {self.session_id} exited")
+                    rest += more
+                return rest.split(b'\n', 1)[0]
+
+    # on_output(stream_name, text) 与 stream_exec.run_command_streaming 的回调一致
+    async def run(self, command: str, timeout: float | None = None, max_output_bytes: int = 1024 * 1024,
+                  on_output: Callable[[str, str], Awaitable[None]] | None = None) -> tuple[int | None, RingBuffer, RingBuffer]:
+        token = f"__MCP_SHELL_END_{uuid.uuid4().hex}__"
+        marker = f"\n{token}".encode()
+        # 命令放在 { } 中执行以保留 cd/export 等效果，stdin 重定向避免命令读走后面的哨兵脚本
+        script = (f"{{\n{command}\n}} </dev/null\n"
+                  f"__mcp_rc=$?\n"
+                  f"printf '\\n{token} %d\\n' \"$__mcp_rc\"\n"
+                  f"printf '\\n{token}\\n' >&2\n")
+        stdout, stderr = RingBuffer(max_output_bytes), RingBuffer(max_output_bytes)
+
+        def forward(stream_name):
+            if on_output is None:
+                return None
+
+            async def callback(text: str) -> None:
+                await on_output(stream_name, text)
+            return callback
+
+        async with self.lock:
+            self.last_used = time.monotonic()
+            self.proc.stdin.write(script.encode('utf-8'))
+            await self.proc.stdin.drain()
+            # gather 放在协程里，超时或取消时由协程取回它的 CancelledError，不留下 "never retrieved" 警告
+            async def read_both():
+                return await asyncio.gather(
+                    self._read_until(self.proc.stdout, marker, stdout, forward('stdout')),
+                    self._read_until(self.proc.stderr, marker, stderr, forward('stderr')),
+                )
+            status, _ = await asyncio.wait_for(read_both(), timeout=timeout)
+            self.last_used = time.monotonic()
+        status = status.strip()
+        return (int(status) if status.lstrip(b'-').isdigit() else None), stdout, stderr
+
+
+class ShellSessionManager:
+    """按 session id 管理常驻 shell，限制同时存活的数量，并回收空闲过久的会话."""
+
+    def __init__(self, max_sessions: int = 16, idle_timeout: float = 900.0, shell: str = '/bin/sh'):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.shell = shell
+        self._sessions: OrderedDict[str, ShellSession] = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._reaper: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, session_id: str | None = None, new: bool = False) -> ShellSession:
+        async with self._lock:
+            if self._reaper is None or self._reaper.done():
+                self._reaper = asyncio.create_task(self._reap_idle())
+            session_id = session_id or uuid.uuid4().hex[:12]
+            session = self._sessions.get(session_id)
+            if session is not None and (new or not session.alive):
+                del self._sessions[session_id]
+                await session.close()
+                session = None
+            if session is None:
+                await self._make_room()
+                session = ShellSession(session_id, self.shell)
+                await session.start()
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            return session
+
+    async def _make_room(self) -> None:
+        # 调用方需持有 self._lock
+        while len(self._sessions) >= self.max_sessions:
+            victim = next((s for s in self._sessions.values() if not s.busy), None)
+            if victim is None:
+                raise RuntimeError(f"too many shell sessions ({self.max_sessions}) are busy")
+            del self._sessions[victim.session_id]
+            await victim.close()
+
+    async def discard(self, session: ShellSession) -> None:
+        async with self._lock:
+            if self._sessions.get(session.session_id) is session:
+                del self._sessions[session.session_id]
+        await session.close()
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 1.0))
+            now = time.monotonic()
+            async with self._lock:
+                idle = [s for s in self._sessions.values()
+                        if not s.busy and (not s.alive or now - s.last_used > self.idle_timeout)]
+                for session in idle:
+                    del self._sessions[session.session_id]
+            for session in idle:
+                await session.close()
+
+    async def close_all(self) -> None:
+        async with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        for session in sessions:
+            await session.close()
@@ -0,0 +1,226 @@
+import hashlib
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from paramiko import AutoAddPolicy, ChannelException, SSHClient, SSHException
+
+# 在复用的连接上打开 channel 遇到这些异常，说明 transport 已失效，丢弃后重新建立连接再试一次
+# ChannelException 也是 SSHException，但它表示 transport 正常、服务端拒绝了这个 channel（如达到 MaxSessions），单独处理
+STALE_ERRORS = (SSHException, EOFError, socket.error)
+
+
+class PooledSSHClient:
+    def __init__(self, key: tuple, client: SSHClient):
+        self.key = key
+        self.client = client
+        self.inflight = 0
+        self.retired = False
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+
+
+class KeyState:
+    # 同一个 key 的建连锁和 channel 配额；users 为正在使用这个 key 的线程数
+    def __init__(self, max_channels: int):
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_channels)
+        self.users = 0
+
+
+class SSHConnectionPool:
+    """按 (host, port, username, 凭据哈希) 缓存已认证的 SSH transport.
+
+    每条命令都在缓存的 transport 上新开一个 channel 执行，省去重复的 TCP 握手和密钥交换。
+    没有命令在执行且空闲超过 idle_timeout 的连接被关闭，复用前检查 transport 是否存活。
+    同一连接上同时打开的 channel 不超过 max_channels（sshd 的 MaxSessions 默认为 10），多出的命令排队；
+    服务端仍拒绝打开 channel 时按指数退避重试，不重建连接。失效的连接先从池中移除，等最后一个使用者归还后才关闭。
+    每个 key 的锁和 channel 配额在没有线程使用、池中也没有它的连接时移除。
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, max_size: int = 64,
+                 health_check_interval: float = 30.0, connect_timeout: float = 10.0, keepalive: int = 30,
+                 max_channels: int = 10, channel_retries: int = 3, channel_retry_delay: float = 0.2):
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+        self.max_channels = max_channels
+        self.channel_retries = channel_retries
+        self.channel_retry_delay = channel_retry_delay
+        self._clients: OrderedDict[tuple, PooledSSHClient] = OrderedDict()
+        self._lock = threading.Lock()
+        self._keys: dict[tuple, KeyState] = {}
+
+    def key(self, config) -> tuple:
+        credential = f"{config.password or ''}\0{config.privateKey or ''}".encode('utf-8')
+        return (config.host, config.port, config.username, hashlib.sha256(credential).hexdigest())
+
+    def connect(self, config) -> SSHClient:
+        client = SSHClient()
+        client.set_missing_host_key_policy(AutoAddPolicy())  # 自动接受未知主机的密钥
+        if config.privateKey:
+            client.load_system_host_keys()
+            client.connect(config.host, port=config.port, username=config.username, key_filename=config.privateKey,
+                           timeout=self.connect_timeout)
+        else:
+            client.connect(config.host, port=config.port, username=config.username, password=config.password,
+                           timeout=self.connect_timeout)
+        client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def _healthy(self, entry: PooledSSHClient) -> bool:
+        transport = entry.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        now = time.monotonic()
+        if now - entry.last_checked > self.health_check_interval:
+            try:
+                transport.send_ignore()
+            except STALE_ERRORS:
+                return False
+            entry.last_checked = now
+        return True
+
+    def _reap(self) -> list[PooledSSHClient]:
+        # 调用方需持有 self._lock
+        now = time.monotonic()
+        idle = [key for key, entry in self._clients.items() if entry.inflight == 0]
+        expired = [key for key in idle if now - self._clients[key].last_used > self.idle_timeout]
+        for key in idle:
+            if len(self._clients) - len(expired) <= self.max_size:
+                break
+            if key not in expired:
+                expired.append(key)
+        closed = [self._clients.pop(key) for key in expired]
+        for key in expired:
+            self._prune(key)
+        return closed
+
+    def _prune(self, key: tuple) -> None:
+        # 调用方需持有 self._lock。没有使用者的 KeyState 不会再被任何线程引用，可以安全移除
+        state = self._keys.get(key)
+        if state is not None and state.users == 0 and key not in self._clients:
+            del self._keys[key]
+
+    def _checkout(self, key: tuple) -> KeyState:
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = KeyState(self.max_channels)
+            state.users += 1
+            return state
+
+    def _checkin(self, key: tuple, state: KeyState) -> None:
+        with self._lock:
+            state.users -= 1
+            self._prune(key)
+
+    def acquire(self, config) -> PooledSSHClient:
+        key = self.key(config)
+        state = self._checkout(key)
+        try:
+            # 同一个 key 只建一条连接，不同主机之间互不阻塞
+            with state.lock:
+                with self._lock:
+                    closed = self._reap()
+                    entry = self._clients.get(key)
+                for stale in closed:
+                    stale.client.close()
+                if entry is None or not self._healthy(entry):
+                    if entry is not None:
+                        self.discard(entry)
+                    entry = PooledSSHClient(key, self.connect(config))
+                with self._lock:
+                    self._clients[key] = entry
+                    self._clients.move_to_end(key)
+                    entry.inflight += 1
+                    entry.last_used = time.monotonic()
+                return entry
+        finally:
+            self._checkin(key, state)
+
+    def release(self, entry: PooledSSHClient) -> None:
+        with self._lock:
+            entry.inflight -= 1
+            entry.last_used = time.monotonic()
+            close = entry.retired and entry.inflight == 0
+        if close:
+            entry.client.close()
+
+    def discard(self, entry: PooledSSHClient) -> None:
+        # 只移除调用方自己的连接：其他线程可能已经在同一个 key 下放入了新连接
+        with self._lock:
+            if self._clients.get(entry.key) is entry:
+                del self._clients[entry.key]
+                self._prune(entry.key)
+            entry.retired = True
+            close = entry.inflight == 0
+        if close:
+            entry.client.close()
+
+    def _open_with_retry(self, entry: PooledSSHClient):
+        # 服务端拒绝打开 channel 时 transport 仍然可用，等一会儿在同一连接上重试
+        for attempt in range(self.channel_retries + 1):
+            try:
+                return self.open_channel(entry.client)
+            except ChannelException:
+                if attempt == self.channel_retries:
+                    raise
+                time.sleep(self.channel_retry_delay * 2 ** attempt)
+
+    def open_channel(self, client: SSHClient):
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            raise SSHException("SSH transport is closed")
+        return transport.open_session()
+
+    def run(self, channel, command: str, timeout: float | None = None) -> tuple[int, str, str]:
+        with channel:
+            channel.settimeout(timeout)
+            channel.exec_command(command)
+            output = channel.makefile('rb').read().decode('utf-8')
+            error = channel.makefile_stderr('rb').read().decode('utf-8')
+            return channel.recv_exit_status(), output, error
+
+    # newSession 为 True 时使用一次性的新连接，不影响池中已有的连接
+    def execute(self, config, timeout: float | None = None) -> tuple[int, str, str]:
+        if config.newSession:
+            client = self.connect(config)
+            try:
+                return self.run(self.open_channel(client), config.command, timeout)
+            finally:
+                client.close()
+        # 只在打开 channel 失败时重连重试，命令一旦开始执行就不再重试
+        key = self.key(config)
+        state = self._checkout(key)
+        try:
+            with state.slots:
+                entry = self.acquire(config)
+                try:
+                    try:
+                        channel = self._open_with_retry(entry)
+                    except ChannelException:
+                        raise
+                    except STALE_ERRORS:
+                        stale, entry = entry, None
+                        self.discard(stale)
+                        self.release(stale)
+                        entry = self.acquire(config)
+                        channel = self._open_with_retry(entry)
+                    return self.run(channel, config.command, timeout)
+                finally:
+                    if entry is not None:
+                        self.release(entry)
+        finally:
+            self._checkin(key, state)
+
+    def close(self) -> None:
+        with self._lock:
+            entries, self._clients = list(self._clients.values()), OrderedDict()
+            for key in list(self._keys):
+                self._prune(key)
+        for entry in entries:
+            entry.client.close()
@@ -0,0 +1,109 @@
+import asyncio
+import codecs
+import os
+import signal
+from collections import deque
+from typing import Awaitable, Callable
+
+
+class RingBuffer:
+    """只保留最后 max_bytes 字节的输出，前面被丢弃的字节数记录在 dropped 中."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._chunks: deque[bytes] = deque()
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        if len(data) >= self.max_bytes:
+            self.dropped += self._size + len(data) - self.max_bytes
+            self._chunks.clear()
+            self._chunks.append(data[len(data) - self.max_bytes:])
+            self._size = self.max_bytes
+            return
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            head = self._chunks[0]
+            overflow = self._size - self.max_bytes
+            if len(head) <= overflow:
+                self._chunks.popleft()
+                self._size -= len(head)
+                self.dropped += len(head)
+            else:
+                self._chunks[0] = head[overflow:]
+                self._size -= overflow
+                self.dropped += overflow
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._chunks)
+
+    def text(self) -> str:
+        # 截断点可能落在多字节字符中间，用 replace 容错
+        return self.getvalue().decode('utf-8', errors='replace')
+
+
+class StreamResult:
+    def __init__(self, returncode: int | None, stdout: RingBuffer, stderr: RingBuffer, timed_out: bool):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+
+async def kill_process_group(proc: asyncio.subprocess.Process, grace: float = 2.0) -> None:
+    # 进程以 start_new_session 启动，pid 即进程组号，连同 shell 派生的子进程一起结束
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=grace)
+            return
+        except asyncio.TimeoutError:
+            continue
+
+
+# on_output(stream_name, text) 在每读到一块输出时被调用，stream_name 为 stdout 或 stderr
+async def run_command_streaming(command: str,
+                                on_output: Callable[[str, str], Awaitable[None]] | None = None,
+                                timeout: float | None = None,
+                                max_output_bytes: int = 1024 * 1024,
+                                chunk_size: int = 8192) -> StreamResult:
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    stdout = RingBuffer(max_output_bytes)
+    stderr = RingBuffer(max_output_bytes)
+
+    async def pump(reader: asyncio.StreamReader, buffer: RingBuffer, stream_name: str) -> None:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                break
+            buffer.write(data)
+            if on_output is not None:
+                text = decoder.decode(data)
+                if text:
+                    await on_output(stream_name, text)
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(pump(proc.stdout, stdout, 'stdout'), pump(proc.stderr, stderr, 'stderr'), proc.wait()),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+        await kill_process_group(proc)
+    except asyncio.CancelledError:
+        await kill_process_group(proc)
+        raise
+    return StreamResult(proc.returncode, stdout, stderr, timed_out)
@@ -0,0 +1,124 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from paramiko import SSHException
+
+from mcp_server_cmd.ssh_pool import SSHConnectionPool
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def send_ignore(self):
+        pass
+
+    def open_session(self):
+        if not self.active:
+            raise SSHException("SSH transport is closed")
+        return object()
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+class FakePool(SSHConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.connected = []
+
+    def connect(self, config):
+        client = FakeClient()
+        self.connected.append(client)
+        return client
+
+    def run(self, channel, command, timeout=None):
+        if command == 'sleep':
+            time.sleep(0.05)
+        return 0, command, ''
+
+
+def config(host, command='true'):
+    return SimpleNamespace(host=host, port=22, username='root', password='secret', privateKey=None,
+                           command=command, newSession=False)
+
+
+def test_commands_reuse_one_transport_per_host():
+    pool = FakePool()
+    assert pool.execute(config('a')) == (0, 'true', '')
+    assert pool.execute(config('a')) == (0, 'true', '')
+    pool.execute(config('b'))
+    assert len(pool.connected) == 2
+    assert set(pool._keys) == {pool.key(config('a')), pool.key(config('b'))}
+
+
+def test_key_state_removed_when_transport_expires():
+    pool = FakePool(idle_timeout=0.0)
+    pool.execute(config('a'))
+    time.sleep(0.01)
+    pool.execute(config('b'))
+    assert pool.connected[0].closed
+    assert set(pool._keys) == {pool.key(config('b'))}
+
+
+def test_key_state_removed_when_transport_is_evicted_by_size():
+    pool = FakePool(max_size=2)
+    for host in 'abcde':
+        pool.execute(config(host))
+    # 超出部分在下一次 acquire 前回收，新连接加入后池中最多 max_size + 1 条
+    assert len(pool._clients) == 3
+    assert sum(client.closed for client in pool.connected) == 2
+    assert set(pool._keys) == set(pool._clients)
+
+
+def test_key_state_removed_when_stale_transport_is_discarded():
+    pool = FakePool()
+    pool.execute(config('a'))
+    entry = pool._clients[pool.key(config('a'))]
+    pool.discard(entry)
+    assert pool._keys == {}
+    # 失效的连接被丢弃后重连，新连接的 key 重新登记
+    pool.connected[0].transport.active = True
+    pool.execute(config('a'))
+    assert len(pool.connected) == 2
+    assert set(pool._keys) == {pool.key(config('a'))}
+
+
+def test_close_removes_all_key_state():
+    pool = FakePool()
+    for host in 'abc':
+        pool.execute(config(host))
+    pool.close()
+    assert pool._clients == {}
+    assert pool._keys == {}
+
+
+def test_concurrent_commands_share_key_state_until_done():
+    pool = FakePool(max_channels=2)
+    threads = [threading.Thread(target=pool.execute, args=(config('a', 'sleep'),)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(pool.connected) == 1
+    state = pool._keys[pool.key(config('a'))]
+    assert state.users == 0
+    pool.discard(pool._clients[pool.key(config('a'))])
+    assert pool._keys == {}
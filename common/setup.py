@@ -0,0 +1,25 @@
+from setuptools import setup, find_packages
+
+setup(
+    name="mcp_server_common",
+    version="0.1.0",
+    description="mcp_server_common",
+    long_description=open("README.md").read(),
+    long_description_content_type="text/markdown",
+    author="jieyu",
+    author_email="26741980@qq.com",
+    python_requires=">=3.11",
+    install_requires=[
+        "mcp>=1.10.0",
+        "anyio>=4.5",
+    ],
+    packages=find_packages(where="src"),
+    package_dir={"": "src"},
+    include_package_data=True,  # 确保包数据文件被包含
+    classifiers=[
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
+        "Programming Language :: Python :: 3.13",
+    ],
+)
@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+
+class ToolExecutor:
+    """把工具里的阻塞调用放到线程池（CPU 密集型可选进程池）执行，避免卡住事件循环.
+
+    tool_limits 按工具名限制同时执行的数量，未配置的工具使用 default_limit（None 表示不限制，
+    只受线程池大小约束）。线程池和进程池在第一次使用时才创建。
+    """
+
+    def __init__(self, max_workers: int | None = None, process_workers: int = 0,
+                 default_limit: int | None = None, tool_limits: Dict[str, int] | None = None):
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.configure(max_workers, process_workers, default_limit, tool_limits)
+
+    def configure(self, max_workers: int | None = None, process_workers: int = 0,
+                  default_limit: int | None = None, tool_limits: Dict[str, int] | None = None) -> None:
+        self.shutdown(wait=False)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.process_workers = process_workers
+        self.default_limit = default_limit
+        self.tool_limits = dict(tool_limits or {})
+        self._semaphores = {}
+
+    def _pool(self, cpu_bound: bool) -> Executor:
+        if cpu_bound and self.process_workers > 0:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool-worker")
+        return self._thread_pool
+
+    def limit(self, tool_name: str):
+        """工具的并发限制，也可以直接用在本身就是异步实现的工具上."""
+        limit = self.tool_limits.get(tool_name, self.default_limit)
+        if not limit:
+            return contextlib.nullcontext()
+        if tool_name not in self._semaphores:
+            self._semaphores[tool_name] = asyncio.Semaphore(limit)
+        return self._semaphores[tool_name]
+
+    async def run(self, tool_name: str, func: Callable, *args, cpu_bound: bool = False, **kwargs):
+        async with self.limit(tool_name):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(cpu_bound), functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+
+
+# 解析命令行中的 name=N 形式的并发限制，如 --tool_limits read_multiple_files=4 git_pull=2
+def parse_tool_limits(items: List[str]) -> Dict[str, int]:
+    limits = {}
+    for item in items or []:
+        name, sep, value = item.partition('=')
+        if not sep or not value.isdigit():
+            raise ValueError(f"invalid tool limit '{item}', expected name=N")
+        limits[name] = int(value)
+    return limits
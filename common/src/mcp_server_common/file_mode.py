@@ -0,0 +1,33 @@
+import os
+import threading
+
+_lock = threading.Lock()
+_umask: int | None = None
+
+
+def _read_umask() -> int:
+    # Linux 上从 /proc 读取，不修改进程状态；否则只能先设置再恢复，期间临时使用最严格的 0o077
+    try:
+        with open('/proc/self/status', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    mask = os.umask(0o077)
+    os.umask(mask)
+    return mask
+
+
+def load_umask() -> int:
+    """读取并缓存进程的 umask，服务启动时（其他线程创建文件之前）在 main 中调用一次."""
+    global _umask
+    with _lock:
+        if _umask is None:
+            _umask = _read_umask()
+        return _umask
+
+
+def default_file_mode() -> int:
+    """open 新建文件时的权限（0o666 去掉 umask），用于 mkstemp 创建的只有 0o600 的临时文件."""
+    return 0o666 & ~load_umask()
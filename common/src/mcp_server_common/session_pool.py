@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+import anyio
+from mcp.client.session import ClientSession
+from mcp.client.sse import sse_client
+
+logger = logging.getLogger(__name__)
+
+# 这些异常说明底层 SSE 流已经断开，换一个新连接重试即可
+RECONNECT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+
+
+class PooledConnection:
+    """一条常驻的 SSE 连接及其上已初始化的 ClientSession.
+
+    sse_client / ClientSession 内部使用 anyio task group，进入和退出必须在同一个
+    task 中完成，所以连接的整个生命周期都放在一个后台 task 里，调用方只借用 session。
+    """
+
+    def __init__(self, server_url: str):
+        self.server_url = server_url
+        self.session: ClientSession | None = None
+        self.inflight = 0
+        self.last_used = time.monotonic()
+        self._ready: asyncio.Future | None = None
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def open(self) -> None:
+        self._ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run())
+        await self._ready
+
+    async def _run(self) -> None:
+        try:
+            async with sse_client(self.server_url) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set_result(None)
+                    await self._closing.wait()
+        except asyncio.CancelledError:
+            if not self._ready.done():
+                self._ready.cancel()
+            raise
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.warning(f"mcp connection to {self.server_url} dropped: {e!r}")
+        finally:
+            self.session = None
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+
+
+class McpSessionPool:
+    """同一个 server_url 上的 ClientSession 连接池.
+
+    一个 MCP session 本身支持并发请求，因此借出不是独占的：优先选择在途请求最少的连接，
+    当所有连接都已达到 max_inflight 且连接数未满 max_size 时才新建连接。
+    空闲超过 idle_timeout 的连接会被后台任务回收，流断开的连接会被丢弃并重连。
+    新建连接时只在锁内预留名额，握手在锁外进行，一个慢的握手不会阻塞其他调用借出和归还连接。
+    """
+
+    def __init__(self, server_url: str, max_size: int = 4, max_inflight: int = 16,
+                 idle_timeout: float = 300.0, retries: int = 1):
+        self.server_url = server_url
+        self.max_size = max_size
+        self.max_inflight = max_inflight
+        self.idle_timeout = idle_timeout
+        self.retries = retries
+        self._connections: list[PooledConnection] = []
+        self._lock = asyncio.Lock()
+        self._changed = asyncio.Condition(self._lock)
+        self._opening = 0
+        self._reaper: asyncio.Task | None = None
+        self._closed = False
+
+    async def __aenter__(self) -> "McpSessionPool":
+        self._closed = False
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_idle())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _acquire(self) -> PooledConnection:
+        async with self._changed:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"session pool for {self.server_url} is closed")
+                self._connections = [c for c in self._connections if c.alive]
+                conn = min(self._connections, key=lambda c: c.inflight, default=None)
+                room = len(self._connections) + self._opening < self.max_size
+                if conn is not None and (conn.inflight < self.max_inflight or not room):
+                    conn.inflight += 1
+                    return conn
+                if room:
+                    self._opening += 1
+                    break
+                # 没有可用连接且名额都被正在握手的连接占用，等它们完成
+                await self._changed.wait()
+        conn = PooledConnection(self.server_url)
+        try:
+            await conn.open()
+        except BaseException:
+            async with self._changed:
+                self._opening -= 1
+                self._changed.notify_all()
+            raise
+        async with self._changed:
+            self._opening -= 1
+            self._changed.notify_all()
+            if not self._closed:
+                conn.inflight += 1
+                self._connections.append(conn)
+                return conn
+        await conn.close()
+        raise RuntimeError(f"session pool for {self.server_url} is closed")
+
+    def _release(self, conn: PooledConnection) -> None:
+        conn.inflight -= 1
+        conn.last_used = time.monotonic()
+
+    async def _discard(self, conn: PooledConnection) -> None:
+        async with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        await conn.close()
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], **kwargs):
+        attempt = 0
+        while True:
+            conn = await self._acquire()
+            try:
+                if conn.session is None:
+                    raise ConnectionError(f"mcp connection to {self.server_url} is closed")
+                return await conn.session.call_tool(name=name, arguments=arguments, **kwargs)
+            except RECONNECT_ERRORS as e:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                logger.info(f"reconnecting to {self.server_url} after {e!r}")
+                await self._discard(conn)
+            finally:
+                self._release(conn)
+
+    async def _reap_idle(self) -> None:
+        interval = max(self.idle_timeout / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            async with self._lock:
+                idle = [c for c in self._connections
+                        if c.inflight == 0 and now - c.last_used > self.idle_timeout]
+                self._connections = [c for c in self._connections if c not in idle and c.alive]
+            for conn in idle:
+                await conn.close()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
@@ -0,0 +1,73 @@
+# edit_engine 的性能对比：一次扫描定位 vs 逐个 str.find / 正则交替，直接生成 diff vs difflib，以及原来逐个 replace 的实现
+# 运行：python bench/bench_edit_engine.py（需要先安装 mcp_server_file_system）
+import difflib
+import random
+import re
+import time
+
+from mcp_server_file_system.edit_engine import apply_spans, find_starts, locate_edits, unified_diff
+
+WORDS = ['self', 'return', 'value', 'index', 'def', 'class', 'for', 'in', 'if', 'else', 'None', 'result',
+         'path', 'content', 'data', 'len', 'range', '(', ')', ':', '=', '+', '[', ']', '.']
+
+
+def make_case(size_bytes: int, edit_count: int, anchor_lines: int):
+    # 类似源代码的文本，每个 edit 替换随机位置上连续的 anchor_lines 行
+    lines, total = [], 0
+    while total < size_bytes:
+        line = '    ' * random.randint(0, 3) + ' '.join(random.choices(WORDS, k=random.randint(2, 12)))
+        line += f"  # {len(lines)}\n"
+        lines.append(line)
+        total += len(line)
+    targets = random.sample(range(0, len(lines) - anchor_lines, anchor_lines), edit_count)
+    edits = [{'oldText': ''.join(lines[t:t + anchor_lines]), 'newText': '    ' + lines[t] + 'pass\n'}
+             for t in targets]
+    return ''.join(lines), edits
+
+
+def locate_by_find(content, edits):
+    # 对比：每个 edit 各自用 str.find 扫描原文两次，O(edit 数 × 文件大小)
+    return sorted((find_starts(content, edit['oldText'])[0], edit['oldText']) for edit in edits)
+
+
+def locate_by_regex(content, edits):
+    # 对比：所有 oldText 组成一个正则交替一次扫描，re 对每个位置逐个尝试分支，同样与 edit 数成正比
+    pattern = re.compile('|'.join(re.escape(edit['oldText']) for edit in edits))
+    return [(match.start(), match.group()) for match in pattern.finditer(content)]
+
+
+def old_engine(content, edits):
+    for edit in edits:
+        content = content.replace(edit['oldText'], edit['newText'])
+    return content
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    for anchor_lines in (3, 1):
+        print(f"oldText of {anchor_lines} line(s)")
+        print(f"{'size':>6} {'edits':>6} {'scan':>8} {'find':>8} {'regex':>8} {'join':>8} {'diff':>8} "
+              f"{'old':>8} {'difflib':>8}")
+        for size_mb in (1, 2, 4, 8):
+            for edit_count in (100, 200, 400):
+                content, edits = make_case(size_mb * 1024 * 1024, edit_count, anchor_lines)
+                spans, t_scan = timed(locate_edits, content, edits)
+                _, t_find = timed(locate_by_find, content, edits)
+                _, t_regex = timed(locate_by_regex, content, edits) if size_mb == 1 else (None, float('nan'))
+                new_content, t_join = timed(apply_spans, content, spans)
+                diff, t_diff = timed(unified_diff, content, spans, 'bench.txt')
+                old_content, t_old = timed(old_engine, content, edits)
+                assert old_content == new_content
+                t_difflib = float('nan')
+                if size_mb == 1:
+                    expected, t_difflib = timed(lambda: ''.join(difflib.unified_diff(
+                        content.splitlines(True), new_content.splitlines(True), 'bench.txt', 'bench.txt')))
+                    assert expected == diff
+                print(f"{size_mb:>4}MB {edit_count:>6} {t_scan:8.4f} {t_find:8.4f} {t_regex:8.4f} {t_join:8.4f} "
+                      f"{t_diff:8.4f} {t_old:8.4f} {t_difflib:8.4f}")
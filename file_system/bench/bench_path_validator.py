@@ -0,0 +1,43 @@
+# PathValidator（缓存已解析前缀、逐分量解析）与每次对整个路径调用 os.path.realpath 的对比
+# 运行：python bench/bench_path_validator.py（需要先安装 mcp_server_file_system）
+import os
+import tempfile
+import timeit
+from typing import List
+
+from mcp_server_file_system.path_validator import PathValidator
+
+
+def validate_with_realpath(allowed_directories: List[str], absolute: str) -> str:
+    # 对比：原来的做法，每次调用都对整个路径执行 normpath 和 realpath
+    normalized = os.path.normpath(absolute)
+    if not any(normalized.startswith(dir) for dir in allowed_directories):
+        raise PermissionError(absolute)
+    real_path = os.path.realpath(absolute)
+    if not any(real_path.startswith(dir) for dir in allowed_directories):
+        raise PermissionError(absolute)
+    return real_path
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as root:
+        root = os.path.realpath(root)
+        deep = os.path.join(root, *[f"level{i}" for i in range(12)])
+        os.makedirs(deep)
+        os.symlink(deep, os.path.join(root, 'shortcut'))
+        paths = [os.path.join(deep, f"file{i}.txt") for i in range(200)]
+        for path in paths:
+            open(path, 'w').close()
+        linked = [os.path.join(root, 'shortcut', f"file{i}.txt") for i in range(200)]
+
+        for ttl in (0.0, 2.0):
+            validator = PathValidator([root], ttl=ttl)
+            for name, targets in (('deep', paths), ('via symlink', linked)):
+                assert [validator.validate(path) for path in targets] == [os.path.realpath(path) for path in targets]
+                number = 20
+                old = timeit.timeit(lambda: [validate_with_realpath([root], path) for path in targets], number=number)
+                new = timeit.timeit(lambda: [validator.validate(path) for path in targets], number=number)
+                calls = number * len(targets)
+                print(f"ttl={ttl:<4} {name:<12} realpath {old / calls * 1e6:7.2f} us/call   "
+                      f"PathValidator {new / calls * 1e6:7.2f} us/call")
+        print(validator.stats())
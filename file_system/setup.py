@@ -10,11 +10,15 @@ setup(
     author_email="26741980@qq.com",
     python_requires=">=3.11",
     install_requires=[
+        "mcp_server_common>=0.1.0",
         "mcp>=1.0.0",
         "pydantic>=2.11.3",
         "paramiko>=3.5.1",
         "setuptools>=79.0.0",
     ],
+    extras_require={
+        "watch": ["watchdog>=3.0.0"],  # search_index 的文件变化监听，未安装时轮询
+    },
     packages=find_packages(where="src"),
     package_dir={"": "src"},
     entry_points={
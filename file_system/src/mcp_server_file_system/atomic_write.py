@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict
+
+from mcp_server_common.file_mode import default_file_mode
+
+
+def fsync_directory(directory: str) -> None:
+    # rename 之后同步目录项，保证掉电后新文件名指向新内容
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def create_temp(path: str, tag: str = 'tmp') -> tuple[int, str]:
+    """在目标文件所在目录创建临时文件，权限取自已存在的目标文件，返回 (fd, 临时文件路径)."""
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=f".{tag}", dir=directory)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = default_file_mode()
+    os.fchmod(fd, mode)
+    return fd, temp_path
+
+
+def replace_file(temp_path: str, path: str, fsync: bool = False) -> None:
+    os.replace(temp_path, path)
+    if fsync:
+        fsync_directory(os.path.dirname(path))
+
+
+def atomic_write(path: str, content: str, fsync: bool = False) -> None:
+    """先写入同目录下的临时文件再 rename 到目标路径，写入中途失败时目标文件保持原样."""
+    fd, temp_path = create_temp(path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        replace_file(temp_path, path, fsync)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def append_file(path: str, content: str, fsync: bool = False) -> None:
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(content)
+        file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+
+
+class UploadSession:
+    def __init__(self, session_id: str, path: str, fsync: bool):
+        self.session_id = session_id
+        self.path = path
+        self.fsync = fsync
+        self.fd, self.temp_path = create_temp(path, 'upload')
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+
+    def info(self) -> Dict:
+        return {'sessionId': self.session_id, 'path': self.path, 'size': self.size}
+
+    def discard(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadSessions:
+    """分块上传：begin 在目标目录创建临时文件，每个分块直接写入磁盘，commit 时 rename 到目标路径.
+
+    分块带有 offset 时必须等于已接收的字节数，重发或乱序的分块会被拒绝并在错误信息中给出当前偏移，
+    客户端可以据此续传。超过 idle_timeout 秒没有活动的会话被清除。
+    """
+
+    def __init__(self, idle_timeout: float = 3600.0, max_sessions: int = 64):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    def expire(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [session for session in self._sessions.values() if session.last_active < deadline]
+            for session in expired:
+                del self._sessions[session.session_id]
+        for session in expired:
+            with session.lock:
+                session.discard()
+
+    def _get(self, session_id: str) -> UploadSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"Unknown or expired upload session: {session_id}")
+        return session
+
+    def begin(self, path: str, fsync: bool = False) -> UploadSession:
+        self.expire()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError(f"Too many upload sessions in progress (max {self.max_sessions})")
+            session = UploadSession(uuid.uuid4().hex, path, fsync)
+            self._sessions[session.session_id] = session
+        return session
+
+    def append(self, session_id: str, data: str, encoding: str = 'utf-8', offset: int | None = None) -> UploadSession:
+        if encoding == 'base64':
+            chunk = base64.b64decode(data, validate=True)
+        elif encoding == 'utf-8':
+            chunk = data.encode('utf-8')
+        else:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        session = self._get(session_id)
+        with session.lock:
+            if session.fd < 0:
+                raise ValueError(f"Unknown or expired upload session: {session_id}")
+            if offset is not None and offset != session.size:
+                raise ValueError(f"Chunk offset {offset} does not match received size {session.size}")
+            view = memoryview(chunk)
+            while view:
+                written = os.write(session.fd, view)
+                view = view[written:]
+            session.size += len(chunk)
+            session.digest.update(chunk)
+            session.last_active = time.monotonic()
+        return session
+
+    def commit(self, session_id: str, sha256: str | None = None) -> UploadSession:
+        session = self._get(session_id)
+        with session.lock:
+            if session.fd < 0:
+                raise ValueError(f"Unknown or expired upload session: {session_id}")
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            if sha256 is not None and sha256.lower() != session.digest.hexdigest():
+                session.discard()
+                raise ValueError(f"SHA-256 mismatch, upload discarded: expected {sha256}, "
+                                 f"received {session.digest.hexdigest()}")
+            try:
+                if session.fsync:
+                    os.fsync(session.fd)
+                os.close(session.fd)
+                session.fd = -1
+                replace_file(session.temp_path, session.path, session.fsync)
+            except BaseException:
+                session.discard()
+                raise
+        return session
+
+    def abort(self, session_id: str) -> UploadSession:
+        session = self._get(session_id)
+        with session.lock:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            session.discard()
+        return session
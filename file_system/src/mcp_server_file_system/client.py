@@ -7,49 +7,111 @@ os.environ.pop("https_proxy", None)
 
 import aiohttp
 import asyncio
+import base64
+import hashlib
 import json
+from collections import OrderedDict
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
+from mcp_server_common.session_pool import McpSessionPool
 
 class FileSystemMcpClient:
-    def __init__(self, remote_ip: str, port: int = 9200):
+    def __init__(self, remote_ip: str, port: int = 9200, pool_size: int = 4, idle_timeout: float = 300.0,
+                 max_cached_files: int = 256):
         self.server_url = f"http://{remote_ip}:{port}/sse"
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.pool: McpSessionPool | None = None
+        self.max_cached_files = max_cached_files
+        self.read_cache: OrderedDict[str, tuple] = OrderedDict()  # path -> (ETag, 上次的结果)
 
-    # 读文件
-    async def read_file(self, path: str) -> str:  
+    # 在 async with 中使用时复用常驻连接池，否则每次调用单独建立 SSE 连接
+    async def __aenter__(self) -> "FileSystemMcpClient":
+        self.pool = McpSessionPool(self.server_url, max_size=self.pool_size, idle_timeout=self.idle_timeout)
+        await self.pool.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pool, self.pool = self.pool, None
+        await pool.close()
+
+    async def _call_tool(self, name: str, arguments: dict, **kwargs):
+        if self.pool is not None:
+            return await self.pool.call_tool(name, arguments, **kwargs)
         async with sse_client(self.server_url) as streams:
             async with ClientSession(*streams) as session:
-                # Test initialization
                 await session.initialize()
-                response = await session.call_tool(name = 'read_file',  arguments = {'path':path})
-                return response
+                return await session.call_tool(name = name, arguments = arguments, **kwargs)
+
+    # 读文件：带上次的 ETag 重新验证，服务端回复 Not modified 时直接返回本地缓存的结果
+    async def read_file(self, path: str) -> str:  
+        cached = self.read_cache.get(path)
+        arguments = {'path':path, 'returnETag':True}
+        if cached is not None:
+            arguments['ifNoneMatch'] = cached[0]
+        response = await self._call_tool('read_file', arguments)
+        contents = response.content
+        if cached is not None and len(contents) == 1 and contents[0].text == f"Not modified (ETag: {cached[0]})":
+            self.read_cache.move_to_end(path)
+            return cached[1]
+        if len(contents) == 2 and contents[1].text.startswith("ETag: "):
+            response.content = contents[:1]
+            self.read_cache[path] = (contents[1].text[len("ETag: "):], response)
+            self.read_cache.move_to_end(path)
+            while len(self.read_cache) > self.max_cached_files:
+                self.read_cache.popitem(last=False)
+        else:
+            self.read_cache.pop(path, None)
+        return response
     
-    # 写文件
-    async def write_file(self, path: str, content: str) -> str:  
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'write_file',  arguments = {'path':path, 'content':content})
-                return response
+    # 读多个文件，split_results 为 True 时每个文件单独返回
+    async def read_multiple_files(self, paths: list[str], split_results: bool = False) -> str:
+        response = await self._call_tool('read_multiple_files', {'paths':paths, 'splitResults':split_results})
+        return response
+
+    # 写文件，append 为 True 时追加到文件末尾
+    async def write_file(self, path: str, content: str, append: bool = False, fsync: bool = False) -> str:  
+        response = await self._call_tool('write_file', {'path':path, 'content':content, 'append':append, 'fsync':fsync})
+        return response
+
+    async def _call_upload_tool(self, name: str, arguments: dict) -> dict:
+        response = await self._call_tool(name, arguments)
+        text = response.content[0].text
+        if text.startswith("Error: "):
+            raise RuntimeError(text[len("Error: "):])
+        return json.loads(text)
+
+    # 分块上传本地文件，每次只读入一个分块；任何一步失败时放弃上传，远端文件保持原样
+    async def upload_file(self, local_path: str, path: str, chunk_size: int = 1024 * 1024, fsync: bool = False) -> dict:
+        session = await self._call_upload_tool('begin_upload', {'path':path, 'fsync':fsync})
+        session_id = session['sessionId']
+        digest = hashlib.sha256()
+        offset = 0
+        try:
+            with open(local_path, 'rb') as file:
+                while chunk := file.read(chunk_size):
+                    digest.update(chunk)
+                    await self._call_upload_tool('append_upload_chunk', {'sessionId':session_id, 'offset':offset,
+                                                                         'data':base64.b64encode(chunk).decode('ascii'),
+                                                                         'encoding':'base64'})
+                    offset += len(chunk)
+            return await self._call_upload_tool('commit_upload', {'sessionId':session_id, 'sha256':digest.hexdigest()})
+        except BaseException:
+            try:
+                await self._call_tool('abort_upload', {'sessionId':session_id})
+            except Exception:
+                pass
+            raise
                 
     # 创建目录
     async def create_directory(self, path: str) -> str:  
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'create_directory',  arguments = {'path':path})
-                return response
+        response = await self._call_tool('create_directory', {'path':path})
+        return response
                 
     # 创建目录
     async def list_directory(self, path: str) -> str:  
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'list_directory',  arguments = {'path':path})
-                return response
+        response = await self._call_tool('list_directory', {'path':path})
+        return response
         
 if __name__ == "__main__":
     client = FileSystemMcpClient('127.0.0.1')
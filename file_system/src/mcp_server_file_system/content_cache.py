@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Callable
+
+
+class CachedContent:
+    def __init__(self, signature: tuple, content: str):
+        self.signature = signature
+        self.content = content
+        self.size = sys.getsizeof(content)
+
+
+class ContentCache:
+    """按真实路径缓存解码后的文件内容，总大小不超过 max_bytes 的 LRU.
+
+    条目带有 (inode, 大小, mtime_ns) 签名，命中前先 stat 比较签名，文件在服务之外被修改时重新读取；
+    经由服务的写入、编辑和移动直接调用 invalidate。超过 max_entry_bytes 的文件不缓存。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int | None = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, CachedContent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def entry_limit(self) -> int:
+        return self.max_entry_bytes if self.max_entry_bytes is not None else self.max_bytes // 8
+
+    def signature(self, st: os.stat_result) -> tuple:
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _remove(self, path: str) -> None:
+        # 调用方需持有 self._lock
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def get(self, path: str, loader: Callable[[BinaryIO], str], file: BinaryIO | None = None) -> str:
+        """返回 path 的内容，未命中时调用 loader(file) 从以二进制方式打开的文件读取并缓存.
+
+        传入已打开的 file 时以它的 fstat 作为签名，未命中时从文件开头重新读取它。
+        """
+        if self.max_bytes <= 0:
+            if file is not None:
+                file.seek(0)
+                return loader(file)
+            with open(path, 'rb') as file:
+                return loader(file)
+        signature = self.signature(os.fstat(file.fileno()) if file is not None else os.stat(path))
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                self._entries.move_to_end(path)
+                return entry.content
+            self.misses += 1
+        if file is not None:
+            file.seek(0)
+            content = loader(file)
+        else:
+            # 用打开后的 fstat 作为签名，避免 stat 与读取之间文件被替换
+            with open(path, 'rb') as file:
+                signature = self.signature(os.fstat(file.fileno()))
+                content = loader(file)
+        entry = CachedContent(signature, content)
+        with self._lock:
+            self._remove(path)
+            if entry.size <= self.entry_limit:
+                self._entries[path] = entry
+                self.current_bytes += entry.size
+                while self.current_bytes > self.max_bytes:
+                    _, oldest = self._entries.popitem(last=False)
+                    self.current_bytes -= oldest.size
+                    self.evictions += 1
+        return content
+
+    def invalidate(self, path: str) -> None:
+        # path 为目录时（如移动目录）同时清除其下的所有条目
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            stale = [key for key in self._entries if key == path or key.startswith(prefix)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
+
+
+class ETagCache:
+    """按真实路径缓存文件内容的哈希（ETag），与 ContentCache 一样用 stat 签名判断是否需要重新计算."""
+
+    def __init__(self, max_entries: int = 4096, chunk_size: int = 1024 * 1024):
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # 传入已打开的 file 时以它的 fstat 作为签名并从它计算哈希，调用方可以从同一个 file 读取对应的内容
+    def get(self, path: str, file: BinaryIO | None = None) -> str:
+        st = os.fstat(file.fileno()) if file is not None else os.stat(path)
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                return entry[1]
+        if file is not None:
+            file.seek(0)
+            etag = self._hash(file)
+        else:
+            with open(path, 'rb') as file:
+                st = os.fstat(file.fileno())
+                signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+                etag = self._hash(file)
+        with self._lock:
+            self._entries[path] = (signature, etag)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def _hash(self, file: BinaryIO) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        while chunk := file.read(self.chunk_size):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def invalidate(self, path: str) -> None:
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for key in [key for key in self._entries if key == path or key.startswith(prefix)]:
+                del self._entries[key]
@@ -0,0 +1,203 @@
+from typing import Dict, List, Tuple
+
+# (起始偏移, 结束偏移, 替换文本)，偏移都相对原始内容
+Span = Tuple[int, int, str]
+
+TAIL_CHARS = 8
+
+
+def anchor_key(old_text: str) -> Tuple[str | None, str | None, int]:
+    """为 oldText 选择一个按行查找的定位键，返回 (类型, 键, 偏移)，没有合适的键时返回 (None, None, 0).
+
+    'line'：oldText 中最长的完整行（前后都有换行），出现位置上它必然是原文中完整的一行，偏移为该行在 oldText 中的起点；
+    'tail'：没有完整行但含换行时，第一个换行之前的部分必然是原文某一行的结尾，取其最后 TAIL_CHARS 个字符，
+    偏移为第一个换行在 oldText 中的位置。
+    """
+    pieces = old_text.split('\n')
+    key, key_offset, offset = None, 0, len(pieces[0]) + 1
+    for piece in pieces[1:-1]:
+        if piece.strip() and (key is None or len(piece) > len(key)):
+            key, key_offset = piece, offset
+        offset += len(piece) + 1
+    if key is not None:
+        return 'line', key, key_offset
+    if len(pieces) > 1 and len(pieces[0]) >= TAIL_CHARS:
+        return 'tail', pieces[0][-TAIL_CHARS:], len(pieces[0])
+    return None, None, 0
+
+
+def find_starts(content: str, old_text: str, limit: int = 2) -> List[int]:
+    starts, start = [], content.find(old_text)
+    while start >= 0 and len(starts) < limit:
+        starts.append(start)
+        start = content.find(old_text, start + 1)
+    return starts
+
+
+def locate_edits(content: str, edits: List[Dict]) -> List[Span]:
+    """在原始内容中定位每个 edit 的 oldText，返回按位置排序的替换区间.
+
+    能用 anchor_key 选出定位键的 oldText 通过对原文的一次按行扫描找到候选位置，其余的逐个用 str.find 查找。
+    每个 oldText 必须在原文中恰好出现一次，各区间不能重叠；所有 edit 都针对原始内容定位，
+    不会匹配到前一个 edit 新写入的文本。
+    """
+    keys = []
+    for number, edit in enumerate(edits, 1):
+        if not edit['oldText']:
+            raise ValueError(f"Edit {number} has an empty oldText")
+        keys.append(anchor_key(edit['oldText']))
+    # 一次扫描记录候选位置：完整行键记录行首偏移，行尾键记录行尾（换行符）偏移
+    positions = {'line': {}, 'tail': {}}
+    for kind, key, _ in keys:
+        if kind is not None:
+            positions[kind][key] = []
+    lines, tails = positions['line'], positions['tail']
+    if lines or tails:
+        position = 0
+        for line in content.split('\n'):
+            hits = lines.get(line)
+            if hits is not None:
+                hits.append(position)
+            hits = tails.get(line[-TAIL_CHARS:])
+            if hits is not None:
+                hits.append(position + len(line))
+            position += len(line) + 1
+
+    spans = []
+    for number, (edit, (kind, key, key_offset)) in enumerate(zip(edits, keys), 1):
+        old_text = edit['oldText']
+        if kind is None:
+            starts = find_starts(content, old_text)
+        else:
+            starts = []
+            for position in positions[kind][key]:
+                start = position - key_offset
+                if start >= 0 and content.startswith(old_text, start):
+                    starts.append(start)
+                    if len(starts) > 1:
+                        break
+        if not starts:
+            raise ValueError(f"Could not find exact match for edit: {old_text}")
+        if len(starts) > 1:
+            raise ValueError(f"Edit {number} matches more than one location, add surrounding lines to oldText "
+                             f"to make it unique: {old_text}")
+        spans.append((starts[0], starts[0] + len(old_text), edit['newText'], number))
+    spans.sort()
+    for previous, current in zip(spans, spans[1:]):
+        if current[0] < previous[1]:
+            raise ValueError(f"Edits {previous[3]} and {current[3]} overlap")
+    return [(start, end, new_text) for start, end, new_text, _ in spans]
+
+
+def apply_spans(content: str, spans: List[Span]) -> str:
+    parts, position = [], 0
+    for start, end, new_text in spans:
+        parts.append(content[position:start])
+        parts.append(new_text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
+
+
+def _line_end(content: str, position: int) -> int:
+    # position 所在行（含换行符）的结束偏移；position 恰在行首时表示上一行已结束
+    if position > 0 and content[position - 1] == '\n':
+        return position
+    end = content.find('\n', position)
+    return len(content) if end < 0 else end + 1
+
+
+def _diff_lines(prefix: str, text: str) -> List[str]:
+    lines = []
+    for line in text.splitlines(keepends=True):
+        if line.endswith('\n'):
+            lines.append(prefix + line)
+        else:
+            lines.append(prefix + line + '\n\\ No newline at end of file\n')
+    return lines
+
+
+def _hunk_range(start: int, length: int) -> str:
+    # 与 difflib 相同：只有一行时省略长度，没有行时起始行号为前一行
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start + 1 if length else start},{length}"
+
+
+def unified_diff(content: str, spans: List[Span], path: str, context: int = 3) -> str:
+    """根据替换区间直接生成原文与结果之间的 unified diff，只访问改动附近的行."""
+    if not spans:
+        return ''
+    # 落在同一行或相邻行上的区间合并为一个块：(块起始偏移, 块结束偏移, 块的新内容)
+    blocks, i = [], 0
+    while i < len(spans):
+        start, end, new_text = spans[i]
+        block_start = content.rfind('\n', 0, start) + 1
+        pieces = [content[block_start:start], new_text]
+        block_end = _line_end(content, end)
+        i += 1
+        while True:
+            while i < len(spans) and content.rfind('\n', 0, spans[i][0]) + 1 <= block_end:
+                pieces.append(content[end:spans[i][0]])
+                start, end, new_text = spans[i]
+                pieces.append(new_text)
+                block_end = _line_end(content, end)
+                i += 1
+            new_block = ''.join(pieces) + content[end:block_end]
+            # 新内容不以换行结尾时会与下一行连成一行，下一行也属于这个块
+            if not new_block or new_block.endswith('\n') or block_end >= len(content):
+                break
+            block_end = _line_end(content, block_end + 1)
+        blocks.append((block_start, block_end, new_block))
+
+    output = [f"--- {path}\n", f"+++ {path}\n"]
+    hunk, line, position, delta = None, 0, 0, 0
+
+    def close(hunk):
+        # 补上尾部上下文并输出一个 hunk
+        tail_end = hunk['end']
+        for _ in range(context):
+            if tail_end >= len(content):
+                break
+            tail_end = _line_end(content, tail_end + 1)
+        tail = _diff_lines(' ', content[hunk['end']:tail_end])
+        old_len = hunk['old_len'] + len(tail)
+        new_len = hunk['new_len'] + len(tail)
+        output.append(f"@@ -{_hunk_range(hunk['old_start'], old_len)} +{_hunk_range(hunk['new_start'], new_len)} @@\n")
+        output.extend(hunk['lines'])
+        output.extend(tail)
+
+    for block_start, block_end, new_block in blocks:
+        line += content.count('\n', position, block_start)
+        position = block_start
+        if hunk is not None and content.count('\n', hunk['end'], block_start) <= 2 * context:
+            between = _diff_lines(' ', content[hunk['end']:block_start])
+            hunk['lines'].extend(between)
+            hunk['old_len'] += len(between)
+            hunk['new_len'] += len(between)
+        else:
+            if hunk is not None:
+                close(hunk)
+            head_start, head_lines = block_start, 0
+            while head_lines < context and head_start > 0:
+                head_start = content.rfind('\n', 0, head_start - 1) + 1
+                head_lines += 1
+            head = _diff_lines(' ', content[head_start:block_start])
+            hunk = {'old_start': line - head_lines, 'new_start': line - head_lines + delta,
+                    'old_len': len(head), 'new_len': len(head), 'lines': head}
+        old_lines = _diff_lines('-', content[block_start:block_end])
+        new_lines = _diff_lines('+', new_block)
+        hunk['lines'].extend(old_lines + new_lines)
+        hunk['old_len'] += len(old_lines)
+        hunk['new_len'] += len(new_lines)
+        hunk['end'] = block_end
+        delta += len(new_lines) - len(old_lines)
+    close(hunk)
+    return ''.join(output)
+
+
+def apply_edits(content: str, edits: List[Dict], path: str) -> Tuple[str, str]:
+    """返回 (新内容, unified diff)."""
+    spans = locate_edits(content, edits)
+    return apply_spans(content, spans), unified_diff(content, spans, path)
+
@@ -0,0 +1,262 @@
+import os
+import re
+import threading
+import time
+from array import array
+from typing import List
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog 是可选依赖，没有安装时按目录 mtime 轮询
+    FileSystemEventHandler = object
+    Observer = None
+
+
+def trigrams(name: str) -> set[str]:
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+class IndexTables:
+    """索引数据：id -> (完整路径, 小写文件名)，以及小写文件名的三元组倒排表.
+
+    删除的条目只置为 None，倒排表中的失效 id 在查询时跳过，失效过多时整体重建。
+    """
+
+    def __init__(self):
+        self.entries: list[tuple[str, str] | None] = []
+        self.children: dict[str, dict[str, int]] = {}
+        self.dir_mtimes: dict[str, int] = {}
+        self.postings: dict[str, array] = {}
+        self.dead = 0
+
+    @property
+    def live(self) -> int:
+        return len(self.entries) - self.dead
+
+    def add(self, path: str, name: str) -> int:
+        entry_id = len(self.entries)
+        lower = name.lower()
+        self.entries.append((path, lower))
+        for gram in trigrams(lower):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('i')
+            posting.append(entry_id)
+        return entry_id
+
+    def remove(self, entry_id: int) -> None:
+        entry = self.entries[entry_id]
+        if entry is None:
+            return
+        self.entries[entry_id] = None
+        self.dead += 1
+        # 被删除的目录连同其子树一起移除
+        children = self.children.pop(entry[0], None)
+        self.dir_mtimes.pop(entry[0], None)
+        for child_id in (children or {}).values():
+            self.remove(child_id)
+
+    def rescan_dir(self, directory: str) -> None:
+        """与磁盘上的目录内容对比，增加新条目、删除消失的条目，新目录递归建立索引."""
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                mtime = os.stat(current).st_mtime_ns
+                with os.scandir(current) as it:
+                    entries = [(entry.name, entry.path, entry.is_dir(follow_symlinks=False)) for entry in it]
+            except OSError:
+                continue
+            known = self.children.get(current, {})
+            seen = {}
+            for name, path, is_dir in entries:
+                if name in known:
+                    seen[name] = known[name]
+                    continue
+                seen[name] = self.add(path, name)
+                if is_dir:
+                    pending.append(path)
+            for name, entry_id in known.items():
+                if name not in seen:
+                    self.remove(entry_id)
+            self.children[current] = seen
+            self.dir_mtimes[current] = mtime
+
+    def search(self, root: str, pattern: str, exclude_patterns: List[str]) -> List[str]:
+        pattern = pattern.lower()
+        grams = trigrams(pattern)
+        if grams:
+            # 只需校验倒排表最短的那个三元组的候选
+            candidates = min((self.postings.get(gram, array('i')) for gram in grams), key=len)
+            candidates = (self.entries[entry_id] for entry_id in candidates)
+        else:
+            candidates = iter(self.entries)
+        prefix = root.rstrip(os.sep) + os.sep
+        results = []
+        for entry in candidates:
+            if entry is None or pattern not in entry[1] or not entry[0].startswith(prefix):
+                continue
+            if any(re.match(exclude_pattern, entry[0]) for exclude_pattern in exclude_patterns):
+                continue
+            results.append(entry[0])
+        return sorted(results)
+
+
+class ChangeHandler(FileSystemEventHandler):
+    def __init__(self, index: "FileNameIndex"):
+        super().__init__()
+        self.index = index
+
+    def on_any_event(self, event):
+        if event.event_type not in ('created', 'deleted', 'moved'):
+            return
+        self.index.mark_dirty(os.path.dirname(os.fsdecode(event.src_path)))
+        if event.event_type == 'moved':
+            self.index.mark_dirty(os.path.dirname(os.fsdecode(event.dest_path)))
+
+
+class FileNameIndex:
+    """一个允许目录下所有文件和目录名的内存索引，用于 search_files 的大小写不敏感子串查询.
+
+    启动后在后台线程中建立索引，之后用 watchdog（inotify 等）监听变化；没有安装 watchdog 或监听失败时，
+    每隔 poll_interval 秒检查已索引目录的 mtime。索引建好之前查询回退到遍历目录。
+    """
+
+    def __init__(self, root: str, poll_interval: float = 30.0, rebuild_ratio: float = 0.5):
+        self.root = os.path.realpath(root)
+        self.poll_interval = poll_interval
+        self.rebuild_ratio = rebuild_ratio
+        self.tables = IndexTables()
+        self.state = 'pending'
+        self.error = None
+        self.watcher = None
+        self.built_at = None
+        self.build_seconds = None
+        self.last_update = None
+        self._lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def contains(self, path: str) -> bool:
+        return path == self.root or path.startswith(self.root.rstrip(os.sep) + os.sep)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"file-index:{self.root}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def mark_dirty(self, directory: str) -> None:
+        if not self.contains(directory):
+            return
+        with self._dirty_lock:
+            self._dirty.add(directory)
+        self._wakeup.set()
+
+    def _build(self) -> None:
+        start = time.monotonic()
+        tables = IndexTables()
+        tables.rescan_dir(self.root)
+        with self._lock:
+            self.tables = tables
+        self.build_seconds = round(time.monotonic() - start, 3)
+        self.built_at = self.last_update = time.time()
+
+    def _start_watcher(self) -> None:
+        if Observer is None:
+            self.watcher = 'polling'
+            return
+        try:
+            self._observer = Observer()
+            self._observer.schedule(ChangeHandler(self), self.root, recursive=True)
+            self._observer.start()
+            self.watcher = 'watchdog'
+        except Exception:
+            self._observer = None
+            self.watcher = 'polling'
+
+    def _poll(self) -> None:
+        with self._lock:
+            directories = list(self.tables.dir_mtimes.items())
+        for directory, mtime in directories:
+            try:
+                changed = os.stat(directory).st_mtime_ns != mtime
+            except OSError:
+                changed = True
+            if changed:
+                with self._dirty_lock:
+                    self._dirty.add(directory if os.path.isdir(directory) else os.path.dirname(directory))
+
+    def _apply_changes(self) -> None:
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        with self._lock:
+            for directory in sorted(dirty):
+                # 目录本身还没有被索引时（例如刚创建），从最近的已索引祖先开始扫描
+                while directory not in self.tables.children and directory != self.root:
+                    directory = os.path.dirname(directory)
+                self.tables.rescan_dir(directory)
+            needs_rebuild = self.tables.dead > self.rebuild_ratio * max(1, len(self.tables.entries))
+        if needs_rebuild:
+            self._build()
+        self.last_update = time.time()
+
+    def _run(self) -> None:
+        self.state = 'building'
+        self._start_watcher()
+        try:
+            self._build()
+        except Exception as e:
+            self.state, self.error = 'failed', str(e)
+            return
+        self.state = 'ready'
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.poll_interval if self.watcher == 'polling' else None)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            if self.watcher == 'polling' and time.monotonic() >= next_poll:
+                self._poll()
+                next_poll = time.monotonic() + self.poll_interval
+            try:
+                self._apply_changes()
+            except Exception as e:
+                self.error = str(e)
+
+    def search(self, root: str, pattern: str, exclude_patterns: List[str]) -> List[str]:
+        with self._lock:
+            return self.tables.search(root, pattern, exclude_patterns)
+
+    def status(self) -> dict:
+        with self._lock:
+            tables = self.tables
+            return {
+                'root': self.root,
+                'state': self.state,
+                'watcher': self.watcher,
+                'entries': tables.live,
+                'directories': len(tables.children),
+                'trigrams': len(tables.postings),
+                'built_at': self.built_at,
+                'build_seconds': self.build_seconds,
+                'last_update': self.last_update,
+                'seconds_since_update': round(time.time() - self.last_update, 1) if self.last_update else None,
+                'pending_directories': len(self._dirty),
+                'error': self.error,
+            }
@@ -0,0 +1,177 @@
+import os
+import re
+from fnmatch import fnmatch
+from typing import Dict, Iterator, List
+
+SNIFF_BYTES = 8192
+
+
+class IgnoreRule:
+    def __init__(self, regex: re.Pattern, negate: bool, dir_only: bool):
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+
+def translate_ignore_pattern(pattern: str) -> re.Pattern:
+    # gitignore 规则：含有非结尾的 / 时相对 .gitignore 所在目录锚定，否则匹配任意层级的名字
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            parts.append('[' + pattern[i + 1:end].replace('\\', '\\\\').replace('!', '^', 1) + ']')
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile(('^' if anchored else '^(?:.*/)?') + ''.join(parts) + '$')
+
+
+def parse_gitignore(path: str) -> List[IgnoreRule]:
+    """解析一个 .gitignore 文件，只支持常用语法：注释、!取反、结尾 / 表示目录、*、?、**、[...]."""
+    rules = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append(IgnoreRule(translate_ignore_pattern(line), negate, dir_only))
+    return rules
+
+
+def is_ignored(rule_sets: tuple, path: str, is_dir: bool) -> bool:
+    # rule_sets 为 (.gitignore 所在目录, 规则列表) 的序列，从外层到内层，最后匹配的规则生效
+    ignored = False
+    for base, rules in rule_sets:
+        relative = os.path.relpath(path, base).replace(os.sep, '/')
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(relative):
+                ignored = not rule.negate
+    return ignored
+
+
+def iter_files(root: str, exclude_globs: List[str], include_globs: List[str],
+               respect_gitignore: bool = True) -> Iterator[str]:
+    """按名字顺序深度优先遍历 root 下的普通文件，跳过 .git、符号链接、被 .gitignore 或 exclude_globs 排除的路径."""
+    stack = [(root, ())]
+    while stack:
+        directory, rule_sets = stack.pop()
+        if respect_gitignore:
+            rules = parse_gitignore(os.path.join(directory, '.gitignore'))
+            if rules:
+                rule_sets = rule_sets + ((directory, rules),)
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name == '.git' or entry.is_symlink():
+                continue
+            is_dir = entry.is_dir()
+            relative = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            if any(fnmatch(relative, pattern) or fnmatch(entry.name, pattern) for pattern in exclude_globs):
+                continue
+            if rule_sets and is_ignored(rule_sets, entry.path, is_dir):
+                continue
+            if is_dir:
+                subdirs.append((entry.path, rule_sets))
+            elif entry.is_file():
+                if include_globs and not any(fnmatch(relative, pattern) or fnmatch(entry.name, pattern)
+                                             for pattern in include_globs):
+                    continue
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+
+def take(files: Iterator[str], count: int) -> List[str]:
+    return [path for _, path in zip(range(count), files)]
+
+
+def grep_chunk(paths: List[str], pattern: str, flags: int, context: int, max_results: int,
+               max_file_bytes: int) -> Dict:
+    """在一批文件中查找匹配的行，可以在进程池中执行，因此只接收可 pickle 的参数.
+
+    返回 {'matches': [...], 'scanned': n, 'binary': n, 'skipped': n}，匹配数达到 max_results 后立即停止。
+    """
+    regex = re.compile(pattern, flags)
+    result = {'matches': [], 'scanned': 0, 'binary': 0, 'skipped': 0}
+    for path in paths:
+        try:
+            with open(path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size > max_file_bytes:
+                    result['skipped'] += 1
+                    continue
+                data = file.read()
+        except OSError:
+            result['skipped'] += 1
+            continue
+        result['scanned'] += 1
+        if b'\0' in data[:SNIFF_BYTES]:
+            result['binary'] += 1
+            continue
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        for number, line in enumerate(lines):
+            if not regex.search(line):
+                continue
+            result['matches'].append({
+                'path': path,
+                'line': number + 1,
+                'text': line,
+                'before': lines[max(0, number - context):number],
+                'after': lines[number + 1:number + 1 + context],
+            })
+            if len(result['matches']) >= max_results:
+                return result
+    return result
+
+
+def format_matches(matches: List[Dict], context: int = 0) -> str:
+    # 与 grep 的输出一致：匹配行为 path:line:text，上下文行为 path-line-text，有上下文时不相邻的片段之间用 -- 分隔
+    files: Dict[str, Dict[int, tuple]] = {}
+    for match in matches:
+        lines = files.setdefault(match['path'], {})
+        first = match['line'] - len(match['before'])
+        for offset, text in enumerate(match['before']):
+            lines.setdefault(first + offset, (text, False))
+        lines[match['line']] = (match['text'], True)
+        for offset, text in enumerate(match['after']):
+            lines.setdefault(match['line'] + 1 + offset, (text, False))
+    output = []
+    for path, lines in files.items():
+        previous = None
+        for number in sorted(lines):
+            if context and output and (previous is None or number > previous + 1):
+                output.append('--')
+            text, matched = lines[number]
+            sep = ':' if matched else '-'
+            output.append(f"{path}{sep}{number}{sep}{text}")
+            previous = number
+    return '\n'.join(output)
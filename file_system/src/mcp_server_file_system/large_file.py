@@ -0,0 +1,120 @@
+import mmap
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import BinaryIO
+
+BLOCK_SIZE = 256 * 1024
+
+
+class LineIndex:
+    """稀疏行索引：line_starts[i] 为第 i 个块（BLOCK_SIZE 字节）开头之前的换行数.
+
+    索引按需向后扩展，只读文件开头的几行时不会扫描整个文件。
+    """
+
+    def __init__(self, size: int, block_size: int = BLOCK_SIZE):
+        self.size = size
+        self.block_size = block_size
+        self.line_starts = [0]
+        self.lock = threading.Lock()
+
+    @property
+    def scanned(self) -> int:
+        return min(self.size, (len(self.line_starts) - 1) * self.block_size)
+
+    def extend(self, mm: mmap.mmap, line: int) -> None:
+        # 扫描到第 line 行（从 0 开始数的换行数）所在的块为止
+        with self.lock:
+            while self.line_starts[-1] < line and self.scanned < self.size:
+                start = self.scanned
+                end = min(self.size, start + self.block_size)
+                self.line_starts.append(self.line_starts[-1] + mm[start:end].count(b'\n'))
+
+    def locate(self, mm: mmap.mmap, line: int) -> int:
+        """返回第 line 行（从 0 开始）开头的字节偏移，超出文件行数时返回文件大小."""
+        if line <= 0:
+            return 0
+        self.extend(mm, line)
+        block = bisect_right(self.line_starts, line - 1) - 1
+        position = block * self.block_size
+        # 块内还需跳过的换行数
+        for _ in range(line - self.line_starts[block]):
+            found = mm.find(b'\n', position)
+            if found < 0:
+                return self.size
+            position = found + 1
+        return position
+
+
+class LineIndexCache:
+    """按 (设备, inode, mtime_ns, 大小) 缓存 LineIndex，文件被修改后签名变化自然失效."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._indexes: OrderedDict[tuple, LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, st: os.stat_result) -> LineIndex:
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = LineIndex(st.st_size)
+                while len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(key)
+            return index
+
+
+def tail_start(mm: mmap.mmap, size: int, lines: int) -> int:
+    # 从文件末尾向前找 lines 个换行，末尾的换行不算作一行
+    if lines <= 0:
+        return size
+    end = size - 1 if size and mm[size - 1:size] == b'\n' else size
+    position = end
+    for _ in range(lines):
+        found = mm.rfind(b'\n', 0, position)
+        if found < 0:
+            return 0
+        position = found
+    return position + 1
+
+
+def read_range(file_path: str, cache: LineIndexCache, offset: int | None = None, length: int | None = None,
+               start_line: int | None = None, end_line: int | None = None,
+               head: int | None = None, tail: int | None = None, file: BinaryIO | None = None) -> tuple[str, dict]:
+    """通过 mmap 读取文件的一部分，只有被访问的页会被读入内存.
+
+    行号从 1 开始且包含 end_line；length 限制返回的字节数。返回 (文本, 范围信息)。
+    传入已打开的 file 时从它读取，调用方可以从同一个 file 计算与内容对应的 ETag。
+    """
+    if file is None:
+        with open(file_path, 'rb') as file:
+            return read_range(file_path, cache, offset, length, start_line, end_line, head, tail, file)
+    st = os.fstat(file.fileno())
+    size = st.st_size
+    if size == 0:
+        return "", {'start': 0, 'end': 0, 'size': 0}
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        info = {}
+        if head is not None:
+            start, end = 0, cache.get(st).locate(mm, head)
+        elif tail is not None:
+            start, end = tail_start(mm, size, tail), size
+        elif start_line is not None or end_line is not None:
+            index = cache.get(st)
+            first = max(1, start_line or 1)
+            start = index.locate(mm, first - 1)
+            end = index.locate(mm, end_line) if end_line is not None else size
+            info['start_line'] = first
+        else:
+            start = min(max(0, offset or 0), size)
+            end = size
+        if length is not None:
+            end = min(end, start + max(0, length))
+        end = max(start, end)
+        info.update({'start': start, 'end': end, 'size': size})
+        # 范围边界可能落在多字节字符中间，用 replace 容错
+        return mm[start:end].decode('utf-8', errors='replace'), info
@@ -0,0 +1,125 @@
+import errno
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+MAX_SYMLINKS = 40
+
+
+def within(path: str, directories: List[str]) -> bool:
+    # 按路径分量判断包含关系，/data/project 不包含 /data/project2
+    return any(path == dir or path.startswith(dir.rstrip(os.sep) + os.sep) for dir in directories)
+
+
+class PathValidator:
+    """校验请求路径在允许的目录内，并解析符号链接得到真实路径.
+
+    允许目录的真实路径在创建时解析一次；请求路径逐个分量解析，每个已解析前缀（词法路径 -> 真实路径）
+    缓存 ttl 秒，同一目录下的路径只需 lstat 最后几个分量。ttl 为 0 时不缓存。
+    """
+
+    def __init__(self, allowed_directories: List[str], ttl: float = 2.0, max_entries: int = 65536):
+        self.allowed_directories = [os.path.normpath(dir) for dir in allowed_directories]
+        self.real_directories = [os.path.realpath(dir) for dir in self.allowed_directories]
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, path: str, now: float) -> str | None:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is None or entry[0] < now:
+                return None
+            self._cache.move_to_end(path)
+            return entry[1]
+
+    def _store(self, path: str, resolved: str, now: float) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._cache[path] = (now + self.ttl, resolved)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, path: str) -> None:
+        # 移动或删除目录后，清除以它为前缀或解析到它下面的条目
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            stale = [key for key, (_, resolved) in self._cache.items()
+                     if key == path or key.startswith(prefix) or resolved == path or resolved.startswith(prefix)]
+            for key in stale:
+                del self._cache[key]
+
+    def _resolve(self, resolved: str, lexical: str | None, components: List[str], now: float,
+                 hops: int) -> tuple[str, int]:
+        # 从已解析的 resolved 开始依次解析 components；lexical 为对应的词法路径，解析符号链接目标时为 None，不缓存
+        for name in components:
+            if name in ('', '.'):
+                continue
+            if name == '..':
+                resolved, lexical = os.path.dirname(resolved), None
+                continue
+            candidate = os.path.join(resolved, name)
+            try:
+                st = os.lstat(candidate)
+            except OSError:
+                # 不存在的部分原样拼接并继续（之后的 .. 仍会回退），与 os.path.realpath 的非严格模式一致；不缓存
+                resolved, lexical = candidate, None
+                continue
+            if stat.S_ISLNK(st.st_mode):
+                hops += 1
+                if hops > MAX_SYMLINKS:
+                    raise OSError(errno.ELOOP, "Too many levels of symbolic links", candidate)
+                target = os.readlink(candidate)
+                base = os.sep if os.path.isabs(target) else resolved
+                resolved, hops = self._resolve(base, None, target.split(os.sep), now, hops)
+            else:
+                resolved = candidate
+            if lexical is not None:
+                lexical = os.path.join(lexical, name)
+                self._store(lexical, resolved, now)
+        return resolved, hops
+
+    def realpath(self, path: str) -> str:
+        """与 os.path.realpath 相同，path 须为规范化的绝对路径；从最长的缓存前缀开始解析."""
+        now = time.monotonic()
+        prefix, rest = path, []
+        resolved = self._lookup(prefix, now)
+        while resolved is None:
+            parent = os.path.dirname(prefix)
+            if parent == prefix:
+                resolved = prefix
+                break
+            rest.append(os.path.basename(prefix))
+            prefix = parent
+            resolved = self._lookup(prefix, now)
+        if rest:
+            self.misses += 1
+        else:
+            self.hits += 1
+        rest.reverse()
+        return self._resolve(resolved, prefix, rest, now, 0)[0]
+
+    def validate(self, absolute: str) -> str:
+        """absolute 为绝对路径，返回解析符号链接后的真实路径，不在允许的目录内时抛出 PermissionError."""
+        normalized = os.path.normpath(absolute)
+        if not within(normalized, self.allowed_directories):
+            raise PermissionError(f"Access denied - path outside allowed directories: {absolute}")
+        real_path = self.realpath(normalized)
+        if not within(real_path, self.real_directories):
+            raise PermissionError(f"Access denied - symlink target outside allowed directories")
+        return real_path
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
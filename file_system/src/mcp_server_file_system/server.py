@@ -1,19 +1,41 @@
 import os
 import sys
+import stat
+import codecs
+import io
+import asyncio
 import pathlib
 import shutil
-import difflib
 from pathlib import Path
 from glob import glob
+from collections import deque
 import json
 import re
-from typing import List, Dict
-from pydantic import BaseModel
+from typing import BinaryIO, List, Dict
+from pydantic import BaseModel, Field
 
 from mcp.server.fastmcp import FastMCP
 import mcp.types as types
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..')
+sys.path.insert(0, parent_dir)
+from mcp_server_common.executor import ToolExecutor, parse_tool_limits
+from mcp_server_common.file_mode import load_umask
+from mcp_server_file_system.large_file import LineIndexCache, read_range
+from mcp_server_file_system.file_index import FileNameIndex
+from mcp_server_file_system.grep import format_matches, grep_chunk, iter_files, take
+from mcp_server_file_system.content_cache import ContentCache, ETagCache
+from mcp_server_file_system.edit_engine import apply_edits
+from mcp_server_file_system.atomic_write import UploadSessions, append_file, atomic_write
+from mcp_server_file_system.path_validator import PathValidator, within
+
 class FileSystem():
+    line_indexes: LineIndexCache = LineIndexCache()
+    content_cache: ContentCache = ContentCache()
+    etag_cache: ETagCache = ETagCache()
+    uploads: UploadSessions = UploadSessions()
+
     # Utility functions for file operations
     def get_file_stats(file_path: str) -> Dict:
         stats = os.stat(file_path)
@@ -22,27 +44,155 @@ class FileSystem():
             'created': stats.st_ctime,
             'modified': stats.st_mtime,
             'accessed': stats.st_atime,
-            'is_directory': os.path.isdir(file_path),
-            'is_file': os.path.isfile(file_path),
+            'is_directory': stat.S_ISDIR(stats.st_mode),
+            'is_file': stat.S_ISREG(stats.st_mode),
             'permissions': oct(stats.st_mode)[-3:]
         }
 
     def read_file(file_path: str) -> str:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return FileSystem.content_cache.get(file_path, FileSystem.decode_file)
+
+    # 与以文本模式 open 的结果一致（包括换行符转换）
+    def decode_file(file) -> str:
+        wrapper = io.TextIOWrapper(file, encoding='utf-8')
+        try:
+            return wrapper.read()
+        finally:
+            wrapper.detach()
+
+    # 按字节或行范围读取文件的一部分，末尾附上实际读取的范围
+    def read_file_range(file_path: str, offset: int | None = None, length: int | None = None,
+                        start_line: int | None = None, end_line: int | None = None,
+                        head: int | None = None, tail: int | None = None, file: BinaryIO | None = None) -> str:
+        content, info = read_range(file_path, FileSystem.line_indexes, offset, length, start_line, end_line, head, tail, file)
+        return f"{content}\n[bytes {info['start']}-{info['end']} of {info['size']}]"
+
+    # 返回 (内容, ETag)，ETag 与内容取自同一个打开的文件，等于 if_none_match 时内容为 None。
+    # ranged 为 read_file_range 的 (offset, length, start_line, end_line, head, tail)，为 None 时读取整个文件
+    def read_file_with_etag(file_path: str, if_none_match: str | None = None,
+                            ranged: tuple | None = None) -> tuple[str | None, str]:
+        with open(file_path, 'rb') as file:
+            etag = FileSystem.etag_cache.get(file_path, file)
+            if etag == if_none_match:
+                return None, etag
+            if ranged is not None:
+                return FileSystem.read_file_range(file_path, *ranged, file=file), etag
+            return FileSystem.content_cache.get(file_path, FileSystem.decode_file, file), etag
+
+    # 最多读取 max_bytes 字节，返回 (读到的字节, 文件大小)
+    # 返回 (内容, 内容对应的文件字节数, 文件大小, ETag)，ETag 与内容取自同一个打开的文件，等于 if_none_match 时内容为 None。
+    # 不超过 max_bytes 的文件经由 content_cache 读取，与 read_file 的解码一致；更大的文件只解码前 max_bytes 字节
+    def read_file_head(file_path: str, max_bytes: int, with_etag: bool = False,
+                       if_none_match: str | None = None) -> tuple[str | None, int, int, str | None]:
+        with open(file_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            etag = FileSystem.etag_cache.get(file_path, file) if with_etag else None
+            if etag is not None and etag == if_none_match:
+                return None, 0, size, etag
+            if size <= max_bytes:
+                return FileSystem.content_cache.get(file_path, FileSystem.decode_file, file), size, size, etag
+            file.seek(0)
+            data = file.read(max_bytes)
+        # 截断点可能落在多字节字符或 \r\n 中间，增量解码器保留不完整的尾部，不计入读取的字节数
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+        content = decoder.decode(data)
+        pending, flag = decoder.getstate()
+        return content, len(data) - len(pending) - (flag & 1), size, etag
+
+    # 覆盖写先写同目录下的临时文件再 rename，append 直接追加到文件末尾；fsync 为 True 时落盘后才返回
+    def write_file(file_path: str, content: str, append: bool = False, fsync: bool = False) -> None:
+        FileSystem.content_cache.invalidate(file_path)
+        FileSystem.etag_cache.invalidate(file_path)
+        if append:
+            append_file(file_path, content, fsync)
+        else:
+            atomic_write(file_path, content, fsync)
 
-    def write_file(file_path: str, content: str) -> None:
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(content)
+    def commit_upload(session_id: str, sha256: str | None = None) -> Dict:
+        session = FileSystem.uploads.commit(session_id, sha256)
+        FileSystem.content_cache.invalidate(session.path)
+        FileSystem.etag_cache.invalidate(session.path)
+        return session.info()
 
     def create_directory(file_path: str) -> None:
         os.makedirs(file_path, exist_ok=True)
 
-    def list_directory(file_path: str) -> List[str]:
-        return [f"[DIR] {entry}" if os.path.isdir(entry) else f"[FILE] {entry}" 
-                for entry in os.listdir(file_path)]
+    def list_directory(file_path: str) -> List[Dict]:
+        with os.scandir(file_path) as entries:
+            return [{'name': entry.name, 'is_directory': entry.is_dir()} for entry in entries]
+
+    def within(path: str, directories: List[str]) -> bool:
+        return within(path, directories)
+
+    # 广度优先的迭代遍历，复用 DirEntry 的类型信息，不再逐个目录校验路径：
+    # 只有符号链接指向的目录需要确认仍在允许的目录内，并且每个目标只进入一次，避免链接成环
+    def directory_tree(root: str, allowed_directories: List[str], max_depth: int | None = None,
+                       max_entries: int | None = None) -> tuple[List[Dict], bool]:
+        tree = []
+        queue = deque([(root, 1, tree)])
+        visited = {os.path.realpath(root)}
+        count, truncated = 0, False
+        while queue:
+            path, depth, children = queue.popleft()
+            try:
+                with os.scandir(path) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if max_entries is not None and count >= max_entries:
+                    truncated = True
+                    queue.clear()
+                    break
+                count += 1
+                is_dir = entry.is_dir(follow_symlinks=False)
+                node = {'name': entry.name, 'type': 'directory' if is_dir else 'file'}
+                if entry.is_symlink():
+                    target = os.path.realpath(entry.path)
+                    if not FileSystem.within(target, allowed_directories):
+                        node['type'] = 'symlink'
+                    elif os.path.isdir(target):
+                        node['type'] = 'directory'
+                        is_dir = target not in visited
+                        visited.add(target)
+                if node['type'] == 'directory':
+                    node['children'] = []
+                    if is_dir and (max_depth is None or depth < max_depth):
+                        queue.append((entry.path, depth + 1, node['children']))
+                children.append(node)
+        return tree, truncated
+
+    # json 与原来的输出一致（缩进两格，文件也带空的 children）；compact 为无空白的 JSON 且文件没有 children；
+    # paths 为每行一个相对路径，目录以 / 结尾
+    def format_tree(tree: List[Dict], format: str = "json") -> str:
+        if format == "paths":
+            lines, stack = [], [(node, '') for node in reversed(tree)]
+            while stack:
+                node, prefix = stack.pop()
+                path = prefix + node['name']
+                if 'children' in node:
+                    lines.append(path + '/')
+                    stack.extend((child, path + '/') for child in reversed(node['children']))
+                else:
+                    lines.append(path)
+            return "\n".join(lines)
+        if format == "compact":
+            return json.dumps(tree, separators=(',', ':'), ensure_ascii=False)
+        if format != "json":
+            raise ValueError(f"Unknown format: {format}")
+        pending = [tree]
+        while pending:
+            for node in pending.pop():
+                if 'children' in node:
+                    pending.append(node['children'])
+                else:
+                    node['children'] = []
+        return json.dumps(tree, indent=2)
 
     def move_file(source: str, destination: str) -> None:
+        for path in (source, destination):
+            FileSystem.content_cache.invalidate(path)
+            FileSystem.etag_cache.invalidate(path)
         shutil.move(source, destination)
 
     def search_files(root_path: str, pattern: str, exclude_patterns: List[str]) -> List[str]:
@@ -57,37 +207,61 @@ class FileSystem():
                     results.append(full_path)
         return results
 
+    # 所有 edit 都针对原始内容定位，oldText 必须唯一且互不重叠；dry run 与实际写入都返回相对原文的 unified diff
     def apply_file_edits(file_path: str, edits: List[Dict], dry_run: bool = False) -> str:
         content = FileSystem.read_file(file_path)
-
-        for edit in edits:
-            old_text = edit['oldText']
-            new_text = edit['newText']
-            
-            if old_text not in content:
-                raise ValueError(f"Could not find exact match for edit: {old_text}")
-            
-            content = content.replace(old_text, new_text)
-
-        # Generate diff if needed
+        new_content, diff = apply_edits(content, edits, file_path)
         if dry_run:
-            diff = difflib.unified_diff(content.splitlines(), content.splitlines(), fromfile=file_path, tofile=file_path)
-            return '\n'.join(diff)
-        else:
-            FileSystem.write_file(file_path, content)
-            return f"File {file_path} successfully edited."
+            return diff
+        FileSystem.write_file(file_path, new_content)
+        return f"{diff}File {file_path} successfully edited."
     
 
 # 参数模型定义
 class ReadFileArgsSchema(BaseModel):
     path: str
+    offset: int | None = None  # 从该字节偏移开始读
+    length: int | None = None  # 最多返回的字节数
+    startLine: int | None = None  # 行号从 1 开始
+    endLine: int | None = None  # 包含该行
+    head: int | None = None  # 只读前 N 行
+    tail: int | None = None  # 只读最后 N 行
+    ifNoneMatch: str | None = None  # 与当前 ETag 相同时只返回 Not modified
+    returnETag: bool = False  # 在结果后附加一项 "ETag: ..."
+
+    def is_ranged(self) -> bool:
+        return any(value is not None for value in (self.offset, self.length, self.startLine, self.endLine, self.head, self.tail))
 
 class ReadMultipleFilesArgsSchema(BaseModel):
     paths: List[str]
+    maxBytesPerFile: int = 256 * 1024
+    maxTotalBytes: int = 4 * 1024 * 1024  # 按请求顺序分配，超出后的文件只返回截断标记
+    splitResults: bool = False  # 为 True 时每个文件单独返回一个 TextContent
+    ifNoneMatch: Dict[str, str] = {}  # path -> 客户端已有的 ETag
+    returnETag: bool = False
 
 class WriteFileArgsSchema(BaseModel):
     path: str
     content: str
+    append: bool = False  # 追加到文件末尾而不是覆盖
+    fsync: bool = False  # 返回前把数据刷到磁盘
+
+class BeginUploadArgsSchema(BaseModel):
+    path: str
+    fsync: bool = False
+
+class AppendUploadChunkArgsSchema(BaseModel):
+    sessionId: str
+    data: str
+    encoding: str = "utf-8"  # utf-8 或 base64（二进制内容）
+    offset: int | None = None  # 分块在文件中的起始字节偏移，用于发现重发或丢失的分块
+
+class CommitUploadArgsSchema(BaseModel):
+    sessionId: str
+    sha256: str | None = None  # 整个文件的 SHA-256，不一致时丢弃上传
+
+class AbortUploadArgsSchema(BaseModel):
+    sessionId: str
 
 class EditOperation(BaseModel):
     oldText: str
@@ -106,6 +280,9 @@ class ListDirectoryArgsSchema(BaseModel):
 
 class DirectoryTreeArgsSchema(BaseModel):
     path: str
+    maxDepth: int | None = None  # 1 表示只列出直接子项
+    maxEntries: int | None = 10000
+    format: str = "json"  # json、compact 或 paths
 
 class MoveFileArgsSchema(BaseModel):
     source: str
@@ -114,19 +291,60 @@ class MoveFileArgsSchema(BaseModel):
 class SearchFilesArgsSchema(BaseModel):
     path: str
     pattern: str
-    excludePatterns: List[str] = []  # default to an empty list
+    excludePatterns: List[str] = Field([], description="Regular expressions matched with re.match against the full path")
+
+class GrepFilesArgsSchema(BaseModel):
+    path: str
+    pattern: str
+    regex: bool = True  # False 时按普通字符串查找
+    caseSensitive: bool = True
+    contextLines: int = 0
+    maxResults: int = Field(100, gt=0)  # 0 会在扫描任何文件之前就停止
+    # 与 search_files 的 excludePatterns（正则）不同，这里是 glob，因此使用不同的参数名
+    includeGlobs: List[str] = Field([], description="Only search files whose relative path or name matches one of these globs")
+    excludeGlobs: List[str] = Field([], description="Skip files and directories whose relative path or name matches one of these globs")
+    respectGitignore: bool = True
+    maxFileBytes: int = 10 * 1024 * 1024  # 更大的文件跳过
 
 class GetFileInfoArgsSchema(BaseModel):
     path: str
 
+class SearchIndexStatusArgsSchema(BaseModel):
+    pass
+
+class CacheStatsArgsSchema(BaseModel):
+    pass
+
 # Server and request handler (mockup for simplicity)
 class Server:
     mcp: FastMCP = FastMCP("mcp-file-system")
     allowed_directories = None  # List[str] = None
+    path_validator: PathValidator = None
+    executor: ToolExecutor = ToolExecutor()
+    search_indexes: List[FileNameIndex] = []
     
-    def __init__(self, port, allowed_dirs):
+    def __init__(self, port, allowed_dirs, workers: int | None = None, process_workers: int = 0, tool_limits: dict = None,
+                 search_index: bool = False, index_poll_interval: float = 30.0, cache_bytes: int = 64 * 1024 * 1024,
+                 upload_timeout: float = 3600.0, path_cache_ttl: float = 2.0):
         Server.mcp.settings.port = port
+        FileSystem.content_cache.max_bytes = cache_bytes
+        FileSystem.uploads.idle_timeout = upload_timeout
         Server.allowed_directories = [Server.normalize_path(Server.expand_home(dir)) for dir in allowed_dirs]
+        Server.path_validator = PathValidator(Server.allowed_directories, ttl=path_cache_ttl)
+        Server.executor.configure(max_workers=workers, process_workers=process_workers, tool_limits=tool_limits)
+        if search_index:
+            Server.search_indexes = [FileNameIndex(dir, index_poll_interval) for dir in Server.allowed_directories]
+            for index in Server.search_indexes:
+                index.start()
+
+    # 已建好且覆盖 path 的文件名索引，没有时返回 None
+    def find_search_index(path: str) -> FileNameIndex | None:
+        return next((index for index in Server.search_indexes if index.ready and index.contains(path)), None)
+
+    # 服务自身修改了目录内容时通知索引，不必等待监听事件或下一次轮询
+    def notify_changed(path: str) -> None:
+        for index in Server.search_indexes:
+            index.mark_dirty(os.path.dirname(path))
 
     # Normalize paths
     def normalize_path(p: str) -> str:
@@ -142,31 +360,113 @@ class Server:
         self.mcp.run('sse')
 
     # Security utilities
+    # 按路径分量检查是否在允许的目录内，符号链接逐个分量解析并短时间缓存，见 PathValidator
     async def validate_path(requested_path: str) -> str:
         expanded_path = Server.expand_home(requested_path)
         absolute = os.path.abspath(expanded_path)
-        normalized_requested = Server.normalize_path(absolute)
-
-        # Check if path is within allowed directories
-        if not any(normalized_requested.startswith(dir) for dir in Server.allowed_directories):
-            raise PermissionError(f"Access denied - path outside allowed directories: {absolute}")
-
-        # Check if path is a symlink and validate
-        real_path = os.path.realpath(absolute)
-        if not any(real_path.startswith(dir) for dir in Server.allowed_directories):
-            raise PermissionError(f"Access denied - symlink target outside allowed directories")
-        
-        return real_path
+        return Server.path_validator.validate(absolute)
     
+    # 并发读取多个文件，结果保持请求顺序；每个文件最多读 min(maxBytesPerFile, maxTotalBytes) 字节，
+    # 拼装时再按请求顺序扣减总预算。最后一项为读取/返回字节数的统计
+    async def read_multiple_files(name: str, schema: ReadMultipleFilesArgsSchema) -> list[str]:
+        limit = max(0, min(schema.maxBytesPerFile, schema.maxTotalBytes))
+
+        async def read_one(file_path: str):
+            try:
+                valid_path = await Server.validate_path(file_path)
+                return await Server.executor.run(name, FileSystem.read_file_head, valid_path, limit,
+                                                 schema.returnETag or file_path in schema.ifNoneMatch,
+                                                 schema.ifNoneMatch.get(file_path))
+            except Exception as error:
+                return error
+
+        reads = await asyncio.gather(*(read_one(file_path) for file_path in schema.paths))
+        results = []
+        remaining, bytes_read, bytes_returned, truncated_files = schema.maxTotalBytes, 0, 0, 0
+        for file_path, read in zip(schema.paths, reads):
+            if isinstance(read, Exception):
+                results.append(f"{file_path}: Error - {str(read)}")
+                continue
+            content, consumed, size, etag = read
+            header = f"{file_path} (ETag: {etag})" if etag else file_path
+            if content is None:
+                results.append(f"{header}: Not modified")
+                continue
+            bytes_read += consumed
+            truncated = consumed < size
+            data = content.encode('utf-8')
+            if len(data) > remaining:
+                # 总预算按返回文本的 UTF-8 字节扣减，截断点落在多字节字符中间时丢弃不完整的尾部
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                content = decoder.decode(data[:max(0, remaining)])
+                data = data[:max(0, remaining) - len(decoder.getstate()[0])]
+                truncated = True
+            remaining -= len(data)
+            bytes_returned += len(data)
+            if truncated:
+                truncated_files += 1
+                content += f"\n[... truncated, {len(data)} of {size} bytes shown ...]"
+            results.append(f"{header}:\n{content}\n")
+        results.append(f"[{len(schema.paths)} files, {bytes_read} bytes read, {bytes_returned} bytes returned, "
+                       f"{truncated_files} truncated]")
+        return results
+
+    GREP_CHUNK_FILES = 64
+
+    # 边遍历边把文件分批交给 executor（配置了进程池时在进程池中）扫描。批次可能乱序完成，只有从第一个批次起
+    # 连续完成的批次中的匹配数达到 maxResults 后才停止，因此截断的结果总是遍历顺序中的前 maxResults 个匹配
+    async def grep_files(name: str, root: str, schema: GrepFilesArgsSchema) -> str:
+        flags = 0 if schema.caseSensitive else re.IGNORECASE
+        pattern = schema.pattern if schema.regex else re.escape(schema.pattern)
+        re.compile(pattern, flags)  # 无效的正则在扫描前报错
+        files = iter_files(root, schema.excludeGlobs, schema.includeGlobs, schema.respectGitignore)
+        window = max(1, Server.executor.process_workers or Server.executor.max_workers)
+        stats = {'scanned': 0, 'binary': 0, 'skipped': 0}
+        found, pending, sequence, exhausted = {}, {}, 0, False
+        matches, next_sequence = [], 0  # 从第一个批次起连续完成的批次中的匹配
+        try:
+            while True:
+                while not exhausted and len(pending) < window and len(matches) < schema.maxResults:
+                    chunk = await Server.executor.run(name, take, files, Server.GREP_CHUNK_FILES)
+                    if not chunk:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(Server.executor.run(
+                        name, grep_chunk, chunk, pattern, flags, schema.contextLines, schema.maxResults,
+                        schema.maxFileBytes, cpu_bound=True))
+                    pending[task] = sequence
+                    sequence += 1
+                if not pending or len(matches) >= schema.maxResults:
+                    break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    found[pending.pop(task)] = result['matches']
+                    for key in stats:
+                        stats[key] += result[key]
+                while next_sequence in found and len(matches) < schema.maxResults:
+                    matches.extend(found.pop(next_sequence))
+                    next_sequence += 1
+        finally:
+            for task in pending:
+                task.cancel()
+        stopped = len(matches) >= schema.maxResults
+        matches = matches[:schema.maxResults]
+        summary = (f"[{len(matches)} matches in {len({m['path'] for m in matches})} files; "
+                   f"scanned {stats['scanned']} files, skipped {stats['binary']} binary and {stats['skipped']} unreadable or too large"
+                   f"{'; stopped at maxResults' if stopped else ''}]")
+        return (format_matches(matches, schema.contextLines) + "\n" + summary) if matches else "No matches found\n" + summary
+
     @mcp._mcp_server.list_tools()
     async def list_tools() -> list[types.Tool]:
-        return [
+        return [types.Tool(**tool) for tool in [
             {
                 "name": "read_file",
                 "description": "Read the complete contents of a file from the file system. "
                             "Handles various text encodings and provides detailed error messages "
                             "if the file cannot be read. Use this tool when you need to examine "
-                            "the contents of a single file. Only works within allowed directories.",
+                            "the contents of a single file. For large files pass offset/length, "
+                            "startLine/endLine, head or tail to read only part of it. Only works within allowed directories.",
                 "inputSchema": ReadFileArgsSchema.model_json_schema(),
             },
             {
@@ -175,20 +475,49 @@ class Server:
                             "efficient than reading files one by one when you need to analyze "
                             "or compare multiple files. Each file's content is returned with its "
                             "path as a reference. Failed reads for individual files won't stop "
-                            "the entire operation. Only works within allowed directories.",
+                            "the entire operation. Output is limited by maxBytesPerFile and maxTotalBytes, "
+                            "truncated files are marked. Only works within allowed directories.",
                 "inputSchema": ReadMultipleFilesArgsSchema.model_json_schema(),
             },
             {
                 "name": "write_file",
                 "description": "Create a new file or completely overwrite an existing file with new content. "
                             "Use with caution as it will overwrite existing files without warning. "
-                            "Handles text content with proper encoding. Only works within allowed directories.",
+                            "Handles text content with proper encoding. The file is replaced atomically; "
+                            "set append to add to the end instead and fsync to wait until the data is on disk. "
+                            "Only works within allowed directories.",
                 "inputSchema": WriteFileArgsSchema.model_json_schema(),
             },
+            {
+                "name": "begin_upload",
+                "description": "Start a chunked upload for writing a large file. Returns a sessionId for "
+                            "append_upload_chunk and commit_upload. Chunks are written to a temporary file in the "
+                            "target directory, which replaces the target atomically on commit. Only works within allowed directories.",
+                "inputSchema": BeginUploadArgsSchema.model_json_schema(),
+            },
+            {
+                "name": "append_upload_chunk",
+                "description": "Append a chunk (utf-8 text or base64) to an upload session. When offset is given it "
+                            "must equal the number of bytes received so far. Returns the received size.",
+                "inputSchema": AppendUploadChunkArgsSchema.model_json_schema(),
+            },
+            {
+                "name": "commit_upload",
+                "description": "Finish an upload session and move the uploaded file into place. If sha256 is given "
+                            "and does not match, the upload is discarded.",
+                "inputSchema": CommitUploadArgsSchema.model_json_schema(),
+            },
+            {
+                "name": "abort_upload",
+                "description": "Cancel an upload session and delete its temporary file.",
+                "inputSchema": AbortUploadArgsSchema.model_json_schema(),
+            },
             {
                 "name": "edit_file",
                 "description": "Make line-based edits to a text file. Each edit replaces exact line sequences "
-                            "with new content. Returns a git-style diff showing the changes made. "
+                            "with new content. Every oldText is matched against the original file, not against the result of "
+                            "earlier edits, so an edit cannot match text inserted by a previous edit. An oldText that occurs "
+                            "more than once is rejected (add surrounding lines to make it unique); edits must not overlap. Returns a git-style diff showing the changes made (dryRun only previews it). "
                             "Only works within allowed directories.",
                 "inputSchema": EditFileArgsSchema.model_json_schema(),
             },
@@ -213,7 +542,9 @@ class Server:
                 "description": "Get a recursive tree view of files and directories as a JSON structure. "
                             "Each entry includes 'name', 'type' (file/directory), and 'children' for directories. "
                             "Files have no children array, while directories always have a children array (which may be empty). "
-                            "The output is formatted with 2-space indentation for readability. Only works within allowed directories.",
+                            "The output is formatted with 2-space indentation for readability; format 'compact' drops the "
+                            "whitespace and the empty children of files, format 'paths' returns one relative path per line. "
+                            "maxDepth and maxEntries bound the walk. Only works within allowed directories.",
                 "inputSchema": DirectoryTreeArgsSchema.model_json_schema(),
             },
             {
@@ -233,6 +564,14 @@ class Server:
                             "Only searches within allowed directories.",
                 "inputSchema": SearchFilesArgsSchema.model_json_schema(),
             },
+            {
+                "name": "grep_files",
+                "description": "Search file contents under a directory for a regular expression or literal string "
+                            "and return only the matching lines, with optional context lines, in grep format "
+                            "(path:line:text). Binary files, .gitignore'd paths and excludeGlobs are skipped, "
+                            "and the search stops once maxResults matches are found. Only searches within allowed directories.",
+                "inputSchema": GrepFilesArgsSchema.model_json_schema(),
+            },
             {
                 "name": "get_file_info",
                 "description": "Retrieve detailed metadata about a file or directory. Returns comprehensive "
@@ -241,6 +580,19 @@ class Server:
                             "without reading the actual content. Only works within allowed directories.",
                 "inputSchema": GetFileInfoArgsSchema.model_json_schema(),
             },
+            {
+                "name": "search_index_status",
+                "description": "Report the state, size and freshness of the in-memory filename index used by "
+                            "search_files, one entry per allowed directory. The index is only built when the "
+                            "server is started with --search_index.",
+                "inputSchema": SearchIndexStatusArgsSchema.model_json_schema(),
+            },
+            {
+                "name": "file_cache_stats",
+                "description": "Report entries, memory use, hit rate, invalidations and evictions of the server's "
+                            "file content cache.",
+                "inputSchema": CacheStatsArgsSchema.model_json_schema(),
+            },
             {
                 "name": "list_allowed_directories",
                 "description": "Returns the list of directories that this server is allowed to access. "
@@ -251,7 +603,7 @@ class Server:
                     "required": [],
                 },
             },
-        ]
+        ]]
 
 
     @mcp._mcp_server.call_tool()
@@ -262,86 +614,133 @@ class Server:
             # 根据操作类型选择对应的 Schema 和操作
             if name == "read_file":
                 schema = ReadFileArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                content = await FileSystem.read_file(valid_path)
+                valid_path = await Server.validate_path(schema.path)
+                ranged = (schema.offset, schema.length, schema.startLine, schema.endLine,
+                          schema.head, schema.tail) if schema.is_ranged() else None
+                if schema.returnETag or schema.ifNoneMatch:
+                    content, etag = await Server.executor.run(name, FileSystem.read_file_with_etag, valid_path,
+                                                              schema.ifNoneMatch, ranged)
+                    if content is None:
+                        return [types.TextContent(type="text", text=f"Not modified (ETag: {etag})")]
+                elif ranged is not None:
+                    content = await Server.executor.run(name, FileSystem.read_file_range, valid_path, *ranged)
+                else:
+                    content = await Server.executor.run(name, FileSystem.read_file, valid_path)
+                if schema.returnETag:
+                    return [types.TextContent(type="text", text=content), types.TextContent(type="text", text=f"ETag: {etag}")]
                 return [types.TextContent(type="text", text=content)]
 
             elif name == "read_multiple_files":
                 schema = ReadMultipleFilesArgsSchema.model_validate(arguments)
-                results = []
-                for file_path in schema.paths:
-                    try:
-                        valid_path = Server.validate_path(file_path)
-                        content = await FileSystem.read_file(valid_path)
-                        results.append(f"{file_path}:\n{content}\n")
-                    except Exception as error:
-                        results.append(f"{file_path}: Error - {str(error)}")
-                return [types.TextContent(type="text", text="\n---\n".join(results))]
+                results = await Server.read_multiple_files(name, schema)
+                if schema.splitResults:
+                    return [types.TextContent(type="text", text=result) for result in results]
+                return [types.TextContent(type="text", text="\n---\n".join(results[:-1]) + "\n" + results[-1])]
 
             elif name == "write_file":
                 schema = WriteFileArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                await FileSystem.write_file(valid_path, schema.content)
-                return [types.TextContent(type="text", text=f"Successfully wrote to {schema.path}")]
+                valid_path = await Server.validate_path(schema.path)
+                await Server.executor.run(name, FileSystem.write_file, valid_path, schema.content, schema.append, schema.fsync)
+                Server.notify_changed(valid_path)
+                action = "appended to" if schema.append else "wrote to"
+                return [types.TextContent(type="text", text=f"Successfully {action} {schema.path}")]
+
+            elif name == "begin_upload":
+                schema = BeginUploadArgsSchema.model_validate(arguments)
+                valid_path = await Server.validate_path(schema.path)
+                session = await Server.executor.run(name, FileSystem.uploads.begin, valid_path, schema.fsync)
+                return [types.TextContent(type="text", text=json.dumps(session.info()))]
+
+            elif name == "append_upload_chunk":
+                schema = AppendUploadChunkArgsSchema.model_validate(arguments)
+                session = await Server.executor.run(name, FileSystem.uploads.append, schema.sessionId, schema.data,
+                                                    schema.encoding, schema.offset)
+                return [types.TextContent(type="text", text=json.dumps(session.info()))]
+
+            elif name == "commit_upload":
+                schema = CommitUploadArgsSchema.model_validate(arguments)
+                info = await Server.executor.run(name, FileSystem.commit_upload, schema.sessionId, schema.sha256)
+                Server.notify_changed(info['path'])
+                return [types.TextContent(type="text", text=json.dumps(info))]
+
+            elif name == "abort_upload":
+                schema = AbortUploadArgsSchema.model_validate(arguments)
+                session = await Server.executor.run(name, FileSystem.uploads.abort, schema.sessionId)
+                return [types.TextContent(type="text", text=f"Aborted upload to {session.path}")]
 
             elif name == "edit_file":
                 schema = EditFileArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                result = await FileSystem.apply_file_edits(valid_path, schema.edits, schema.dryRun)
+                valid_path = await Server.validate_path(schema.path)
+                result = await Server.executor.run(name, FileSystem.apply_file_edits, valid_path, [edit.model_dump() for edit in schema.edits], schema.dryRun)
                 return [types.TextContent(type="text", text=result)]
 
             elif name == "create_directory":
                 schema = CreateDirectoryArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                await FileSystem.create_directory(valid_path)
+                valid_path = await Server.validate_path(schema.path)
+                await Server.executor.run(name, FileSystem.create_directory, valid_path)
+                Server.notify_changed(valid_path)
                 return [types.TextContent(type="text", text=f"Successfully created directory {schema.path}")]
 
             elif name == "list_directory":
                 schema = ListDirectoryArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                entries = await FileSystem.list_directory(valid_path)
+                valid_path = await Server.validate_path(schema.path)
+                entries = await Server.executor.run(name, FileSystem.list_directory, valid_path)
                 formatted = "\n".join([f"[{'DIR' if entry['is_directory'] else 'FILE'}] {entry['name']}" for entry in entries])
                 return [types.TextContent(type="text", text=formatted)]
 
             elif name == "directory_tree":
                 schema = DirectoryTreeArgsSchema.model_validate(arguments)
-
-                # 构建目录树
-                async def build_tree(current_path: str):
-                    valid_path = Server.validate_path(current_path)
-                    entries = await FileSystem.list_directory(valid_path)
-                    result = []
-                    for entry in entries:
-                        entry_data = {
-                            "name": entry['name'],
-                            "type": 'directory' if entry['is_directory'] else 'file',
-                            "children": await build_tree(f"{current_path}/{entry['name']}") if entry['is_directory'] else []
-                        }
-                        result.append(entry_data)
-                    return result
-
-                tree_data = await build_tree(schema.path)
-                return [types.TextContent(type="text", text=json.dumps(tree_data, indent=2))]
+                valid_path = await Server.validate_path(schema.path)
+                tree_data, truncated = await Server.executor.run(name, FileSystem.directory_tree, valid_path, Server.path_validator.real_directories,
+                                                                 schema.maxDepth, schema.maxEntries)
+                result = [types.TextContent(type="text", text=FileSystem.format_tree(tree_data, schema.format))]
+                if truncated:
+                    result.append(types.TextContent(type="text", text=f"[Truncated after {schema.maxEntries} entries, raise maxEntries or list a subdirectory]"))
+                return result
 
             elif name == "move_file":
                 schema = MoveFileArgsSchema.model_validate(arguments)
-                valid_source_path = Server.validate_path(schema.source)
-                valid_dest_path = Server.validate_path(schema.destination)
-                await FileSystem.move_file(valid_source_path, valid_dest_path)
+                valid_source_path = await Server.validate_path(schema.source)
+                valid_dest_path = await Server.validate_path(schema.destination)
+                await Server.executor.run(name, FileSystem.move_file, valid_source_path, valid_dest_path)
+                Server.path_validator.invalidate(valid_source_path)
+                Server.path_validator.invalidate(valid_dest_path)
+                Server.notify_changed(valid_source_path)
+                Server.notify_changed(valid_dest_path)
                 return [types.TextContent(type="text", text=f"Successfully moved {schema.source} to {schema.destination}")]
 
             elif name == "search_files":
                 schema = SearchFilesArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                results = await FileSystem.search_files(valid_path, schema.pattern, schema.excludePatterns)
+                valid_path = await Server.validate_path(schema.path)
+                index = Server.find_search_index(valid_path)
+                if index is not None:
+                    results = await Server.executor.run(name, index.search, valid_path, schema.pattern, schema.excludePatterns)
+                else:
+                    results = await Server.executor.run(name, FileSystem.search_files, valid_path, schema.pattern, schema.excludePatterns, cpu_bound=True)
                 return [types.TextContent(type="text", text="\n".join(results) if results else "No matches found")]
 
+            elif name == "grep_files":
+                schema = GrepFilesArgsSchema.model_validate(arguments)
+                valid_path = await Server.validate_path(schema.path)
+                result = await Server.grep_files(name, valid_path, schema)
+                return [types.TextContent(type="text", text=result)]
+
             elif name == "get_file_info":
                 schema = GetFileInfoArgsSchema.model_validate(arguments)
-                valid_path = Server.validate_path(schema.path)
-                file_info = await FileSystem.get_file_info(valid_path)
+                valid_path = await Server.validate_path(schema.path)
+                file_info = await Server.executor.run(name, FileSystem.get_file_stats, valid_path)
                 return [types.TextContent(type="text", text="\n".join([f"{key}: {value}" for key, value in file_info.items()]))]
 
+            elif name == "search_index_status":
+                if not Server.search_indexes:
+                    return [types.TextContent(type="text", text="Search index is disabled, start the server with --search_index")]
+                statuses = [index.status() for index in Server.search_indexes]
+                return [types.TextContent(type="text", text=json.dumps(statuses, indent=2))]
+
+            elif name == "file_cache_stats":
+                stats = FileSystem.content_cache.stats()
+                return [types.TextContent(type="text", text="\n".join([f"{key}: {value}" for key, value in stats.items()]))]
+
             elif name == "list_allowed_directories":
                 return [types.TextContent(type="text", text="\n".join(Server.allowed_directories))]
 
@@ -354,7 +753,9 @@ class Server:
 
 
 # 运行服务器
-def main(port: int = 9200, allow_dirs: List[str] = []):
+def main(port: int = 9200, allow_dirs: List[str] = [], workers: int | None = None, process_workers: int = 0, tool_limits: dict = None,
+         search_index: bool = False, index_poll_interval: float = 30.0, cache_bytes: int = 64 * 1024 * 1024,
+         upload_timeout: float = 3600.0, path_cache_ttl: float = 2.0):
 
     # Validate that all directories exist and are accessible
     for dir in allow_dirs:
@@ -365,7 +766,9 @@ def main(port: int = 9200, allow_dirs: List[str] = []):
         except Exception as e:
             print(f"Error accessing directory {dir}: {str(e)}")
             sys.exit(1)
-    server = Server(port, allow_dirs)
+    load_umask()
+    server = Server(port, allow_dirs, workers, process_workers, tool_limits, search_index, index_poll_interval, cache_bytes,
+                    upload_timeout, path_cache_ttl)
     server.run()
 
 if __name__ == "__main__":
@@ -374,7 +777,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=9200)
     parser.add_argument('--allow_dirs', type=str, nargs='+', default=[])
+    parser.add_argument('--workers', type=int, default=None, help='worker threads for file I/O')
+    parser.add_argument('--process_workers', type=int, default=0, help='worker processes for CPU-heavy tools such as search_files and grep_files, 0 to use threads')
+    parser.add_argument('--tool_limits', type=str, nargs='*', default=[], help='per-tool concurrency, e.g. search_files=2')
+    parser.add_argument('--search_index', action='store_true', help='keep an in-memory filename index of the allowed directories for search_files')
+    parser.add_argument('--index_poll_interval', type=float, default=30.0, help='seconds between index refreshes when watchdog is not available')
+    parser.add_argument('--cache_bytes', type=int, default=64 * 1024 * 1024, help='memory for cached file contents, 0 to disable')
+    parser.add_argument('--upload_timeout', type=float, default=3600.0, help='seconds before an idle chunked upload is discarded')
+    parser.add_argument('--path_cache_ttl', type=float, default=2.0, help='seconds to cache resolved path prefixes during path validation, 0 to disable')
     args = parser.parse_args()
 
     # 调用主函数
-    main(port=args.port, allow_dirs=args.allow_dirs)
\ No newline at end of file
+    main(port=args.port, allow_dirs=args.allow_dirs, workers=args.workers, process_workers=args.process_workers,
+         tool_limits=parse_tool_limits(args.tool_limits), search_index=args.search_index,
+         index_poll_interval=args.index_poll_interval, cache_bytes=args.cache_bytes, upload_timeout=args.upload_timeout,
+         path_cache_ttl=args.path_cache_ttl)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import difflib
+import random
+import re
+
+import pytest
+
+from mcp_server_file_system.edit_engine import anchor_key, apply_edits
+
+CONTENT = "def f():\n    a = 1\n    b = 2\n    return a + b\n\ndef g():\n    return 3\n"
+
+
+def expected_diff(old: str, new: str, path: str = 'f.py') -> str:
+    return ''.join(difflib.unified_diff(old.splitlines(True), new.splitlines(True), path, path))
+
+
+def apply_patch(content: str, diff: str) -> str:
+    """按 unified diff 修改 content，同时检查 hunk 头部的行号、行数和上下文."""
+    old_lines, new_lines, position = content.splitlines(True), [], 0
+    diff_lines = diff.splitlines(True)[2:]
+    i = 0
+    while i < len(diff_lines):
+        header = re.fullmatch(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@\n', diff_lines[i])
+        old_start, old_len, new_start, new_len = (int(value) if value is not None else 1 for value in header.groups())
+        old_start -= 1 if old_len else 0
+        new_lines.extend(old_lines[position:old_start])
+        assert new_start - (1 if new_len else 0) == len(new_lines)
+        hunk_old, hunk_new, i = [], [], i + 1
+        while i < len(diff_lines) and not diff_lines[i].startswith('@@'):
+            line = diff_lines[i]
+            if line.startswith('\\'):
+                # 上一行在文件中没有换行符
+                for lines in targets:
+                    lines[-1] = lines[-1][:-1]
+            else:
+                targets = {' ': [hunk_old, hunk_new], '-': [hunk_old], '+': [hunk_new]}[line[0]]
+                for lines in targets:
+                    lines.append(line[1:])
+            i += 1
+        assert (len(hunk_old), len(hunk_new)) == (old_len, new_len)
+        assert old_lines[old_start:old_start + old_len] == hunk_old
+        new_lines.extend(hunk_new)
+        position = old_start + old_len
+    new_lines.extend(old_lines[position:])
+    return ''.join(new_lines)
+
+
+def test_single_edit():
+    new, diff = apply_edits(CONTENT, [{'oldText': '    b = 2\n', 'newText': '    b = 20\n'}], 'f.py')
+    assert new == CONTENT.replace('b = 2', 'b = 20')
+    assert diff == expected_diff(CONTENT, new)
+
+
+def test_edits_are_located_against_the_original():
+    # 第二个 edit 不会匹配第一个 edit 新写入的文本
+    edits = [{'oldText': 'return 3', 'newText': 'return a + b'}, {'oldText': 'a = 1', 'newText': 'a = 10'}]
+    new, _ = apply_edits(CONTENT, edits, 'f.py')
+    assert new == CONTENT.replace('return 3', 'return a + b').replace('a = 1', 'a = 10')
+    with pytest.raises(ValueError, match='Could not find'):
+        apply_edits(CONTENT, [{'oldText': 'return 3', 'newText': 'x = 5'}, {'oldText': 'x = 5', 'newText': 'y'}], 'f.py')
+
+
+def test_ambiguous_old_text_is_rejected():
+    with pytest.raises(ValueError, match='Edit 1 matches more than one location'):
+        apply_edits(CONTENT, [{'oldText': '    return', 'newText': '    yield'}], 'f.py')
+
+
+@pytest.mark.parametrize('edits, message', [
+    ([{'oldText': '', 'newText': 'x'}], 'Edit 1 has an empty oldText'),
+    ([{'oldText': 'missing', 'newText': 'x'}], 'Could not find exact match'),
+    ([{'oldText': 'a = 1\n    b', 'newText': 'x'}, {'oldText': 'b = 2', 'newText': 'y'}], 'Edits 1 and 2 overlap'),
+])
+def test_invalid_edits(edits, message):
+    with pytest.raises(ValueError, match=message):
+        apply_edits(CONTENT, edits, 'f.py')
+
+
+@pytest.mark.parametrize('old_text, kind', [
+    ('    a = 1\n    b = 2\n    return', 'line'),
+    ('def f():\n    a', 'tail'),
+    ('a + b', None),
+])
+def test_anchor_kinds_find_the_same_match(old_text, kind):
+    assert anchor_key(old_text)[0] == kind
+    new, _ = apply_edits(CONTENT, [{'oldText': old_text, 'newText': 'X'}], 'f.py')
+    assert new == CONTENT.replace(old_text, 'X', 1)
+
+
+def test_missing_trailing_newline_is_marked():
+    new, diff = apply_edits("a\nb\nc", [{'oldText': 'c', 'newText': 'c\nd\n'}], 'f.txt')
+    assert new == "a\nb\nc\nd\n"
+    assert diff == ("--- f.txt\n+++ f.txt\n@@ -1,3 +1,4 @@\n a\n b\n-c\n\\ No newline at end of file\n"
+                    "+c\n+d\n")
+
+
+def test_diff_applies_to_the_original_on_random_edits():
+    rng = random.Random(1)
+    for _ in range(200):
+        lines = [f"line {i} {rng.random():.6f}\n" for i in range(rng.randint(1, 60))]
+        content = ''.join(lines)
+        if rng.random() < 0.3:
+            content = content[:-1]
+        count = rng.randint(1, min(5, len(lines)))
+        targets = sorted(rng.sample(range(len(lines)), count))
+        edits = []
+        for target in targets:
+            old_text = lines[target].rstrip('\n') if rng.random() < 0.5 else lines[target]
+            if not content.count(old_text) == 1:
+                continue
+            new_text = rng.choice(['', 'replaced\n', 'a\nb\n', 'no newline', old_text + 'extra\n'])
+            edits.append({'oldText': old_text, 'newText': new_text})
+        if not edits:
+            continue
+        try:
+            new, diff = apply_edits(content, edits, 'f.txt')
+        except ValueError as error:
+            assert 'overlap' in str(error)
+            continue
+        expected = content
+        for edit in edits:
+            expected = expected.replace(edit['oldText'], edit['newText'], 1)
+        assert new == expected
+        assert apply_patch(content, diff) == new
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from mcp_server_common.executor import ToolExecutor
+from mcp_server_file_system import server
+from mcp_server_file_system.grep import format_matches, grep_chunk, iter_files
+from mcp_server_file_system.server import GrepFilesArgsSchema, Server
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        'a.py': 'import os\nprint("needle")\n',
+        'b.txt': 'needle\nhaystack\nneedle\n',
+        'build/out.py': 'needle\n',
+        'src/c.py': 'no match\n',
+        'src/d.py': 'x = "needle"\n',
+        'ignored.log': 'needle\n',
+        'bin.dat': 'needle\0\n',
+        '.gitignore': '*.log\nbuild/\n',
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def relative(root, paths):
+    return [os.path.relpath(path, root) for path in paths]
+
+
+def test_iter_files_is_sorted_and_respects_gitignore(tree):
+    assert relative(tree, iter_files(str(tree), [], [])) == ['.gitignore', 'a.py', 'b.txt', 'bin.dat', 'src/c.py', 'src/d.py']
+    assert 'ignored.log' in relative(tree, iter_files(str(tree), [], [], respect_gitignore=False))
+
+
+def test_iter_files_globs_match_relative_path_or_name(tree):
+    assert relative(tree, iter_files(str(tree), [], ['*.py'])) == ['a.py', 'src/c.py', 'src/d.py']
+    assert relative(tree, iter_files(str(tree), ['src'], ['*.py'])) == ['a.py']
+    assert relative(tree, iter_files(str(tree), ['src/c.py'], ['*.py'])) == ['a.py', 'src/d.py']
+
+
+def test_grep_chunk_skips_binary_and_large_files(tree):
+    paths = [str(tree / name) for name in ('b.txt', 'bin.dat', 'a.py')]
+    result = grep_chunk(paths, 'needle', 0, 1, 100, 24)
+    assert [(os.path.basename(m['path']), m['line']) for m in result['matches']] == [('b.txt', 1), ('b.txt', 3)]
+    assert (result['scanned'], result['binary'], result['skipped']) == (2, 1, 1)
+    assert format_matches(result['matches'], 1).replace(str(tree) + os.sep, '') == \
+        'b.txt:1:needle\nb.txt-2-haystack\nb.txt:3:needle'
+
+
+def test_schema_uses_glob_names():
+    properties = GrepFilesArgsSchema.model_json_schema()['properties']
+    assert 'includeGlobs' in properties and 'excludeGlobs' in properties
+    assert 'excludePatterns' not in properties
+
+
+@pytest.fixture
+def many_files(tmp_path):
+    for i in range(40):
+        (tmp_path / f"f{i:02d}.txt").write_text(f"match {i}\n")
+    return tmp_path
+
+
+def run_grep(root, max_results):
+    schema = GrepFilesArgsSchema(path=str(root), pattern='match', maxResults=max_results)
+    return asyncio.run(Server.grep_files('grep_files', str(root), schema))
+
+
+def test_truncated_results_are_the_first_matches_in_traversal_order(many_files, monkeypatch):
+    # 每批一个文件，靠前的批次完成得更慢，批次按相反的顺序完成
+    def slow_first(paths, *args):
+        time.sleep(0.002 * (40 - int(os.path.basename(paths[0])[1:3])))
+        return grep_chunk(paths, *args)
+
+    monkeypatch.setattr(Server, 'executor', ToolExecutor(max_workers=8))
+    monkeypatch.setattr(Server, 'GREP_CHUNK_FILES', 1)
+    monkeypatch.setattr(server, 'grep_chunk', slow_first)
+    for _ in range(3):
+        output = run_grep(many_files, 5)
+        lines = output.splitlines()
+        assert [line.split(':')[0].rsplit(os.sep, 1)[1] for line in lines[:-1]] == [f"f{i:02d}.txt" for i in range(5)]
+        assert lines[-1].startswith('[5 matches in 5 files;') and lines[-1].endswith('stopped at maxResults]')
+    Server.executor.shutdown()
+
+
+def test_all_matches_without_truncation(many_files, monkeypatch):
+    monkeypatch.setattr(Server, 'executor', ToolExecutor(max_workers=4))
+    monkeypatch.setattr(Server, 'GREP_CHUNK_FILES', 3)
+    lines = run_grep(many_files, 100).splitlines()
+    assert len(lines) == 41 and 'stopped' not in lines[-1]
+    Server.executor.shutdown()
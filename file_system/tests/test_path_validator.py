@@ -0,0 +1,77 @@
+import errno
+import os
+
+import pytest
+
+from mcp_server_file_system.path_validator import PathValidator, within
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path.resolve()
+    allowed = root / 'allowed'
+    (allowed / 'a' / 'b').mkdir(parents=True)
+    (allowed / 'a' / 'b' / 'file.txt').write_text('x')
+    (root / 'outside').mkdir()
+    (allowed / 'link_in').symlink_to(allowed / 'a')
+    (allowed / 'link_rel').symlink_to('a/b')
+    (allowed / 'link_out').symlink_to(root / 'outside')
+    (allowed / 'loop').symlink_to('loop')
+    return root, allowed
+
+
+@pytest.fixture(params=[0.0, 60.0], ids=['uncached', 'cached'])
+def validator(request, tree):
+    return PathValidator([str(tree[1])], ttl=request.param)
+
+
+def test_within_compares_path_components():
+    assert within('/data/project/x', ['/data/project'])
+    assert within('/data/project', ['/data/project'])
+    assert not within('/data/project2', ['/data/project'])
+
+
+@pytest.mark.parametrize('relative', [
+    'a/b/file.txt', 'link_in/b/file.txt', 'link_rel/file.txt', 'a/./b/../b/file.txt', 'link_in/../a',
+    'a/missing/../b', 'a/b/new_file.txt',
+])
+def test_matches_os_path_realpath(tree, validator, relative):
+    path = os.path.join(tree[1], relative)
+    for _ in range(2):  # 第二次从缓存的前缀开始解析
+        assert validator.validate(path) == os.path.realpath(path)
+
+
+def test_rejects_paths_outside_allowed_directories(tree, validator):
+    with pytest.raises(PermissionError, match='outside allowed directories'):
+        validator.validate(str(tree[0] / 'outside'))
+    with pytest.raises(PermissionError, match='outside allowed directories'):
+        validator.validate(str(tree[1]) + '2/file')
+
+
+def test_rejects_symlinks_leaving_allowed_directories(tree, validator):
+    with pytest.raises(PermissionError, match='symlink target'):
+        validator.validate(str(tree[1] / 'link_out' / 'file'))
+
+
+def test_symlink_loop(tree, validator):
+    with pytest.raises(OSError) as error:
+        validator.validate(str(tree[1] / 'loop' / 'x'))
+    assert error.value.errno == errno.ELOOP
+
+
+def test_invalidate_drops_moved_directories(tree):
+    allowed = tree[1]
+    validator = PathValidator([str(allowed)], ttl=60.0)
+    path = str(allowed / 'link_in' / 'b' / 'file.txt')
+    assert validator.validate(path) == str(allowed / 'a' / 'b' / 'file.txt')
+    (allowed / 'link_in').unlink()
+    (allowed / 'c').mkdir()
+    (allowed / 'link_in').symlink_to(allowed / 'c')
+    validator.invalidate(str(allowed / 'link_in'))
+    assert validator.validate(path) == str(allowed / 'c' / 'b' / 'file.txt')
+
+
+def test_cache_is_bounded(tree):
+    validator = PathValidator([str(tree[1])], ttl=60.0, max_entries=3)
+    validator.validate(str(tree[1] / 'a' / 'b' / 'file.txt'))
+    assert validator.stats()['entries'] <= 3
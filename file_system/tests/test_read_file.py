@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from mcp_server_file_system.content_cache import ContentCache, ETagCache
+from mcp_server_file_system.server import FileSystem
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(FileSystem, 'content_cache', ContentCache())
+    monkeypatch.setattr(FileSystem, 'etag_cache', ETagCache())
+
+
+def replace(path, content):
+    temp = f"{path}.tmp"
+    with open(temp, 'w') as file:
+        file.write(content)
+    os.replace(temp, path)
+
+
+def test_not_modified_only_when_etag_matches(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    replace(path, 'one\n')
+    content, etag = FileSystem.read_file_with_etag(path)
+    assert content == 'one\n'
+    assert FileSystem.read_file_with_etag(path, etag) == (None, etag)
+    replace(path, 'two\n')
+    content, new_etag = FileSystem.read_file_with_etag(path, etag)
+    assert content == 'two\n'
+    assert new_etag != etag
+
+
+def test_ranged_read_uses_same_etag_as_full_read(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    replace(path, 'one\ntwo\nthree\n')
+    _, etag = FileSystem.read_file_with_etag(path)
+    content, ranged_etag = FileSystem.read_file_with_etag(path, ranged=(None, None, 2, 2, None, None))
+    assert content == 'two\n\n[bytes 4-8 of 14]'
+    assert ranged_etag == etag
+    assert FileSystem.read_file_with_etag(path, etag, (None, None, None, None, 1, None)) == (None, etag)
+
+
+@pytest.mark.parametrize('ranged', [None, (None, None, None, None, None, 1)])
+def test_file_replaced_after_hashing_returns_content_of_hashed_file(tmp_path, monkeypatch, ranged):
+    path = str(tmp_path / 'a.txt')
+    replace(path, 'old\n')
+    hash_file = FileSystem.etag_cache._hash
+    pending = ['new\n']
+
+    def hash_then_replace(file):
+        etag = hash_file(file)
+        if pending:
+            replace(path, pending.pop())
+        return etag
+
+    monkeypatch.setattr(FileSystem.etag_cache, '_hash', hash_then_replace)
+    content, etag = FileSystem.read_file_with_etag(path, ranged=ranged)
+    assert content.startswith('old\n')
+    # 之后的请求看到新文件，上次的 ETag 不会把新内容误判为未修改
+    content, new_etag = FileSystem.read_file_with_etag(path, etag, ranged)
+    assert content.startswith('new\n')
+    assert new_etag != etag
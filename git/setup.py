@@ -10,6 +10,7 @@ setup(
     author_email="26741980@qq.com",
     python_requires=">=3.11",
     install_requires=[
+        "mcp_server_common>=0.1.0",
         "mcp>=1.0.0",
         "pydantic>=2.11.3",
         "paramiko>=3.5.1",
@@ -0,0 +1,68 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import git
+
+# scp 风格的远程地址：[user@]host:path
+SCP_URL = re.compile(r'^(?:[^@/]+@)?([^:/]+):')
+URL_HOST = re.compile(r'^[a-z][a-z0-9+.-]*://(?:[^@/]+@)?(\[[^\]]+\]|[^:/]+)', re.IGNORECASE)
+
+
+def discover_repos(root: str, max_depth: int = 3) -> list[str]:
+    """返回 root 下（含 root 本身）的 git 仓库，找到仓库后不再进入其子目录."""
+    repos = []
+    stack = [(os.path.abspath(root), 0)]
+    while stack:
+        path, depth = stack.pop()
+        if os.path.exists(os.path.join(path, '.git')):
+            repos.append(path)
+            continue
+        if depth >= max_depth:
+            continue
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                        stack.append((entry.path, depth + 1))
+        except OSError:
+            continue
+    return sorted(repos)
+
+
+def remote_host(repo: git.Repo, remote: str) -> str:
+    url = repo.remotes[remote].url
+    match = URL_HOST.match(url)
+    if match:
+        return match.group(1).lower()
+    match = SCP_URL.match(url)
+    if match and not os.path.exists(url):
+        return match.group(1).lower()
+    return 'local'
+
+
+class HostRateLimiter:
+    """限制同时访问同一个远程主机的 fetch/pull 数量，以及相邻两次开始之间的最小间隔."""
+
+    def __init__(self, max_concurrent: int = 4, min_interval: float = 0.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.Semaphore] = {}
+        self._next_start: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def limit(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.max_concurrent))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start[host])
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
@@ -10,50 +10,67 @@ import asyncio
 import json
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
+from mcp_server_common.session_pool import McpSessionPool
 
 class GitMcpClient:
-    def __init__(self, remote_ip: str, port: int = 9201):
+    def __init__(self, remote_ip: str, port: int = 9201, pool_size: int = 4, idle_timeout: float = 300.0):
         self.server_url = f"http://{remote_ip}:{port}/sse"
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.pool: McpSessionPool | None = None
 
-    async def git_pull(self, repo_path: str) -> str:
+    # 在 async with 中使用时复用常驻连接池，否则每次调用单独建立 SSE 连接
+    async def __aenter__(self) -> "GitMcpClient":
+        self.pool = McpSessionPool(self.server_url, max_size=self.pool_size, idle_timeout=self.idle_timeout)
+        await self.pool.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pool, self.pool = self.pool, None
+        await pool.close()
+
+    async def _call_tool(self, name: str, arguments: dict, **kwargs):
+        if self.pool is not None:
+            return await self.pool.call_tool(name, arguments, **kwargs)
         async with sse_client(self.server_url) as streams:
             async with ClientSession(*streams) as session:
-                # Test initialization
                 await session.initialize()
-                response = await session.call_tool(name = 'git_pull',  arguments = {'repo_path': repo_path, 'remote_name':'origin', 'branch_name':'master'})
-                return response
+                return await session.call_tool(name = name, arguments = arguments, **kwargs)
+
+    async def git_pull(self, repo_path: str) -> str:
+        response = await self._call_tool('git_pull', {'repo_path': repo_path, 'remote_name':'origin', 'branch_name':'master'})
+        return response
                 
     async def git_push(self, repo_path: str) -> str:
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'git_push',  arguments = {'repo_path': repo_path, 'remote_name':'origin', 'branch_name':'master'})
-                return response
+        response = await self._call_tool('git_push', {'repo_path': repo_path, 'remote_name':'origin', 'branch_name':'master'})
+        return response
                 
     async def git_add(self, repo_path: str, files: list[str]) -> str:
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'git_add',  arguments = {'repo_path': repo_path, 'files':files})
-                return response
+        response = await self._call_tool('git_add', {'repo_path': repo_path, 'files':files})
+        return response
                 
     async def git_status(self, repo_path: str) -> str:
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'git_status', arguments = {'repo_path': repo_path})
-                return response
+        response = await self._call_tool('git_status', {'repo_path': repo_path})
+        return response
                 
     async def git_commit(self, repo_path: str, message: str) -> str:
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'git_commit',  arguments = {'repo_path': repo_path, 'message': message})
-                return response
+        response = await self._call_tool('git_commit', {'repo_path': repo_path, 'message': message})
+        return response
+
+    # 批量工具：repo_paths 与 root 下找到的仓库一起处理，在一次调用中返回每个仓库的 JSON 结果
+    async def git_status_batch(self, repo_paths: list[str] = [], root: str = None, max_workers: int = 8) -> str:
+        arguments = {'repo_paths': repo_paths, 'max_workers': max_workers}
+        if root:
+            arguments['root'] = root
+        response = await self._call_tool('git_status_batch', arguments)
+        return response
+
+    async def git_pull_batch(self, repo_paths: list[str] = [], root: str = None, max_workers: int = 8) -> str:
+        arguments = {'repo_paths': repo_paths, 'max_workers': max_workers}
+        if root:
+            arguments['root'] = root
+        response = await self._call_tool('git_pull_batch', arguments)
+        return response
         
 if __name__ == "__main__":
     client = GitMcpClient('127.0.0.1')
@@ -0,0 +1,74 @@
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+import git
+
+
+class GitStream:
+    """逐块读取 git 子进程的 stdout，调用方可以在读完之前停止，进程随即被结束."""
+
+    def __init__(self, proc: subprocess.Popen):
+        self.proc = proc
+        self.eof = False
+        self.bytes_read = 0
+
+    def chunks(self, size: int = 65536) -> Iterator[bytes]:
+        while True:
+            data = self.proc.stdout.read1(size)
+            if not data:
+                self.eof = True
+                return
+            self.bytes_read += len(data)
+            yield data
+
+    def records(self, sep: bytes = b'\0') -> Iterator[bytes]:
+        pending = []
+        for data in self.chunks():
+            parts = data.split(sep)
+            if len(parts) == 1:
+                pending.append(data)
+                continue
+            pending.append(parts[0])
+            yield b''.join(pending)
+            yield from parts[1:-1]
+            pending = [parts[-1]]
+        if any(pending):
+            yield b''.join(pending)
+
+    def lines(self, max_length: int = 65536) -> Iterator[bytes]:
+        # 超长的行（压缩后的 js、lock 文件等）被切成多段产出，只有最后一段以换行结尾
+        pending = b''
+        for data in self.chunks():
+            pending += data
+            start = 0
+            while (end := pending.find(b'\n', start)) >= 0:
+                yield pending[start:end + 1]
+                start = end + 1
+            pending = pending[start:]
+            while len(pending) >= max_length:
+                yield pending[:max_length]
+                pending = pending[max_length:]
+        if pending:
+            yield pending
+
+
+@contextmanager
+def git_stream(repo: git.Repo, *args: str) -> Iterator[GitStream]:
+    # stderr 写到临时文件，避免 stderr 管道写满后与 stdout 的读取互相阻塞
+    with tempfile.TemporaryFile() as stderr:
+        command = [git.Git.GIT_PYTHON_GIT_EXECUTABLE or 'git', *args]
+        proc = subprocess.Popen(command, cwd=repo.working_tree_dir or repo.git_dir,
+                                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+        stream = GitStream(proc)
+        try:
+            yield stream
+        finally:
+            if not stream.eof and proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            status = proc.wait()
+        if stream.eof and status != 0:
+            stderr.seek(0)
+            raise git.exc.GitCommandError(command, status, stderr.read())
@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+
+import git
+
+
+class CachedRepo:
+    def __init__(self, repo: git.Repo, signature: tuple):
+        self.repo = repo
+        self.signature = signature
+        self.lock = threading.RLock()
+        self.users = 0
+        self.evicted = False
+
+
+class RepoCache:
+    """按解析后的真实路径缓存打开的 git.Repo，LRU 淘汰.
+
+    每次使用前比较 HEAD、index、packed-refs 和 refs/heads 目录的 stat 签名（固定 4 次 stat，与引用数量无关），
+    仓库在服务之外被修改时重新打开；淘汰或失效的 Repo 会调用 close() 结束其常驻的 git cat-file 进程。
+    GitPython 的常驻进程不是线程安全的，所以同一个仓库上的操作通过条目锁串行执行。
+    """
+
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._repos: OrderedDict[str, CachedRepo] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def signature(self, repo: git.Repo) -> tuple:
+        git_dir, common_dir = repo.git_dir, repo.common_dir
+        parts = []
+        # 松散分支通过 lock 文件 + rename 更新，会改变 refs/heads 的 mtime；不遍历整个 refs 目录，
+        # 否则标签或远程分支很多时每次查找的开销接近重新打开仓库
+        for path in (os.path.join(git_dir, 'HEAD'), os.path.join(git_dir, 'index'),
+                     os.path.join(common_dir, 'packed-refs'), os.path.join(common_dir, 'refs', 'heads')):
+            try:
+                st = os.stat(path)
+                parts.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                parts.append(None)
+        return tuple(parts)
+
+    def _close(self, entry: CachedRepo) -> None:
+        # 调用方需持有 self._lock；还有线程在使用时推迟到 release 时关闭
+        entry.evicted = True
+        if entry.users == 0:
+            entry.repo.close()
+
+    def _acquire(self, key: str) -> CachedRepo:
+        with self._lock:
+            entry = self._repos.get(key)
+            if entry is not None:
+                entry.users += 1
+        if entry is not None:
+            with entry.lock:
+                fresh = self.signature(entry.repo) == entry.signature
+            if fresh:
+                with self._lock:
+                    self.hits += 1
+                    if self._repos.get(key) is entry:
+                        self._repos.move_to_end(key)
+                return entry
+            self._release(entry)
+            with self._lock:
+                self.invalidations += 1
+                if self._repos.get(key) is entry:
+                    del self._repos[key]
+                    self._close(entry)
+
+        repo = git.Repo(key)
+        entry = CachedRepo(repo, self.signature(repo))
+        entry.users = 1
+        with self._lock:
+            self.misses += 1
+            previous = self._repos.pop(key, None)
+            if previous is not None:
+                self._close(previous)
+            self._repos[key] = entry
+            while len(self._repos) > self.max_size:
+                _, oldest = self._repos.popitem(last=False)
+                self.evictions += 1
+                self._close(oldest)
+        return entry
+
+    def _release(self, entry: CachedRepo) -> None:
+        with self._lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                entry.repo.close()
+
+    @contextmanager
+    def open(self, repo_path):
+        entry = self._acquire(os.path.realpath(repo_path))
+        try:
+            with entry.lock:
+                yield entry.repo
+                # 经由本 Repo 对象做的修改不需要让缓存失效
+                entry.signature = self.signature(entry.repo)
+        finally:
+            self._release(entry)
+
+    def call(self, repo_path, operation: Callable, *args):
+        with self.open(repo_path) as repo:
+            return operation(repo, *args)
+
+    def clear(self) -> None:
+        with self._lock:
+            entries, self._repos = list(self._repos.values()), OrderedDict()
+            for entry in entries:
+                self._close(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._repos),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
@@ -7,7 +7,12 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.join(current_dir, '..')
 sys.path.insert(0, parent_dir)
 
+import asyncio
+import json
 import logging
+import re
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import Sequence
 from mcp.server.fastmcp import FastMCP
@@ -22,6 +27,10 @@ from enum import Enum
 import git
 from pydantic import BaseModel
 from pydantic import ValidationError
+from mcp_server_common.executor import ToolExecutor, parse_tool_limits
+from mcp_server_git.repo_cache import RepoCache
+from mcp_server_git.git_stream import git_stream
+from mcp_server_git.batch import HostRateLimiter, discover_repos, remote_host
 
 class GitStatus(BaseModel):
     repo_path: str
@@ -36,13 +45,22 @@ class GitPush(BaseModel):
     remote_name: str
     branch_name: str
 
-class GitDiffUnstaged(BaseModel):
+# diff 类工具共用的输出控制参数
+class DiffOptions(BaseModel):
+    mode: str = "patch"  # patch、stat（每个文件的增删行数）或 name-only（文件名和变更类型）
+    paths: list[str] = []
+    max_bytes_per_file: int = 64 * 1024
+    max_total_bytes: int = 1024 * 1024
+    file_offset: int = 0  # 按文件分页：跳过前 file_offset 个文件
+    max_files: int | None = None
+
+class GitDiffUnstaged(DiffOptions):
     repo_path: str
 
-class GitDiffStaged(BaseModel):
+class GitDiffStaged(DiffOptions):
     repo_path: str
 
-class GitDiff(BaseModel):
+class GitDiff(DiffOptions):
     repo_path: str
     target: str
 
@@ -60,6 +78,14 @@ class GitReset(BaseModel):
 class GitLog(BaseModel):
     repo_path: str
     max_count: int = 10
+    revision: str | None = None  # 从该提交/分支开始，默认 HEAD
+    start_after: str | None = None  # 分页游标：上一页返回的 next cursor（<起始提交的完整 sha>:<已返回的提交数>）
+    paths: list[str] = []
+    author: str | None = None
+    since: str | None = None
+    until: str | None = None
+    grep: str | None = None
+    format: str = "text"  # text 或 compact（每行一个 JSON：sha/author/date/subject）
 
 class GitCreateBranch(BaseModel):
     repo_path: str
@@ -70,13 +96,42 @@ class GitCheckout(BaseModel):
     repo_path: str
     branch_name: str
 
-class GitShow(BaseModel):
+class GitShow(DiffOptions):
     repo_path: str
     revision: str
 
 class GitInit(BaseModel):
     repo_path: str
 
+class GitRepoCacheStats(BaseModel):
+    pass
+
+# 批量工具共用的参数：repo_paths 与 root 下发现的仓库合并
+class GitBatchOptions(BaseModel):
+    repo_paths: list[str] = []
+    root: str | None = None
+    max_depth: int = 3  # 在 root 下查找仓库的最大目录深度
+    max_workers: int = 8
+
+class GitStatusBatch(GitBatchOptions):
+    pass
+
+class GitPullBatch(GitBatchOptions):
+    remote_name: str = "origin"
+    branch_name: str | None = None  # 默认拉取各仓库的当前分支
+
+class GitLogBatch(GitBatchOptions):
+    max_count: int = 10
+    revision: str | None = None
+    paths: list[str] = []
+    author: str | None = None
+    since: str | None = None
+    until: str | None = None
+    grep: str | None = None
+
+class GitDiffUnstagedBatch(GitBatchOptions, DiffOptions):
+    pass
+
 class GitTools(str, Enum):
     STATUS = "git_status"
     PULL = "git_pull"
@@ -92,10 +147,38 @@ class GitTools(str, Enum):
     CHECKOUT = "git_checkout"
     SHOW = "git_show"
     INIT = "git_init"
+    REPO_CACHE_STATS = "git_repo_cache_stats"
+    STATUS_BATCH = "git_status_batch"
+    PULL_BATCH = "git_pull_batch"
+    LOG_BATCH = "git_log_batch"
+    DIFF_UNSTAGED_BATCH = "git_diff_unstaged_batch"
 
 class GitOperation:
     def git_status(repo: git.Repo) -> str:
         return repo.git.status()
+
+    # 解析 porcelain v2 输出，得到适合批量返回的状态摘要
+    def git_status_summary(repo: git.Repo) -> dict:
+        summary = {'branch': None, 'upstream': None, 'ahead': 0, 'behind': 0,
+                   'staged': 0, 'unstaged': 0, 'untracked': 0, 'conflicts': 0}
+        for line in repo.git.status('--porcelain=v2', '--branch').splitlines():
+            if line.startswith('# branch.head '):
+                summary['branch'] = line.split(' ', 2)[2]
+            elif line.startswith('# branch.upstream '):
+                summary['upstream'] = line.split(' ', 2)[2]
+            elif line.startswith('# branch.ab '):
+                ahead, behind = line.split(' ')[2:4]
+                summary['ahead'], summary['behind'] = int(ahead), -int(behind)
+            elif line.startswith(('1 ', '2 ')):
+                xy = line[2:4]
+                summary['staged'] += xy[0] != '.'
+                summary['unstaged'] += xy[1] != '.'
+            elif line.startswith('u '):
+                summary['conflicts'] += 1
+            elif line.startswith('? '):
+                summary['untracked'] += 1
+        summary['clean'] = not (summary['staged'] or summary['unstaged'] or summary['untracked'] or summary['conflicts'])
+        return summary
     
     def git_pull(repo: git.Repo, remote='origin', branch='master') -> str:
         # 检查当前分支
@@ -112,6 +195,18 @@ class GitOperation:
         # 拉取远程仓库更新
         return repo.remotes.origin.pull(branch)
 
+    # 批量拉取使用：只在当前分支上从 remote 拉取，不切换分支也不推送；同一个远程主机上的拉取由 limiter 限流
+    def git_pull_limited(repo: git.Repo, limiter: HostRateLimiter, remote='origin', branch: str | None = None) -> str:
+        if repo.head.is_detached:
+            raise ValueError("HEAD is detached, check out a branch before pulling")
+        current_branch = repo.active_branch.name
+        if branch and branch != current_branch:
+            raise ValueError(f"current branch is {current_branch}, not {branch}; git_pull_batch does not switch branches")
+        target = repo.remote(remote)
+        with limiter.limit(remote_host(repo, remote)):
+            result = target.pull(current_branch)
+        return "\n".join(str(info) for info in result)
+
     def git_push(repo: git.Repo, remote='origin', branch='master') -> str:
         # 检查当前分支
         current_branch = repo.active_branch.name
@@ -129,14 +224,69 @@ class GitOperation:
         
 
   
-    def git_diff_unstaged(repo: git.Repo) -> str:
-        return repo.git.diff()
-
-    def git_diff_staged(repo: git.Repo) -> str:
-        return repo.git.diff("--cached")
-
-    def git_diff(repo: git.Repo, target: str) -> str:
-        return repo.git.diff(target)
+    DIFF_MODES = {'patch': ['--patch'], 'stat': ['--numstat'], 'name-only': ['--name-status']}
+
+    # 逐行读取 git 的输出，按文件分页并限制每个文件和总的字节数，读够后立即结束 git 进程
+    def bounded_diff(repo: git.Repo, command: list[str], options: DiffOptions) -> str:
+        if options.mode not in GitOperation.DIFF_MODES:
+            raise ValueError(f"Unknown diff mode: {options.mode}")
+        args = [command[0], '--no-color', '--no-ext-diff', *GitOperation.DIFF_MODES[options.mode], *command[1:],
+                '--', *options.paths]
+        output, total, index, shown = [], 0, -1, 0
+        parts, file_bytes, dropped = [], 0, 0
+        footer = ""
+
+        def finish_file():
+            if parts:
+                output.append(b"".join(parts).decode('utf-8', errors='replace'))
+            if dropped:
+                output.append(f"\n[... {dropped} more bytes of this file truncated ...]\n")
+
+        with git_stream(repo, *args) as stream:
+            line_start = True
+            for piece in stream.lines():
+                # patch 模式下每个文件以 "diff --git " 开头，其余模式每行一个文件
+                new_file = options.mode != 'patch' or (line_start and piece.startswith(b'diff --git '))
+                line_start = piece.endswith(b'\n')
+                if new_file:
+                    finish_file()
+                    parts, file_bytes, dropped = [], 0, 0
+                    index += 1
+                    if index < options.file_offset:
+                        continue
+                    if options.max_files is not None and shown >= options.max_files:
+                        footer = (f"\n[Showing files {options.file_offset + 1}-{index}; more files follow, "
+                                  f"continue with file_offset={index}]\n")
+                        break
+                    shown += 1
+                if index < options.file_offset:
+                    continue
+                if total >= options.max_total_bytes:
+                    # 恰好在文件边界用完时当前文件还没有输出，下一页从它开始
+                    next_offset = index + 1 if file_bytes else index
+                    footer = (f"\n[... truncated, output reached max_total_bytes; "
+                              f"continue with file_offset={next_offset}]\n")
+                    dropped = 0
+                    break
+                keep = piece[:max(0, min(options.max_bytes_per_file - file_bytes, options.max_total_bytes - total))]
+                if keep:
+                    parts.append(keep)
+                    file_bytes += len(keep)
+                    total += len(keep)
+                dropped += len(piece) - len(keep)
+            finish_file()
+        return "".join(output) + footer
+
+    def git_diff_unstaged(repo: git.Repo, options: DiffOptions) -> str:
+        return GitOperation.bounded_diff(repo, ['diff'], options)
+
+    def git_diff_staged(repo: git.Repo, options: DiffOptions) -> str:
+        return GitOperation.bounded_diff(repo, ['diff', '--cached'], options)
+
+    def git_diff(repo: git.Repo, target: str, options: DiffOptions) -> str:
+        if target.startswith('-'):
+            raise ValueError(f"Invalid target: {target}")
+        return GitOperation.bounded_diff(repo, ['diff', target], options)
 
     def git_commit(repo: git.Repo, message: str) -> str:
         commit = repo.index.commit(message)
@@ -150,17 +300,78 @@ class GitOperation:
         repo.index.reset()
         return "All staged changes reset"
 
-    def git_log(repo: git.Repo, max_count: int = 10) -> list[str]:
-        commits = list(repo.iter_commits(max_count=max_count))
-        log = []
-        for commit in commits:
-            log.append(
-                f"Commit: {commit.hexsha}\n"
-                f"Author: {commit.author}\n"
-                f"Date: {commit.authored_datetime}\n"
-                f"Message: {commit.message}\n"
-            )
-        return log
+    # 过滤条件交给 git log 处理，逐条解析其输出，只在内存中保留一条提交
+    def iter_log(repo: git.Repo, revision: str | None = None, paths: list[str] = [], author: str | None = None,
+                 since: str | None = None, until: str | None = None, grep: str | None = None,
+                 max_count: int | None = None, skip: int = 0):
+        args = ['log', '-z', '--format=%H%x1f%an%x1f%ae%x1f%aI%x1f%B']
+        if max_count is not None:
+            args.append(f'--max-count={max_count}')
+        if skip:
+            args.append(f'--skip={skip}')
+        for option, value in (('--author', author), ('--since', since), ('--until', until), ('--grep', grep)):
+            if value:
+                args.append(f'{option}={value}')
+        if revision and revision.startswith('-'):
+            raise ValueError(f"Invalid revision: {revision}")
+        args.append(revision or 'HEAD')
+        args.append('--')
+        args.extend(paths)
+        with git_stream(repo, *args) as stream:
+            for record in stream.records(b'\0'):
+                sha, name, email, date, message = record.decode('utf-8', errors='replace').split('\x1f', 4)
+                yield {'sha': sha.strip(), 'author': name, 'email': email, 'date': date, 'message': message}
+
+    # 分页游标为 "<第一页时 revision 指向的完整 sha>:<已返回的提交数>"，缩写的 sha 可能有歧义而从错误的位置继续
+    CURSOR = re.compile(r'([0-9a-f]{40}|[0-9a-f]{64}):(\d+)')
+
+    # 返回 (本页的日志条目, 下一页的游标)，没有更多提交时游标为 None
+    def git_log(repo: git.Repo, max_count: int = 10, revision: str | None = None, start_after: str | None = None,
+                paths: list[str] = [], author: str | None = None, since: str | None = None, until: str | None = None,
+                grep: str | None = None, format: str = "text") -> tuple[list[str], str | None]:
+        # 第一页把 revision 固定为提交 sha，之后的页从同一个提交用 git log --skip 跳过已返回的提交，
+        # 拼起来与不分页的 git log 完全一致（包括合并进来的分支）；多取一条用来判断是否还有下一页
+        if start_after:
+            match = GitOperation.CURSOR.fullmatch(start_after)
+            if not match:
+                raise ValueError(f"Invalid cursor: {start_after}, expected the value returned as next page")
+            tip, skip = match.group(1), int(match.group(2))
+        else:
+            if revision and revision.startswith('-'):
+                raise ValueError(f"Invalid revision: {revision}")
+            tip, skip = revision or 'HEAD', 0
+        try:
+            tip = repo.git.rev_parse('--verify', f'{tip}^{{commit}}')
+        except git.GitCommandError:
+            raise ValueError(f"Commit {tip} not found in the repository")
+        commits = GitOperation.iter_log(repo, tip, paths, author, since, until, grep, max_count + 1, skip)
+        try:
+            log, next_cursor = [], None
+            for commit in commits:
+                if len(log) == max_count:
+                    next_cursor = f"{tip}:{skip + max_count}"
+                    break
+                if format == "compact":
+                    log.append(json.dumps({
+                        'sha': commit['sha'],
+                        'author': commit['author'],
+                        'date': commit['date'],
+                        'subject': commit['message'].split('\n', 1)[0],
+                    }, ensure_ascii=False))
+                else:
+                    log.append(
+                        f"Commit: {commit['sha']}\n"
+                        f"Author: {commit['author']}\n"
+                        f"Date: {datetime.fromisoformat(commit['date'])}\n"
+                        f"Message: {commit['message']}\n"
+                    )
+        finally:
+            commits.close()
+        return log, next_cursor
+
+    def git_log_entries(repo: git.Repo, *args) -> dict:
+        log, next_cursor = GitOperation.git_log(repo, *args, format="compact")
+        return {'commits': [json.loads(entry) for entry in log], 'next_cursor': next_cursor}
 
     def git_create_branch(repo: git.Repo, branch_name: str, base_branch: str | None = None) -> str:
         if base_branch:
@@ -182,29 +393,76 @@ class GitOperation:
         except Exception as e:
             return f"Error initializing repository: {str(e)}"
 
-    def git_show(repo: git.Repo, revision: str) -> str:
+    def git_show(repo: git.Repo, revision: str, options: DiffOptions) -> str:
         commit = repo.commit(revision)
-        output = [
+        header = (
             f"Commit: {commit.hexsha}\n"
             f"Author: {commit.author}\n"
             f"Date: {commit.authored_datetime}\n"
             f"Message: {commit.message}\n"
-        ]
+        )
+        # 与第一个父提交比较，根提交与空树比较
         if commit.parents:
-            parent = commit.parents[0]
-            diff = parent.diff(commit, create_patch=True)
+            command = ['diff-tree', '-r', '--no-commit-id', commit.parents[0].hexsha, commit.hexsha]
         else:
-            diff = commit.diff(git.NULL_TREE, create_patch=True)
-        for d in diff:
-            output.append(f"\n--- {d.a_path}\n+++ {d.b_path}\n")
-            output.append(d.diff.decode('utf-8'))
-        return "".join(output)
+            command = ['diff-tree', '-r', '--no-commit-id', '--root', commit.hexsha]
+        return header + "\n" + GitOperation.bounded_diff(repo, command, options)
 
 class Server:
     mcp: FastMCP = FastMCP("mcp-git")
+    executor: ToolExecutor = ToolExecutor()
+    repo_cache: RepoCache = RepoCache()
+    host_limiter: HostRateLimiter = HostRateLimiter()
 
-    def __init__(self, port):
+    def __init__(self, port, workers: int | None = None, tool_limits: dict = None, repo_cache_size: int = 32,
+                 fetch_per_host: int = 4, fetch_interval: float = 0.0):
         Server.mcp.settings.port = port
+        Server.executor.configure(max_workers=workers, tool_limits=tool_limits)
+        Server.repo_cache.max_size = repo_cache_size
+        Server.host_limiter.max_concurrent = fetch_per_host
+        Server.host_limiter.min_interval = fetch_interval
+
+    # 在工作线程中从缓存取出 Repo 执行 operation(repo, *args)
+    async def run_git(name: str, repo_path: Path, operation, *args):
+        try:
+            return await Server.executor.run(name, Server.repo_cache.call, repo_path, operation, *args)
+        except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
+            raise ValueError(f"The path {repo_path} is not a valid Git repository.")
+
+    # 在多个仓库上并发执行 operation，每完成一个仓库推送一条 progress，结果按输入顺序返回
+    async def run_batch(name: str, schema: GitBatchOptions, operation, *args) -> str:
+        if not schema.repo_paths and not schema.root:
+            raise ValueError("Either repo_paths or root is required")
+        repo_paths = list(schema.repo_paths)
+        if schema.root:
+            repo_paths += await Server.executor.run(name, discover_repos, schema.root, schema.max_depth)
+        repo_paths = list(dict.fromkeys(repo_paths))
+        semaphore = asyncio.Semaphore(max(1, schema.max_workers))
+        ctx = Server.mcp.get_context()
+        finished = 0
+
+        async def run_one(repo_path: str) -> dict:
+            nonlocal finished
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    result = {'repo_path': repo_path, 'ok': True,
+                              'result': await Server.run_git(name, Path(repo_path), operation, *args)}
+                except Exception as e:
+                    result = {'repo_path': repo_path, 'ok': False, 'error': str(e)}
+                result['duration'] = round(time.monotonic() - start, 3)
+            finished += 1
+            await ctx.report_progress(progress=finished, total=len(repo_paths),
+                                      message=json.dumps(result, ensure_ascii=False, default=str))
+            return result
+
+        results = await asyncio.gather(*(run_one(repo_path) for repo_path in repo_paths))
+        summary = {
+            'repos': len(results),
+            'succeeded': sum(1 for r in results if r['ok']),
+            'failed': sum(1 for r in results if not r['ok']),
+        }
+        return json.dumps({'summary': summary, 'results': results}, ensure_ascii=False, default=str)
 
     # run
     def run(self):
@@ -282,18 +540,77 @@ class Server:
                 name=GitTools.INIT,
                 description="Initialize a new Git repository",
                 inputSchema=GitInit.model_json_schema(),
+            ),
+            Tool(
+                name=GitTools.REPO_CACHE_STATS,
+                description="Shows hit/miss counters of the server's open repository cache",
+                inputSchema=GitRepoCacheStats.model_json_schema(),
+            ),
+            Tool(
+                name=GitTools.STATUS_BATCH,
+                description="Shows a status summary of many repositories, given as repo_paths or found under root",
+                inputSchema=GitStatusBatch.model_json_schema(),
+            ),
+            Tool(
+                name=GitTools.PULL_BATCH,
+                description="Pulls many repositories in parallel, rate limited per remote host",
+                inputSchema=GitPullBatch.model_json_schema(),
+            ),
+            Tool(
+                name=GitTools.LOG_BATCH,
+                description="Shows recent commits of many repositories",
+                inputSchema=GitLogBatch.model_json_schema(),
+            ),
+            Tool(
+                name=GitTools.DIFF_UNSTAGED_BATCH,
+                description="Shows unstaged changes of many repositories",
+                inputSchema=GitDiffUnstagedBatch.model_json_schema(),
             )
         ]
 
     @mcp._mcp_server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+        if name == GitTools.REPO_CACHE_STATS:
+            stats = Server.repo_cache.stats()
+            return [TextContent(
+                type="text",
+                text="\n".join(f"{key}: {value}" for key, value in stats.items())
+            )]
+
+        # 批量工具没有单个 repo_path，结果为 JSON
+        match name:
+            case GitTools.STATUS_BATCH | GitTools.PULL_BATCH | GitTools.LOG_BATCH | GitTools.DIFF_UNSTAGED_BATCH:
+                try:
+                    match name:
+                        case GitTools.STATUS_BATCH:
+                            schema = GitStatusBatch.model_validate(arguments)
+                            result = await Server.run_batch(name, schema, GitOperation.git_status_summary)
+                        case GitTools.PULL_BATCH:
+                            schema = GitPullBatch.model_validate(arguments)
+                            result = await Server.run_batch(name, schema, GitOperation.git_pull_limited,
+                                                            Server.host_limiter, schema.remote_name, schema.branch_name)
+                        case GitTools.LOG_BATCH:
+                            schema = GitLogBatch.model_validate(arguments)
+                            result = await Server.run_batch(name, schema, GitOperation.git_log_entries, schema.max_count,
+                                                            schema.revision, None, schema.paths, schema.author,
+                                                            schema.since, schema.until, schema.grep)
+                        case GitTools.DIFF_UNSTAGED_BATCH:
+                            schema = GitDiffUnstagedBatch.model_validate(arguments)
+                            result = await Server.run_batch(name, schema, GitOperation.git_diff_unstaged, schema)
+                    return [TextContent(
+                        type="text",
+                        text=result
+                    )]
+                except ValidationError as e:
+                    raise ValueError(f"Invalid arguments for {name}: {e}")
+
         repo_path = Path(arguments["repo_path"])
         
         # Handle git init separately since it doesn't require an existing repo
         if name == GitTools.INIT:
             try:
                 schema = GitInit.model_validate(arguments)  # Validate the GitInit schema
-                result = GitOperation.git_init(str(repo_path))
+                result = await Server.executor.run(name, GitOperation.git_init, str(repo_path))
                 return [TextContent(
                     type="text",
                     text=result
@@ -301,17 +618,12 @@ class Server:
             except ValidationError as e:
                 raise ValueError(f"Invalid arguments for {name}: {e}")
             
-        # For all other commands, we need an existing repo
-        try:
-            repo = git.Repo(repo_path)
-        except git.exc.InvalidGitRepositoryError:
-            raise ValueError(f"The path {repo_path} is not a valid Git repository.")
-        
+        # For all other commands, we need an existing repo, opened through the repo cache
         match name:
             case GitTools.STATUS:
                 try:
                     schema = GitStatus.model_validate(arguments)  # Validate GitStatus schema
-                    status = GitOperation.git_status(repo)
+                    status = await Server.run_git(name, repo_path, GitOperation.git_status)
                     return [TextContent(
                         type="text",
                         text=f"Repository status:\n{status}"
@@ -322,7 +634,7 @@ class Server:
             case GitTools.PULL:
                 try:
                     schema = GitPull.model_validate(arguments)  # Validate GitPull schema
-                    result = GitOperation.git_pull(repo, schema.remote_name, schema.branch_name)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_pull, schema.remote_name, schema.branch_name)
                     return [TextContent(
                         type="text",
                         text=f"Pull result:\n{result}"
@@ -333,7 +645,7 @@ class Server:
             case GitTools.PUSH:
                 try:
                     schema = GitPush.model_validate(arguments)  # Validate GitPush schema
-                    result = GitOperation.git_push(repo, schema.remote_name, schema.branch_name)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_push, schema.remote_name, schema.branch_name)
                     return [TextContent(
                         type="text",
                         text=f"Push result:\n{result}"
@@ -344,7 +656,7 @@ class Server:
             case GitTools.DIFF_UNSTAGED:
                 try:
                     schema = GitDiffUnstaged.model_validate(arguments)  # Validate GitDiffUnstaged schema
-                    diff = GitOperation.git_diff_unstaged(repo)
+                    diff = await Server.run_git(name, repo_path, GitOperation.git_diff_unstaged, schema)
                     return [TextContent(
                         type="text",
                         text=f"Unstaged changes:\n{diff}"
@@ -355,7 +667,7 @@ class Server:
             case GitTools.DIFF_STAGED:
                 try:
                     schema = GitDiffStaged.model_validate(arguments)  # Validate GitDiffStaged schema
-                    diff = GitOperation.git_diff_staged(repo)
+                    diff = await Server.run_git(name, repo_path, GitOperation.git_diff_staged, schema)
                     return [TextContent(
                         type="text",
                         text=f"Staged changes:\n{diff}"
@@ -366,7 +678,7 @@ class Server:
             case GitTools.DIFF:
                 try:
                     schema = GitDiff.model_validate(arguments)  # Validate GitDiff schema
-                    diff = GitOperation.git_diff(repo, schema.target)
+                    diff = await Server.run_git(name, repo_path, GitOperation.git_diff, schema.target, schema)
                     return [TextContent(
                         type="text",
                         text=f"Diff with {schema.target}:\n{diff}"
@@ -377,7 +689,7 @@ class Server:
             case GitTools.COMMIT:
                 try:
                     schema = GitCommit.model_validate(arguments)  # Validate GitCommit schema
-                    result = GitOperation.git_commit(repo, schema.message)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_commit, schema.message)
                     return [TextContent(
                         type="text",
                         text=result
@@ -388,7 +700,7 @@ class Server:
             case GitTools.ADD:
                 try:
                     schema = GitAdd.model_validate(arguments)  # Validate GitAdd schema
-                    result = GitOperation.git_add(repo, schema.files)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_add, schema.files)
                     return [TextContent(
                         type="text",
                         text=result
@@ -399,7 +711,7 @@ class Server:
             case GitTools.RESET:
                 try:
                     schema = GitReset.model_validate(arguments)  # Validate GitReset schema
-                    result = GitOperation.git_reset(repo)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_reset)
                     return [TextContent(
                         type="text",
                         text=result
@@ -410,10 +722,15 @@ class Server:
             case GitTools.LOG:
                 try:
                     schema = GitLog.model_validate(arguments)  # Validate GitLog schema
-                    log = GitOperation.git_log(repo, schema.max_count)
+                    log, next_cursor = await Server.run_git(
+                        name, repo_path, GitOperation.git_log, schema.max_count, schema.revision, schema.start_after,
+                        schema.paths, schema.author, schema.since, schema.until, schema.grep, schema.format)
+                    text = "\n".join(log) if schema.format == "compact" else "Commit history:\n" + "\n".join(log)
+                    if next_cursor:
+                        text += f"\nNext page: start_after={next_cursor}"
                     return [TextContent(
                         type="text",
-                        text="Commit history:\n" + "\n".join(log)
+                        text=text
                     )]
                 except ValidationError as e:
                     raise ValueError(f"Invalid arguments for {name}: {e}")
@@ -421,8 +738,10 @@ class Server:
             case GitTools.CREATE_BRANCH:
                 try:
                     schema = GitCreateBranch.model_validate(arguments)  # Validate GitCreateBranch schema
-                    result = GitOperation.git_create_branch(
-                        repo,
+                    result = await Server.run_git(
+                        name,
+                        repo_path,
+                        GitOperation.git_create_branch,
                         schema.branch_name,
                         schema.base_branch
                     )
@@ -436,7 +755,7 @@ class Server:
             case GitTools.CHECKOUT:
                 try:
                     schema = GitCheckout.model_validate(arguments)  # Validate GitCheckout schema
-                    result = GitOperation.git_checkout(repo, schema.branch_name)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_checkout, schema.branch_name)
                     return [TextContent(
                         type="text",
                         text=result
@@ -447,7 +766,7 @@ class Server:
             case GitTools.SHOW:
                 try:
                     schema = GitShow.model_validate(arguments)  # Validate GitShow schema
-                    result = GitOperation.git_show(repo, schema.revision)
+                    result = await Server.run_git(name, repo_path, GitOperation.git_show, schema.revision, schema)
                     return [TextContent(
                         type="text",
                         text=result
@@ -459,8 +778,9 @@ class Server:
                 raise ValueError(f"Unknown tool: {name}")
 
 # 运行服务器
-def main(port: int = 9201):
-    server = Server(port)
+def main(port: int = 9201, workers: int | None = None, tool_limits: dict = None, repo_cache_size: int = 32,
+         fetch_per_host: int = 4, fetch_interval: float = 0.0):
+    server = Server(port, workers, tool_limits, repo_cache_size, fetch_per_host, fetch_interval)
     server.run()
 
 if __name__ == "__main__":
@@ -468,7 +788,13 @@ if __name__ == "__main__":
     # 使用 argparse 解析命令行参数
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=9201)
+    parser.add_argument('--workers', type=int, default=None, help='worker threads for blocking git calls')
+    parser.add_argument('--tool_limits', type=str, nargs='*', default=[], help='per-tool concurrency, e.g. git_pull=2')
+    parser.add_argument('--repo_cache_size', type=int, default=32, help='number of open repositories kept in the cache')
+    parser.add_argument('--fetch_per_host', type=int, default=4, help='concurrent pulls per remote host in batch tools')
+    parser.add_argument('--fetch_interval', type=float, default=0.0, help='minimum seconds between pulls to the same host')
     args = parser.parse_args()
 
     # 调用主函数
-    main(port=args.port)
+    main(port=args.port, workers=args.workers, tool_limits=parse_tool_limits(args.tool_limits),
+         repo_cache_size=args.repo_cache_size, fetch_per_host=args.fetch_per_host, fetch_interval=args.fetch_interval)
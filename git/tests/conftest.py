@@ -0,0 +1,27 @@
+import git
+import pytest
+
+AUTHOR = git.Actor('tester', 'tester@example.com')
+
+
+class RepoBuilder:
+    """在临时目录中构造提交历史，提交时间按创建顺序递增，git log 的顺序因此是确定的."""
+
+    def __init__(self, path):
+        self.repo = git.Repo.init(path, initial_branch='main')
+        self.path = path
+        self.clock = 1_700_000_000
+
+    def commit(self, name: str, parents: list | None = None, files: dict | None = None) -> git.Commit:
+        for file_name, content in (files or {name: name}).items():
+            (self.path / file_name).write_text(content)
+            self.repo.index.add([file_name])
+        self.clock += 60
+        date = f"{self.clock} +0000"
+        return self.repo.index.commit(name, parent_commits=parents, author=AUTHOR, committer=AUTHOR,
+                                      author_date=date, commit_date=date)
+
+
+@pytest.fixture
+def builder(tmp_path):
+    return RepoBuilder(tmp_path)
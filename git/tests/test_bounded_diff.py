@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from mcp_server_git.server import DiffOptions, GitOperation
+
+
+@pytest.fixture
+def changed(builder):
+    builder.commit('base', files={f'd{i}': f'{i}\n' for i in range(1, 4)})
+    for i in range(1, 4):
+        (builder.path / f'd{i}').write_text(f'{i}\nchanged {i}\n')
+    return builder.repo
+
+
+def file_diffs(repo) -> list[str]:
+    output = GitOperation.git_diff_unstaged(repo, DiffOptions())
+    return re.split(r'(?m)^(?=diff --git )', output)[1:]
+
+
+def page_all(repo, **kwargs) -> list[str]:
+    pages, offset = [], 0
+    while True:
+        page = GitOperation.git_diff_unstaged(repo, DiffOptions(file_offset=offset, **kwargs))
+        pages.append(page)
+        match = re.search(r'continue with file_offset=(\d+)', page)
+        if not match:
+            return pages
+        assert int(match.group(1)) > offset
+        offset = int(match.group(1))
+
+
+def test_budget_ending_at_file_boundary_resumes_at_next_file(changed):
+    first, second, third = file_diffs(changed)
+    pages = page_all(changed, max_total_bytes=len(first.encode()))
+    assert pages[0].startswith(first) and 'file_offset=1' in pages[0]
+    assert pages[1].startswith(second) and 'file_offset=2' in pages[1]
+    assert pages[2] == third
+
+
+def test_budget_ending_inside_a_file_moves_past_it(changed):
+    first, second, _ = file_diffs(changed)
+    page = GitOperation.git_diff_unstaged(changed, DiffOptions(max_total_bytes=len(first.encode()) + 5))
+    assert page.startswith(first + second[:5]) and 'file_offset=2' in page
+
+
+def test_max_files_pages(changed):
+    diffs = file_diffs(changed)
+    pages = page_all(changed, max_files=2)
+    assert pages[0].startswith(''.join(diffs[:2])) and 'file_offset=2' in pages[0]
+    assert pages[1] == diffs[2]
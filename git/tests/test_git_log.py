@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from mcp_server_git.server import GitOperation
+
+
+def subjects(entries: list[str]) -> list[str]:
+    return [json.loads(entry)['subject'] for entry in entries]
+
+
+def page_all(repo, max_count: int, **kwargs) -> list[str]:
+    result, cursor = [], None
+    while True:
+        log, cursor = GitOperation.git_log(repo, max_count, start_after=cursor, format="compact", **kwargs)
+        result.extend(subjects(log))
+        if cursor is None:
+            return result
+
+
+@pytest.fixture
+def merged(builder):
+    # base -> A1 -> A2 ------> M
+    #     \-> B1 -> B2 ------/
+    base = builder.commit('base')
+    a1 = builder.commit('A1', [base])
+    b1 = builder.commit('B1', [base])
+    a2 = builder.commit('A2', [a1])
+    b2 = builder.commit('B2', [b1])
+    builder.commit('M', [a2, b2])
+    return builder.repo
+
+
+@pytest.mark.parametrize('max_count', [1, 2, 3, 5, 6, 10])
+def test_pages_match_unpaged_log_across_merge(merged, max_count):
+    unpaged, cursor = GitOperation.git_log(merged, 100, format="compact")
+    assert cursor is None and len(unpaged) == 6
+    assert page_all(merged, max_count) == subjects(unpaged)
+
+
+def test_cursor_pins_the_first_page_tip(merged, builder):
+    log, cursor = GitOperation.git_log(merged, 2, format="compact")
+    builder.commit('new', [merged.head.commit])
+    rest, _ = GitOperation.git_log(merged, 10, start_after=cursor, format="compact")
+    assert 'new' not in subjects(log + rest)
+    assert len(log + rest) == 6
+
+
+def test_filters_are_paged_after_filtering(merged):
+    assert page_all(merged, 1, grep='^A') == ['A2', 'A1']
+
+
+@pytest.mark.parametrize('cursor', ['abc:1', 'HEAD:2', '0' * 40, '0' * 40 + ':x'])
+def test_invalid_cursor(merged, cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        GitOperation.git_log(merged, 2, start_after=cursor)
+
+
+def test_unknown_cursor_commit(merged):
+    with pytest.raises(ValueError, match='not found'):
+        GitOperation.git_log(merged, 2, start_after='0' * 40 + ':2')
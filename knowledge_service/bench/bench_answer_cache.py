@@ -0,0 +1,41 @@
+# AnswerCache 的精确查找、numpy 向量化的近似查找与纯 Python Jaccard 相似度查找的对比
+# 运行：cd knowledge_service && PYTHONPATH=src/mcp_server_knowledge_service python bench/bench_answer_cache.py
+import random
+import timeit
+from typing import List
+
+from answer_cache import AnswerCache, make_scope, normalize
+
+
+def jaccard_nearest(questions: List[str], text: str, n: int = 2) -> tuple[str, float]:
+    # 对比：逐条计算 n-gram 集合的 Jaccard 相似度的纯 Python 实现
+    grams = {text[i:i + n] for i in range(len(text) - n + 1)}
+    best, best_similarity = None, 0.0
+    for question in questions:
+        other = {question[i:i + n] for i in range(len(question) - n + 1)}
+        similarity = len(grams & other) / len(grams | other)
+        if similarity > best_similarity:
+            best, best_similarity = question, similarity
+    return best, best_similarity
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    words = ['北向接口', '全量资产', 'OSPF', '路由', '查询', '配置', '告警', '性能', '设备', '端口', '如何', '订阅',
+             '批量', '同步', '拓扑', '链路', '业务', '隧道', '网元', '删除']
+    questions = list(dict.fromkeys(''.join(random.sample(words, 5)) for _ in range(5000)))[:4000]
+    scope = make_scope('kbase', ['tag'])
+    cache = AnswerCache(similarity=0.9, max_entries=len(questions))
+    for question in questions:
+        cache.put(scope, question, question)
+    normalized = [normalize(question) for question in questions]
+
+    probe = questions[123] + '？'
+    near = '请问' + questions[456]
+    assert cache.lookup(scope, probe) == ('exact', questions[123]) and cache.lookup(scope, near) == ('near', questions[456])
+    number = 200
+    exact = timeit.timeit(lambda: cache.lookup(scope, probe), number=number) / number
+    vectorized = timeit.timeit(lambda: cache.lookup(scope, near), number=number) / number
+    python = timeit.timeit(lambda: jaccard_nearest(normalized, normalize(near)), number=10) / 10
+    print(f"{len(questions)} cached questions: exact lookup {exact * 1e6:.1f} us, near lookup (numpy) "
+          f"{vectorized * 1e3:.2f} ms, near lookup (python jaccard) {python * 1e3:.2f} ms")
@@ -0,0 +1,73 @@
+# 每次新建连接的 requests.get 与连接池复用的 HttpClient 的延迟和吞吐对比
+# 运行：cd knowledge_service && PYTHONPATH=src/mcp_server_knowledge_service python bench/bench_http_client.py
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+
+from http_client import HttpClient
+
+
+# 本地桩服务，模拟接口服务的 1ms 处理时间
+async def handle(request):
+    await asyncio.sleep(0.001)
+    return web.Response(text='x' * 2048)
+
+
+def summary(name: str, latencies: list, elapsed: float) -> str:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return (f"{name:<34} mean {statistics.mean(latencies) * 1000:6.2f} ms  p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms"
+            f"  p99 {p99 * 1000:6.2f} ms  {len(latencies) / elapsed:7.0f} req/s")
+
+
+def timed_get(url: str) -> float:
+    start = time.perf_counter()
+    requests.get(url).text
+    return time.perf_counter() - start
+
+
+async def main(count: int = 500, parallel: int = 32):
+    app = web.Application()
+    app.router.add_get('/queryWsdlMethod', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/queryWsdlMethod?name=getOspfByFitler"
+    loop = asyncio.get_running_loop()
+
+    # requests.get：每次新建连接，在线程池中执行以免阻塞事件循环（即原来的做法）
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        for concurrency in (1, parallel):
+            start = time.perf_counter()
+            latencies = []
+            for i in range(0, count, concurrency):
+                latencies += await asyncio.gather(*[loop.run_in_executor(pool, timed_get, url)
+                                                    for _ in range(min(concurrency, count - i))])
+            print(summary(f"requests.get, concurrency {concurrency}", latencies, time.perf_counter() - start))
+
+    client = HttpClient(concurrency=parallel)
+
+    async def timed_request() -> float:
+        start = time.perf_counter()
+        await client.request('inf', 'GET', url)
+        return time.perf_counter() - start
+
+    await timed_request()  # 建立连接
+    for concurrency in (1, parallel):
+        start = time.perf_counter()
+        latencies = []
+        for i in range(0, count, concurrency):
+            latencies += await asyncio.gather(*[timed_request() for _ in range(min(concurrency, count - i))])
+        print(summary(f"HttpClient, concurrency {concurrency}", latencies, time.perf_counter() - start))
+    await client.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
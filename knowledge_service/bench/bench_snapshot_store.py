@@ -0,0 +1,56 @@
+# 快照文件（mmap + 二分查找）与整体读入解析 JSON 的启动和查找耗时对比，以及增量 prefetch 的合并耗时
+# 运行：cd knowledge_service && PYTHONPATH=src/mcp_server_knowledge_service python bench/bench_snapshot_store.py
+import json
+import os
+import random
+import string
+import tempfile
+import timeit
+
+from snapshot_store import Snapshot, write_snapshot
+
+
+if __name__ == "__main__":
+    # 对比：把所有定义存成一个 JSON 文件，启动时整体读入解析
+    random.seed(1)
+    fields = [''.join(random.choices(string.ascii_lowercase, k=8)) for _ in range(200)]
+    entries = {('WSDL', f"getObject{i}", i % 2 == 0): json.dumps({'method': f"getObject{i}",
+                                                                 'params': random.sample(fields, 40)}, indent=2)
+               for i in range(20000)}
+    with tempfile.TemporaryDirectory() as root:
+        snapshot_path = os.path.join(root, 'inf.snapshot')
+        json_path = os.path.join(root, 'inf.json')
+        size = write_snapshot(snapshot_path, entries)
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump([[*key, text] for key, text in entries.items()], file)
+        raw = sum(len(text.encode('utf-8')) for text in entries.values())
+        print(f"{len(entries)} definitions, {raw / 2 ** 20:.1f} MiB raw, snapshot {size / 2 ** 20:.1f} MiB, "
+              f"json {os.path.getsize(json_path) / 2 ** 20:.1f} MiB")
+
+        snapshot = Snapshot(snapshot_path)
+        assert all(snapshot.get(key) == text for key, text in entries.items())
+        assert snapshot.get(('WSDL', 'missing', False)) is None
+        snapshot.close()
+
+        def load_json():
+            with open(json_path, encoding='utf-8') as file:
+                return {(inf_type, name, recursive): text for inf_type, name, recursive, text in json.load(file)}
+
+        open_snapshot = timeit.timeit(lambda: Snapshot(snapshot_path).close(), number=20) / 20
+        parse_json = timeit.timeit(load_json, number=3) / 3
+        snapshot = Snapshot(snapshot_path)
+        keys = random.sample(list(entries), 1000)
+        lookup = timeit.timeit(lambda: [snapshot.get(key) for key in keys], number=5) / 5000
+        print(f"startup: mmap snapshot {open_snapshot * 1e6:.0f} us, parse json {parse_json * 1e3:.0f} ms; "
+              f"snapshot lookup {lookup * 1e6:.1f} us")
+
+        # 增量 prefetch：新拉取的 1000 条与已有快照合并，对比解压全部旧条目再整体重写
+        update = {key: text + ' ' for key, text in random.sample(list(entries.items()), 1000)}
+        merged_path = os.path.join(root, 'merged.snapshot')
+        merge = timeit.timeit(lambda: write_snapshot(merged_path, update, base=snapshot), number=3) / 3
+        rewrite = timeit.timeit(lambda: write_snapshot(merged_path, {**dict(snapshot.items()), **update}), number=3) / 3
+        merged = Snapshot(merged_path)
+        assert len(merged) == len(entries) and all(merged.get(key) == text for key, text in {**entries, **update}.items())
+        merged.close()
+        print(f"merge 1000 updates: stream copy {merge * 1e3:.0f} ms, decompress and rewrite {rewrite * 1e3:.0f} ms")
+        snapshot.close()
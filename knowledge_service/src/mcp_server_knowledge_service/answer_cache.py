@@ -0,0 +1,184 @@
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from singleflight import SingleFlight
+
+# (kbaseid, 排序后的 tag_names, 查询方式)，不同范围的问题互不命中
+Scope = Tuple[str, Tuple[str, ...], str]
+AnswerKey = Tuple[Scope, str]
+
+
+def make_scope(kbaseid: str, tag_names: List[str], variant: str = '') -> Scope:
+    return kbaseid, tuple(sorted(set(tag_names or []))), variant
+
+
+def normalize(question: str) -> str:
+    # 全角转半角、忽略大小写，只保留文字和数字，去掉空白和标点的差异
+    text = unicodedata.normalize('NFKC', question).casefold()
+    return ''.join(ch for ch in text if ch.isalnum())
+
+
+class NgramIndex:
+    """一个范围内已缓存问题的字符 n-gram 向量，行向量做过 L2 归一化，相似度为余弦相似度.
+
+    n-gram 用 hash 映射到 dim 维，删除的行清零后复用，查询时一次矩阵向量乘法算出所有相似度。
+    """
+
+    def __init__(self, ngram: int = 2, dim: int = 1024):
+        self.ngram = ngram
+        self.dim = dim
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.keys: List[str | None] = []
+        self.rows: Dict[str, int] = {}
+        self.free: List[int] = []
+
+    def vector(self, text: str) -> np.ndarray:
+        n = min(self.ngram, len(text)) or 1
+        grams = [text[i:i + n] for i in range(len(text) - n + 1)] or [text]
+        counts = np.bincount(np.fromiter((hash(gram) % self.dim for gram in grams), dtype=np.int64, count=len(grams)),
+                             minlength=self.dim).astype(np.float32)
+        return counts / np.linalg.norm(counts)
+
+    def add(self, text: str, vector: np.ndarray) -> None:
+        row = self.rows.get(text)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+                self.keys[row] = text
+            else:
+                row = len(self.keys)
+                if row == len(self.vectors):
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                self.keys.append(text)
+            self.rows[text] = row
+        self.vectors[row] = vector
+
+    def remove(self, text: str) -> None:
+        row = self.rows.pop(text, None)
+        if row is not None:
+            self.vectors[row] = 0
+            self.keys[row] = None
+            self.free.append(row)
+
+    def nearest(self, vector: np.ndarray) -> tuple[str | None, float]:
+        if not self.rows:
+            return None, 0.0
+        similarities = self.vectors[:len(self.keys)] @ vector
+        row = int(np.argmax(similarities))
+        return self.keys[row], float(similarities[row])
+
+
+class AnswerCache:
+    """get_ops_qa 答案缓存：按范围和规范化后的问题缓存成功的结果，带 TTL 和条目数上限（LRU）.
+
+    similarity > 0 时，精确匹配未命中再在同一范围内找字符 n-gram 余弦相似度不低于 similarity 的问题，
+    命中则返回它的答案。相同问题的并发请求只检索一次。
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 4096, similarity: float = 0.0,
+                 ngram: int = 2, dim: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.ngram = ngram
+        self.dim = dim
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[AnswerKey, tuple[float, object]] = OrderedDict()
+        self._indexes: Dict[Scope, NgramIndex] = {}
+        self._flights = SingleFlight()
+
+    def _index(self, scope: Scope) -> NgramIndex:
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = NgramIndex(self.ngram, self.dim)
+        return index
+
+    def _remove(self, key: AnswerKey) -> None:
+        del self._entries[key]
+        index = self._indexes.get(key[0])
+        if index is not None:
+            index.remove(key[1])
+            if not index.rows:
+                del self._indexes[key[0]]
+
+    def _fresh(self, key: AnswerKey, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def lookup(self, scope: Scope, question: str) -> tuple[str | None, object]:
+        """返回 (命中方式 'exact' / 'near' / None, 答案)."""
+        now = time.time()
+        text = normalize(question)
+        entry = self._fresh((scope, text), now)
+        if entry is not None:
+            return 'exact', entry[1]
+        if self.similarity > 0 and text and scope in self._indexes:
+            index = self._indexes[scope]
+            match, similarity = index.nearest(index.vector(text))
+            if match is not None and similarity >= self.similarity:
+                entry = self._fresh((scope, match), now)
+                if entry is not None:
+                    return 'near', entry[1]
+        return None, None
+
+    def put(self, scope: Scope, question: str, answer) -> None:
+        text = normalize(question)
+        key = (scope, text)
+        self._entries[key] = (time.time() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        if self.similarity > 0 and text:
+            index = self._index(scope)
+            index.add(text, index.vector(text))
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def get(self, scope: Scope, question: str, fetch: Callable[[], Awaitable[tuple[bool, object]]]) -> tuple[bool, object]:
+        """返回缓存的答案，未命中时调用 fetch() 检索；只缓存成功 (True, answer) 的结果."""
+        if self.ttl <= 0:
+            return await fetch()
+        how, answer = self.lookup(scope, question)
+        if how is not None:
+            if how == 'exact':
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+            return True, answer
+
+        async def load() -> tuple[bool, object]:
+            self.misses += 1
+            result = await fetch()
+            if result[0]:
+                self.put(scope, question, result[1])
+            return result
+
+        return await self._flights.run((scope, normalize(question)), load)
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits + self._flights.coalesced
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'scopes': len({scope for scope, _ in self._entries}),
+            'exact_hits': self.exact_hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'coalesced': self._flights.coalesced,
+            'evictions': self.evictions,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'similarity': self.similarity,
+        }
+
@@ -10,32 +10,57 @@ import asyncio
 import json
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
+from mcp_server_common.session_pool import McpSessionPool
 
 class KnowledgeServiceClient:
-    def __init__(self, remote_ip: str, port: int = 9203):
+    def __init__(self, remote_ip: str, port: int = 9203, pool_size: int = 4, idle_timeout: float = 300.0):
         self.server_url = f"http://{remote_ip}:{port}/sse"
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.pool: McpSessionPool | None = None
 
-    async def get_interface_define(self, inf_type, func_name, is_need_recursive=False) -> str:
+    # 在 async with 中使用时复用常驻连接池，否则每次调用单独建立 SSE 连接
+    async def __aenter__(self) -> "KnowledgeServiceClient":
+        self.pool = McpSessionPool(self.server_url, max_size=self.pool_size, idle_timeout=self.idle_timeout)
+        await self.pool.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pool, self.pool = self.pool, None
+        await pool.close()
+
+    async def _call_tool(self, name: str, arguments: dict, **kwargs):
+        if self.pool is not None:
+            return await self.pool.call_tool(name, arguments, **kwargs)
         async with sse_client(self.server_url) as streams:
             async with ClientSession(*streams) as session:
-                # Test initialization
                 await session.initialize()
-                response = await session.call_tool(name = 'get_ops_inf',  arguments = {'inf_type': inf_type, 'func_name': func_name, 'is_need_recursive':is_need_recursive})
-                result = ''
-                if response.content:
-                    result = response.content[0].text
-                return not response.isError, result
+                return await session.call_tool(name = name, arguments = arguments, **kwargs)
+
+    async def get_interface_define(self, inf_type, func_name, is_need_recursive=False) -> str:
+        response = await self._call_tool('get_ops_inf', {'inf_type': inf_type, 'func_name': func_name, 'is_need_recursive':is_need_recursive})
+        result = ''
+        if response.content:
+            result = response.content[0].text
+        return not response.isError, result
                 
     async def get_anwser_by_question(self, question, account, token, kbaseName, kbaseid, tag_names = []) -> str:
-        async with sse_client(self.server_url) as streams:
-            async with ClientSession(*streams) as session:
-                # Test initialization
-                await session.initialize()
-                response = await session.call_tool(name = 'get_ops_qa',  arguments = {'question': question, 'account': account, 'token': token, 'kbaseName': kbaseName, 'kbaseid': kbaseid, 'tag_names': tag_names})
-                result = ''
-                if response.content:
-                    result = response.content[0].text
-                return not response.isError, result
+        response = await self._call_tool('get_ops_qa', {'question': question, 'account': account, 'token': token, 'kbaseName': kbaseName, 'kbaseid': kbaseid, 'tag_names': tag_names})
+        result = ''
+        if response.content:
+            result = response.content[0].text
+        return not response.isError, result
+
+    # 返回 True, {'results': [{'question', 'ok', 'hits' 或 'error'}], 'succeeded', 'failed'} 或 False, error
+    async def get_anwsers_by_questions(self, questions, account, token, kbaseName, kbaseid, tag_names = [], top_k = 3, max_concurrency = 8):
+        response = await self._call_tool('get_ops_qa_batch', {'questions': questions, 'account': account, 'token': token, 'kbaseName': kbaseName, 'kbaseid': kbaseid,
+                                                              'tag_names': tag_names, 'top_k': top_k, 'max_concurrency': max_concurrency})
+        result = ''
+        if response.content:
+            result = response.content[0].text
+        if response.isError:
+            return False, result
+        return True, json.loads(result)
                 
 if __name__ == "__main__":
     client = KnowledgeServiceClient('127.0.0.1')
@@ -0,0 +1,94 @@
+import asyncio
+import random
+from typing import Any, Dict
+
+import aiohttp
+
+
+class Upstream:
+    """一个上游服务的请求参数：总超时、连接超时和失败重试次数."""
+
+    def __init__(self, timeout: float, connect_timeout: float = 5.0, retries: int = 2):
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.retries = retries
+
+
+# 接口服务在本机，知识库检索在远端并且要做向量检索，超时更长
+DEFAULT_UPSTREAMS = {
+    'inf': Upstream(timeout=15.0, connect_timeout=2.0),
+    'kbase': Upstream(timeout=60.0, connect_timeout=10.0),
+}
+
+
+class HttpResult:
+    def __init__(self, status: int, text: str):
+        self.status = status
+        self.text = text
+
+
+class HttpClient:
+    """所有上游请求共用的 aiohttp 会话，连接池保持长连接.
+
+    connections 限制连接池大小，concurrency 限制同时在途的请求数；连接错误、连接超时和 5xx 响应按
+    指数退避（带随机抖动）重试，读取超时和 4xx 不重试。POST 等非幂等请求只在建立连接失败或超时
+    （请求还没有发出）时重试。会话在第一次请求时在当前事件循环中创建。
+    """
+
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'})
+
+    def __init__(self, connections: int = 32, concurrency: int = 16, keepalive_timeout: float = 60.0,
+                 backoff: float = 0.2, max_backoff: float = 5.0, upstreams: Dict[str, Upstream] | None = None):
+        self.configure(connections, concurrency, keepalive_timeout, backoff, max_backoff, upstreams)
+
+    def configure(self, connections: int = 32, concurrency: int = 16, keepalive_timeout: float = 60.0,
+                  backoff: float = 0.2, max_backoff: float = 5.0, upstreams: Dict[str, Upstream] | None = None) -> None:
+        self.connections = connections
+        self.concurrency = concurrency
+        self.keepalive_timeout = keepalive_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.upstreams = dict(DEFAULT_UPSTREAMS, **(upstreams or {}))
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    def _delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def request(self, upstream: str, method: str, url: str, **kwargs: Any) -> HttpResult:
+        """发送请求并读出响应文本，重试用尽后返回最后一次的 5xx 响应或抛出最后一次的连接错误."""
+        config = self.upstreams[upstream]
+        session = self._get_session()
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        for attempt in range(config.retries + 1):
+            last = attempt == config.retries
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, timeout=config.timeout, **kwargs) as response:
+                        result = HttpResult(response.status, await response.text())
+                if result.status < 500 or last or not idempotent:
+                    return result
+            except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError):
+                # 建立连接失败或超时，请求还没有发出，任何方法都可以重试
+                if last:
+                    raise
+            except asyncio.TimeoutError:
+                # 读取超时（SocketTimeoutError 等 ServerTimeoutError 同时是 ClientConnectionError 的子类，需要先排除）不重试
+                raise
+            except aiohttp.ClientConnectionError:
+                # 请求可能已经发出，非幂等请求不重试
+                if last or not idempotent:
+                    raise
+            await asyncio.sleep(self._delay(attempt))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
@@ -0,0 +1,103 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Tuple
+
+from singleflight import SingleFlight
+
+# (inf_type, func_name, is_need_recursive)
+InfKey = Tuple[str, str, bool]
+
+
+class InfCache:
+    """get_ops_inf 结果缓存：按 (inf_type, func_name, is_need_recursive) 缓存成功的结果，带 TTL 和条目数上限（LRU）.
+
+    同一个 key 的并发请求只向接口服务发一次请求（single-flight），其余请求等待同一个结果。
+    指定 path 时同时写入 sqlite 文件，重启后加载未过期的条目。
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024, path: str | None = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.persist_errors = 0
+        self._entries: OrderedDict[InfKey, tuple[float, str]] = OrderedDict()
+        self._flights = SingleFlight()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS inf_cache (inf_type TEXT, func_name TEXT, recursive INTEGER, "
+                         "expires REAL, text TEXT, PRIMARY KEY (inf_type, func_name, recursive))")
+        now = time.time()
+        self._db.execute("DELETE FROM inf_cache WHERE expires < ?", (now,))
+        self._db.commit()
+        rows = self._db.execute("SELECT inf_type, func_name, recursive, expires, text FROM inf_cache "
+                                "ORDER BY expires DESC LIMIT ?", (self.max_entries,)).fetchall()
+        for inf_type, func_name, recursive, expires, text in reversed(rows):
+            self._entries[(inf_type, func_name, bool(recursive))] = (expires, text)
+
+    def _persist(self, key: InfKey, expires: float, text: str) -> None:
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO inf_cache VALUES (?, ?, ?, ?, ?)",
+                             (key[0], key[1], int(key[2]), expires, text))
+            self._db.commit()
+
+    def lookup(self, key: InfKey) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def put(self, key: InfKey, text: str) -> None:
+        expires = time.time() + self.ttl
+        self._entries[key] = (expires, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._persist, key, expires, text)
+            except sqlite3.Error:
+                # 持久化失败不影响本次结果，内存中的条目仍然有效
+                self.persist_errors += 1
+
+    async def get(self, key: InfKey, fetch: Callable[[], Awaitable[tuple[bool, str]]]) -> tuple[bool, str]:
+        """返回缓存的结果，未命中时调用 fetch() 获取；只缓存成功 (True, text) 的结果."""
+        text = self.lookup(key) if self.ttl > 0 else None
+        if text is not None:
+            self.hits += 1
+            return True, text
+
+        async def load() -> tuple[bool, str]:
+            self.misses += 1
+            result = await fetch()
+            if result[0] and self.ttl > 0:
+                await self.put(key, result[1])
+            return result
+
+        return await self._flights.run(key, load)
+
+    def stats(self) -> dict:
+        coalesced = self._flights.coalesced
+        lookups = self.hits + self.misses + coalesced
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': coalesced,
+            'hit_rate': round((self.hits + coalesced) / lookups, 4) if lookups else 0.0,
+            'persistent': self._db is not None,
+            'persist_errors': self.persist_errors,
+        }
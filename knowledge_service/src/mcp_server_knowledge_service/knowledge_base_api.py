@@ -1,8 +1,8 @@
-import requests
+import json
 import os
 import re
 import time
-import os
+from http_client import HttpClient
 
 # 查询知识库QA对
 # question是QA对key值
@@ -10,14 +10,16 @@ import os
 # token是工号的token，登录icenter后得到
 # kbaseName知识库名称
 # kbaseid知识库Id
-def query_kbase(question, account, token, kbaseName = None, kbaseid = None, 
+# client是共享的HttpClient
+async def query_kbase(question, account, token, kbaseName = None, kbaseid = None, 
                 tag_names = [], #标签
                 vectorType = 'bge-large-zh-v1.5', 
                 searchType = 'vector', # 匹配类型。默认：vector。其他：mix es
                 matchNumber = 3, # 最大匹配条数
                 relatedIndex = 0.5, # 相关度阈值
                 searchWeight = 0.5,  #权重
-                logger = None):
+                logger = None,
+                *, client: HttpClient):
     workspace = 'workspace'
     url = "https://rdcloud.zte.com.cn/zte-studio-iaab-kbase/api/v1/retrieve"
     payload1 = {"relatedIndex" : relatedIndex, 
@@ -56,24 +58,27 @@ def query_kbase(question, account, token, kbaseName = None, kbaseid = None,
     }
     result = ''
     try:
-        response = requests.post(url, headers=headers, json=payload1)
-        logger.info(f'请求成功，状态码:{response.status_code}')
-        if response.status_code == 200:
-            return True, response.json() 
+        response = await client.request('kbase', 'POST', url, headers=headers, json=payload1)
+        logger.info(f'请求成功，状态码:{response.status}')
+        if response.status == 200:
+            return True, json.loads(response.text)
+        return False, f'请求失败，状态码：{response.status}'
     except Exception as e:
         msg=f'获取知识库只是失败!\n {repr(e)}'
         logger.error(msg)
         return False, msg
   
-def query_kbase_and_return_one(question, account, token, kbaseName = None, kbaseid = None, tag_names = [], logger = None):
-    status, response = query_kbase(question, account, token, 
+async def query_kbase_and_return_one(question, account, token, kbaseName = None, kbaseid = None, tag_names = [], logger = None,
+                                     *, client: HttpClient):
+    status, response = await query_kbase(question, account, token, 
             kbaseName = kbaseName, 
             kbaseid = kbaseid,
             matchNumber = 1,
             tag_names = tag_names,
             searchType = 'mix',
             relatedIndex = 0.5,
-            logger = logger)
+            logger = logger,
+            client = client)
     if not status:
         return status, response
     # 判断response是dict类型，且response['bo']存在
@@ -84,6 +89,38 @@ def query_kbase_and_return_one(question, account, token, kbaseName = None, kbase
     return False, 'not correct response'
 
 
+# 检索结果中相关度分数可能使用的字段名，按顺序取第一个存在的
+SCORE_KEYS = ('score', 'similarity', 'relatedIndex')
 
 
+# 从 /retrieve 的响应中取前 top_k 条带 supplement 的结果，保持检索返回的顺序
+def parse_hits(response, top_k):
+    hits = []
+    if not (isinstance(response, dict) and isinstance(response.get('bo'), list)):
+        return hits
+    for value in response['bo']:
+        if not isinstance(value, dict) or 'supplement' not in value:
+            continue
+        score = next((value[key] for key in SCORE_KEYS if key in value), None)
+        hits.append({'score': score, 'supplement': value['supplement']})
+        if len(hits) >= top_k:
+            break
+    return hits
 
+# 返回 True, [{'score', 'supplement'}, ...] 或 False, error
+async def query_kbase_top_k(question, account, token, kbaseName = None, kbaseid = None, tag_names = [], top_k = 3, logger = None,
+                            *, client: HttpClient):
+    status, response = await query_kbase(question, account, token,
+            kbaseName = kbaseName,
+            kbaseid = kbaseid,
+            matchNumber = top_k,
+            tag_names = tag_names,
+            searchType = 'mix',
+            relatedIndex = 0.5,
+            logger = logger,
+            client = client)
+    if not status:
+        return status, response
+    if not (isinstance(response, dict) and 'bo' in response):
+        return False, 'not correct response'
+    return True, parse_hits(response, top_k)
@@ -1,10 +1,11 @@
-import requests
+import json
 import os
 import sys
 # 获取当前目录的上一级目录 # 将上一级目录添加到PATH
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.join(current_dir, '..')
 sys.path.insert(0, parent_dir)
+from http_client import HttpClient
 
 
 os.environ.pop("http_proxy", None)  # 解决云桌面代理的问题，服务器或非外网代理可以不用
@@ -30,26 +31,45 @@ def _get_url(inf_type, func_name, logger):
 # func_name: 类名或者数据对象名
 # is_need_recursive: 是否需要递归，通过这种方式减少知识量，加速AI推理速度
 # 默认是True
-def get_ops_inf(inf_type, func_name, logger = None, is_need_recursive = False):
+# client: 共享的 HttpClient，复用到接口服务的长连接
+async def get_ops_inf(inf_type, func_name, logger = None, is_need_recursive = False, *, client: HttpClient):
     result, url = _get_url(inf_type, func_name, logger)
     if not result:
         return False, url
     if not is_need_recursive:
         url += '&needRecursive=false'
-    logger.info('get url: ', url)
-    headers = {
-        "Content-Type": "text/plain"
-    }
+    logger.info(f'get url: {url}')
     try:
-        # 创建一个会话对象
-        response = requests.get(url)
-        if response.status_code == 200:
+        response = await client.request('inf', 'GET', url)
+        if response.status == 200:
             return True, response.text
         else:
-            error = f"请求失败，状态码：{response.status_code}"
+            error = f"请求失败，状态码：{response.status}"
             logger.error(error)
             return False, error
     except Exception as e:
-        error =  f"get {inf_type} {func_name} failed"
+        error =  f"get {inf_type} {func_name} failed: {repr(e)}"
         logger.error(error)
         return False, error
+
+# 从接口服务的索引地址获取接口名列表，响应为 JSON 数组（字符串或带 name 字段的对象）或每行一个名字
+async def get_inf_index(index_url, logger = None, *, client: HttpClient):
+    logger.info(f'get index: {index_url}')
+    try:
+        response = await client.request('inf', 'GET', index_url)
+    except Exception as e:
+        error = f"get index {index_url} failed: {repr(e)}"
+        logger.error(error)
+        return False, error
+    if response.status != 200:
+        error = f"请求失败，状态码：{response.status}"
+        logger.error(error)
+        return False, error
+    try:
+        items = json.loads(response.text)
+    except ValueError:
+        items = response.text.splitlines()
+    if not isinstance(items, list):
+        return False, f"index {index_url} is not a list of names"
+    names = [item.get('name') if isinstance(item, dict) else item for item in items]
+    return True, [name.strip() for name in names if isinstance(name, str) and name.strip()]
@@ -4,6 +4,8 @@ os.environ.pop("all_proxy", None)
 os.environ.pop("https_proxy", None)
 
 
+import asyncio
+import json
 from pathlib import Path
 from typing import Sequence
 from mcp.server.fastmcp import FastMCP
@@ -18,8 +20,14 @@ from enum import Enum
 from pydantic import BaseModel
 from pydantic import ValidationError
 from typing import List
-from knowledge_service_api import get_ops_inf
-from knowledge_base_api import query_kbase_and_return_one
+from knowledge_service_api import get_ops_inf, get_inf_index
+from knowledge_base_api import query_kbase_and_return_one, query_kbase_top_k
+from mcp_server_common.executor import ToolExecutor, parse_tool_limits
+from mcp_server_common.file_mode import load_umask
+from inf_cache import InfCache
+from answer_cache import AnswerCache, make_scope
+from snapshot_store import SnapshotStore
+from http_client import HttpClient, Upstream
 
 import logging
 
@@ -29,6 +37,13 @@ class OpsInfFetchParas(BaseModel):
     func_name : str
     is_need_recursive: bool = False
 
+class OpsInfPrefetchParas(BaseModel):
+    inf_type : str
+    func_names : List[str] = []
+    index_url : str | None = None
+    is_need_recursive: bool = False
+    concurrency: int = 8
+
 class KnowledgeBaseParas(BaseModel):
     question: str
     account: str
@@ -37,22 +52,70 @@ class KnowledgeBaseParas(BaseModel):
     kbaseid: str 
     tag_names: List[str] = []
 
+class KnowledgeBaseBatchParas(BaseModel):
+    questions: List[str]
+    account: str
+    token: str
+    kbaseName: str
+    kbaseid: str
+    tag_names: List[str] = []
+    top_k: int = 3
+    max_concurrency: int = 8
+
 
 
 class KonwledgeServiceTools(str, Enum):
     OPS_INF = "get_ops_inf"
     OPS_QA = "get_ops_qa"
+    OPS_QA_BATCH = "get_ops_qa_batch"
+    CACHE_STATS = "knowledge_cache_stats"
+    OPS_INF_PREFETCH = "prefetch_ops_inf"
 
 
 class KownledgeService:
     # return
     # True, method
     # False, error
-    def get_interface_define(inf_type, func_name, is_need_recursive=False, logger = None) -> str:
-        return get_ops_inf(inf_type=inf_type, func_name=func_name, logger=logger, is_need_recursive=is_need_recursive)
+    async def get_interface_define(inf_type, func_name, is_need_recursive=False, logger = None) -> str:
+        return await get_ops_inf(inf_type=inf_type, func_name=func_name, logger=logger, is_need_recursive=is_need_recursive, client=Server.http)
+
+    # keys: [(inf_type, func_name, is_need_recursive)]，拉取接口定义写入快照，返回统计结果
+    async def prefetch_interface_defines(keys, concurrency = 8, logger = None) -> dict:
+        async def fetch(key):
+            return await KownledgeService.get_interface_define(key[0], key[1], key[2], logger)
+        return await Server.snapshots.prefetch(keys, fetch, concurrency)
+
+    # 接口名取自 func_names，指定 index_url 时再加上索引中的全部接口名
+    async def prefetch_keys(inf_type, func_names = [], index_url = None, is_need_recursive = False, logger = None) -> list:
+        names = list(func_names)
+        if index_url:
+            statu, result = await get_inf_index(index_url, logger=logger, client=Server.http)
+            if not statu:
+                raise ValueError(result)
+            names += result
+        return [(inf_type, name, is_need_recursive) for name in names]
+
+    async def get_anwser_by_question(question, account, token, kbaseName, kbaseid, tag_names = [], logger = None) -> str:
+        return await query_kbase_and_return_one(question=question, account=account, token=token, kbaseName=kbaseName, kbaseid=kbaseid, tag_names=tag_names, logger = logger, client=Server.http)
+
+    # 并发检索多个问题，同时进行的检索不超过 max_concurrency，重复的问题只检索一次
+    # 返回与 questions 顺序一致的 [{'question', 'ok', 'hits' 或 'error'}]
+    async def get_anwsers_by_questions(questions, account, token, kbaseName, kbaseid, tag_names = [], top_k = 3, max_concurrency = 8, logger = None) -> list:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(question):
+            async with semaphore:
+                return await query_kbase_top_k(question=question, account=account, token=token, kbaseName=kbaseName, kbaseid=kbaseid, tag_names=tag_names, top_k=top_k, logger=logger, client=Server.http)
+
+        async def answer(question):
+            statu, result = await Server.answer_cache.get(make_scope(kbaseid, tag_names, f'top{top_k}'), question, lambda: fetch(question))
+            if statu:
+                return {'question': question, 'ok': True, 'hits': result}
+            return {'question': question, 'ok': False, 'error': result}
 
-    def get_anwser_by_question(question, account, token, kbaseName, kbaseid, tag_names = [], logger = None) -> str:
-        return query_kbase_and_return_one(question=question, account=account, token=token, kbaseName=kbaseName, kbaseid=kbaseid, tag_names=tag_names, logger = logger)
+        unique = list(dict.fromkeys(questions))
+        answers = dict(zip(unique, await asyncio.gather(*[answer(question) for question in unique])))
+        return [answers[question] for question in questions]
     
 def set_logger(log_name, file):
         logger = logging.getLogger(log_name)
@@ -77,9 +140,25 @@ def set_logger(log_name, file):
 class Server:
     mcp: FastMCP = FastMCP("mcp-knowledge-service")
     logger = set_logger("./log", f'./log/knowledge-service.log')
+    executor: ToolExecutor = ToolExecutor()  # 只用 limit 按工具限制并发，上游请求本身是异步的，不占用线程池
+    inf_cache: InfCache = InfCache()
+    http: HttpClient = HttpClient()
+    answer_cache: AnswerCache = AnswerCache()
+    snapshots: SnapshotStore = SnapshotStore()
 
-    def __init__(self, port):
+    def __init__(self, port, tool_limits: dict = None,
+                 inf_cache_ttl: float = 3600.0, inf_cache_size: int = 1024, inf_cache_file: str | None = None,
+                 http_connections: int = 32, http_concurrency: int = 16, inf_timeout: float = 15.0, kbase_timeout: float = 60.0,
+                 answer_cache_ttl: float = 3600.0, answer_cache_size: int = 4096, answer_cache_similarity: float = 0.0,
+                 snapshot_file: str | None = None):
         Server.mcp.settings.port = port
+        Server.executor.configure(tool_limits=tool_limits)
+        Server.http.configure(connections=http_connections, concurrency=http_concurrency,
+                              upstreams={'inf': Upstream(timeout=inf_timeout, connect_timeout=2.0),
+                                         'kbase': Upstream(timeout=kbase_timeout, connect_timeout=10.0)})
+        Server.inf_cache = InfCache(ttl=inf_cache_ttl, max_entries=inf_cache_size, path=inf_cache_file)
+        Server.answer_cache = AnswerCache(ttl=answer_cache_ttl, max_entries=answer_cache_size, similarity=answer_cache_similarity)
+        Server.snapshots = SnapshotStore(snapshot_file)
 
     # run
     def run(self):
@@ -96,7 +175,26 @@ class Server:
             Tool(
                 name = KonwledgeServiceTools.OPS_QA,
                 description = "Get answser with question from qa database",
-                inputSchema = KonwledgeServiceTools.model_json_schema(),
+                inputSchema = KnowledgeBaseParas.model_json_schema(),
+            ),
+            Tool(
+                name = KonwledgeServiceTools.OPS_QA_BATCH,
+                description = "Get the top_k answers with scores for each of a list of questions from qa database. "
+                              "Questions are retrieved concurrently (at most max_concurrency at a time); "
+                              "returns JSON with one result per question in request order",
+                inputSchema = KnowledgeBaseBatchParas.model_json_schema(),
+            ),
+            Tool(
+                name = KonwledgeServiceTools.CACHE_STATS,
+                description = "Report entries, hits and misses of the interface definition cache, the local answer cache and the interface snapshot",
+                inputSchema = {"type": "object", "properties": {}},
+            ),
+            Tool(
+                name = KonwledgeServiceTools.OPS_INF_PREFETCH,
+                description = "Admin: fetch the definitions of func_names (plus every name listed by index_url) from the interface service "
+                              "into the local snapshot, which get_ops_inf then serves without a round-trip. "
+                              "Existing snapshot entries are kept; returns JSON with fetched, failed and total entries",
+                inputSchema = OpsInfPrefetchParas.model_json_schema(),
             ),
         ]
 
@@ -106,7 +204,20 @@ class Server:
             case KonwledgeServiceTools.OPS_INF:
                 try:
                     schema = OpsInfFetchParas.model_validate(arguments)  
-                    statu, result = KownledgeService.get_interface_define(schema.inf_type, schema.func_name, schema.is_need_recursive, Server.logger)
+                    # 优先使用预取的离线快照，快照中没有时再请求接口服务
+                    result = Server.snapshots.get((schema.inf_type, schema.func_name, schema.is_need_recursive))
+                    if result is not None:
+                        return [TextContent(
+                            type="text",
+                            text=result
+                        )]
+                    async def fetch():
+                        async with Server.executor.limit(name):
+                            return await KownledgeService.get_interface_define(schema.inf_type, schema.func_name, schema.is_need_recursive, Server.logger)
+
+                    # 相同的接口定义在 TTL 内直接返回缓存，并发的相同请求只访问一次接口服务
+                    statu, result = await Server.inf_cache.get(
+                        (schema.inf_type, schema.func_name, schema.is_need_recursive), fetch)
                     if statu:
                         return [TextContent(
                             type="text",
@@ -124,7 +235,13 @@ class Server:
             case KonwledgeServiceTools.OPS_QA:
                 try:
                     schema = KnowledgeBaseParas.model_validate(arguments)  # Validate GitPull schema
-                    statu, result = KownledgeService.get_anwser_by_question(schema.question, schema.account, schema.token, schema.kbaseName, schema.kbaseid, schema.tag_names, Server.logger)
+                    async def fetch():
+                        async with Server.executor.limit(name):
+                            return await KownledgeService.get_anwser_by_question(schema.question, schema.account, schema.token, schema.kbaseName, schema.kbaseid, schema.tag_names, Server.logger)
+
+                    # 同一知识库和标签下相同（或足够相似）的问题直接返回缓存的答案
+                    statu, result = await Server.answer_cache.get(
+                        make_scope(schema.kbaseid, schema.tag_names, 'one'), schema.question, fetch)
                     if statu:
                         return [TextContent(
                             type="text",
@@ -142,22 +259,136 @@ class Server:
                     error = f'error {e}'
                     Server.logger.error(error)
                     raise ValueError(error)
+            case KonwledgeServiceTools.OPS_QA_BATCH:
+                try:
+                    schema = KnowledgeBaseBatchParas.model_validate(arguments)
+                    if not schema.questions:
+                        raise ValueError("questions must not be empty")
+                    if schema.top_k < 1:
+                        raise ValueError("top_k must be at least 1")
+                    async with Server.executor.limit(name):
+                        results = await KownledgeService.get_anwsers_by_questions(schema.questions, schema.account, schema.token, schema.kbaseName, schema.kbaseid, schema.tag_names, schema.top_k, schema.max_concurrency, Server.logger)
+                    succeeded = sum(result['ok'] for result in results)
+                    return [TextContent(
+                        type="text",
+                        text=json.dumps({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}, ensure_ascii=False)
+                    )]
+                except ValidationError as e:
+                    error = f"Invalid arguments for {name}: {e}"
+                    Server.logger.error(error)
+                    raise ValueError(error)
+                except Exception as e:
+                    error = f'error {e}'
+                    Server.logger.error(error)
+                    raise ValueError(error)
+            case KonwledgeServiceTools.CACHE_STATS:
+                return [TextContent(
+                    type="text",
+                    text=json.dumps({'inf_cache': Server.inf_cache.stats(), 'answer_cache': Server.answer_cache.stats(),
+                                     'snapshot': Server.snapshots.stats()})
+                )]
+            case KonwledgeServiceTools.OPS_INF_PREFETCH:
+                try:
+                    schema = OpsInfPrefetchParas.model_validate(arguments)
+                    keys = await KownledgeService.prefetch_keys(schema.inf_type, schema.func_names, schema.index_url, schema.is_need_recursive, Server.logger)
+                    if not keys:
+                        raise ValueError("no interface names given, set func_names or index_url")
+                    async with Server.executor.limit(name):
+                        summary = await KownledgeService.prefetch_interface_defines(keys, schema.concurrency, Server.logger)
+                    Server.logger.info(f"prefetched {summary['fetched']} interface definitions, {len(summary['failed'])} failed")
+                    return [TextContent(
+                        type="text",
+                        text=json.dumps(summary, ensure_ascii=False)
+                    )]
+                except ValidationError as e:
+                    error = f"Invalid arguments for {name}: {e}"
+                    Server.logger.error(error)
+                    raise ValueError(error)
+                except Exception as e:
+                    error = f'error {e}'
+                    Server.logger.error(error)
+                    raise ValueError(error)
             case _:
                 error = f"Unknown tool: {name}"
                 Server.logger.error(error)
                 raise ValueError(error)
 
 # 运行服务器
-def main(port: int = 9203):
-    server = Server(port)
+def main(port: int = 9203, tool_limits: dict = None,
+         inf_cache_ttl: float = 3600.0, inf_cache_size: int = 1024, inf_cache_file: str | None = None,
+         http_connections: int = 32, http_concurrency: int = 16, inf_timeout: float = 15.0, kbase_timeout: float = 60.0,
+         answer_cache_ttl: float = 3600.0, answer_cache_size: int = 4096, answer_cache_similarity: float = 0.0,
+         snapshot_file: str | None = None):
+    load_umask()
+    server = Server(port, tool_limits, inf_cache_ttl, inf_cache_size, inf_cache_file,
+                    http_connections, http_concurrency, inf_timeout, kbase_timeout,
+                    answer_cache_ttl, answer_cache_size, answer_cache_similarity, snapshot_file)
     server.run()
 
+# 只预取接口定义写入快照后退出，不启动服务
+# prefetch_file 每行为 "inf_type func_name"，需要递归时在行尾加 recursive，# 开头的行忽略
+def prefetch(snapshot_file: str, prefetch_file: str | None = None, index_url: str | None = None,
+             inf_type: str = 'WSDL', concurrency: int = 8, **server_args):
+    load_umask()
+    Server(port=0, snapshot_file=snapshot_file, **server_args)
+    keys = []
+    if prefetch_file:
+        with open(prefetch_file, encoding='utf-8') as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) < 2 or fields[0].startswith('#'):
+                    continue
+                keys.append((fields[0], fields[1], len(fields) > 2 and fields[2] == 'recursive'))
+
+    async def run():
+        try:
+            if index_url:
+                keys.extend(await KownledgeService.prefetch_keys(inf_type, [], index_url, False, Server.logger))
+            return await KownledgeService.prefetch_interface_defines(keys, concurrency, Server.logger)
+        finally:
+            await Server.http.close()
+
+    summary = asyncio.run(run())
+    for item in summary['failed']:
+        print(f"failed: {item['inf_type']} {item['func_name']}: {item['error']}")
+    print(f"fetched {summary['fetched']}, failed {len(summary['failed'])}, {summary['entries']} entries "
+          f"({summary['bytes']} bytes) in {snapshot_file}, {summary['seconds']} s")
+
 if __name__ == "__main__":
     import argparse
     # 使用 argparse 解析命令行参数
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=9203)
+    parser.add_argument('--tool_limits', type=str, nargs='*', default=[], help='per-tool concurrency, e.g. get_ops_qa=8')
+    parser.add_argument('--inf_cache_ttl', type=float, default=3600.0, help='seconds to cache get_ops_inf results, 0 to disable')
+    parser.add_argument('--inf_cache_size', type=int, default=1024, help='maximum number of cached get_ops_inf results')
+    parser.add_argument('--inf_cache_file', type=str, default=None, help='sqlite file that keeps cached get_ops_inf results across restarts')
+    parser.add_argument('--http_connections', type=int, default=32, help='size of the keep-alive connection pool for upstream services')
+    parser.add_argument('--http_concurrency', type=int, default=16, help='maximum number of upstream requests in flight')
+    parser.add_argument('--inf_timeout', type=float, default=15.0, help='seconds before a request to the interface service times out')
+    parser.add_argument('--kbase_timeout', type=float, default=60.0, help='seconds before a knowledge base retrieval times out')
+    parser.add_argument('--answer_cache_ttl', type=float, default=3600.0, help='seconds to cache get_ops_qa answers, 0 to disable')
+    parser.add_argument('--answer_cache_size', type=int, default=4096, help='maximum number of cached get_ops_qa answers')
+    parser.add_argument('--answer_cache_similarity', type=float, default=0.0,
+                        help='also answer from a cached question whose character bigram cosine similarity is at least this, e.g. 0.9; 0 for exact matches only')
+    parser.add_argument('--snapshot_file', type=str, default=None, help='compressed snapshot of interface definitions that get_ops_inf serves first')
+    parser.add_argument('--prefetch', type=str, default=None, help='write the definitions listed in this file ("inf_type func_name [recursive]" per line) to --snapshot_file and exit')
+    parser.add_argument('--prefetch_index_url', type=str, default=None, help='also prefetch every name listed by this index url, then exit')
+    parser.add_argument('--prefetch_inf_type', type=str, default='WSDL', help='inf_type of the names from --prefetch_index_url')
+    parser.add_argument('--prefetch_concurrency', type=int, default=8, help='definitions fetched at the same time while prefetching')
     args = parser.parse_args()
 
+    if args.prefetch or args.prefetch_index_url:
+        if not args.snapshot_file:
+            parser.error('--prefetch and --prefetch_index_url need --snapshot_file')
+        prefetch(args.snapshot_file, args.prefetch, args.prefetch_index_url, args.prefetch_inf_type, args.prefetch_concurrency,
+                 http_connections=args.http_connections, http_concurrency=args.http_concurrency, inf_timeout=args.inf_timeout)
+        raise SystemExit(0)
+
     # 调用主函数
-    main(port=args.port)
+    main(port=args.port, tool_limits=parse_tool_limits(args.tool_limits),
+         inf_cache_ttl=args.inf_cache_ttl, inf_cache_size=args.inf_cache_size, inf_cache_file=args.inf_cache_file,
+         http_connections=args.http_connections, http_concurrency=args.http_concurrency,
+         inf_timeout=args.inf_timeout, kbase_timeout=args.kbase_timeout,
+         answer_cache_ttl=args.answer_cache_ttl, answer_cache_size=args.answer_cache_size,
+         answer_cache_similarity=args.answer_cache_similarity, snapshot_file=args.snapshot_file)
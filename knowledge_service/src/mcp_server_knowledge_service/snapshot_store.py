@@ -0,0 +1,211 @@
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from mcp_server_common.file_mode import default_file_mode
+
+# (inf_type, func_name, is_need_recursive)，与 InfCache 的 key 相同
+InfKey = Tuple[str, str, bool]
+
+# 文件格式：头部 | 各条目的 key 和压缩后的定义 | 按 key 字节序排序的定长索引
+# 打开时只读头部，查找时在 mmap 上二分索引，只解压命中的那一条
+MAGIC = b'INFSNAP1'
+HEADER = struct.Struct('<8sQdQ')  # magic, 条目数, 创建时间, 索引偏移
+ENTRY = struct.Struct('<QIQI')  # key 偏移, key 长度, 定义偏移, 定义长度
+
+
+def encode_key(key: InfKey) -> bytes:
+    return f"{key[0]}\0{key[1]}\0{int(key[2])}".encode('utf-8')
+
+
+def decode_key(data: bytes) -> InfKey:
+    inf_type, func_name, recursive = data.decode('utf-8').split('\0')
+    return inf_type, func_name, recursive == '1'
+
+
+def merge_records(new: Iterable[tuple[bytes, bytes]], old: Iterable[tuple[bytes, bytes]]) -> Iterator[tuple[bytes, bytes]]:
+    """合并两个按 key 字节序排序的 (key, 压缩后的定义) 序列，key 相同时取 new 中的."""
+    new, old = iter(new), iter(old)
+    a, b = next(new, None), next(old, None)
+    while a is not None and b is not None:
+        if a[0] <= b[0]:
+            yield a
+            if a[0] == b[0]:
+                b = next(old, None)
+            a = next(new, None)
+        else:
+            yield b
+            b = next(old, None)
+    if a is not None:
+        yield a
+        yield from new
+    if b is not None:
+        yield b
+        yield from old
+
+
+def write_snapshot(path: str, entries: Dict[InfKey, str], level: int = 6, base: 'Snapshot | None' = None) -> int:
+    """把 entries 写成快照文件，先写同目录下的临时文件再 rename，返回文件大小.
+
+    base 不为 None 时同时写入其中 entries 没有覆盖的条目，直接复制压缩后的数据，不解压。
+    """
+    records = sorted((encode_key(key), zlib.compress(text.encode('utf-8'), level)) for key, text in entries.items())
+    if base is not None:
+        records = merge_records(records, base.records())
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        os.fchmod(fd, default_file_mode())
+        with os.fdopen(fd, 'wb') as file:
+            offset = HEADER.size
+            index = []
+            file.seek(offset)
+            for key, value in records:
+                file.write(key)
+                file.write(value)
+                index.append(ENTRY.pack(offset, len(key), offset + len(key), len(value)))
+                offset += len(key) + len(value)
+            file.write(b''.join(index))
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, len(index), time.time(), offset))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return offset + len(index) * ENTRY.size
+
+
+class Snapshot:
+    """只读打开的快照文件，内容通过 mmap 按需读取."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            try:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # 空文件
+                raise ValueError(f"not a valid interface snapshot: {path}")
+        try:
+            magic, self.count, self.created, self._index = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or self._index + self.count * ENTRY.size != len(self._mmap):
+                raise ValueError(f"not a valid interface snapshot: {path}")
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise ValueError(f"not a valid interface snapshot: {path}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _entry(self, i: int) -> tuple[bytes, int, int]:
+        key_offset, key_length, value_offset, value_length = ENTRY.unpack_from(self._mmap, self._index + i * ENTRY.size)
+        return self._mmap[key_offset:key_offset + key_length], value_offset, value_length
+
+    def _value(self, offset: int, length: int) -> str:
+        return zlib.decompress(self._mmap[offset:offset + length]).decode('utf-8')
+
+    def get(self, key: InfKey) -> str | None:
+        target = encode_key(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            found, offset, length = self._entry(low)
+            if found == target:
+                return self._value(offset, length)
+        return None
+
+    def records(self) -> Iterator[tuple[bytes, bytes]]:
+        """按 key 字节序返回 (编码后的 key, 压缩后的定义)，不解压."""
+        for i in range(self.count):
+            key, offset, length = self._entry(i)
+            yield key, self._mmap[offset:offset + length]
+
+    def items(self) -> Iterator[tuple[InfKey, str]]:
+        for i in range(self.count):
+            key, offset, length = self._entry(i)
+            yield decode_key(key), self._value(offset, length)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class SnapshotStore:
+    """get_ops_inf 的离线快照：prefetch 批量拉取接口定义写入快照文件，之后直接从快照返回.
+
+    快照文件在启动时 mmap 打开，不解析内容；prefetch 完成后写入新文件并替换当前快照，
+    同一时间只有一个 prefetch 在拉取和写入。
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.snapshot: Snapshot | None = None
+        self._lock = asyncio.Lock()
+        if path and os.path.exists(path):
+            self.snapshot = Snapshot(path)
+
+    def get(self, key: InfKey) -> str | None:
+        if self.snapshot is None:
+            return None
+        text = self.snapshot.get(key)
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    async def prefetch(self, keys: List[InfKey], fetch: Callable[[InfKey], Awaitable[tuple[bool, str]]],
+                       concurrency: int = 8, merge: bool = True) -> dict:
+        """并发调用 fetch 获取 keys 的定义并写入快照；merge 为 True 时保留已有快照中的其他条目."""
+        if not self.path:
+            raise ValueError("no snapshot file configured, start the server with --snapshot_file")
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(key: InfKey):
+            async with semaphore:
+                return key, await fetch(key)
+
+        async with self._lock:
+            results = await asyncio.gather(*[fetch_one(key) for key in dict.fromkeys(keys)])
+            entries, failed = {}, []
+            for key, (statu, text) in results:
+                if statu:
+                    entries[key] = text
+                else:
+                    failed.append({'inf_type': key[0], 'func_name': key[1], 'is_need_recursive': key[2], 'error': text})
+            base = self.snapshot if merge else None
+            size = await asyncio.to_thread(write_snapshot, self.path, entries, base=base)
+            previous, self.snapshot = self.snapshot, Snapshot(self.path)
+            if previous is not None:
+                previous.close()
+            count = len(self.snapshot)
+        return {
+            'fetched': len(entries),
+            'failed': failed,
+            'entries': count,
+            'bytes': size,
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'entries': len(self.snapshot) if self.snapshot is not None else 0,
+            'created': self.snapshot.created if self.snapshot is not None else None,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
@@ -0,0 +1,77 @@
+import asyncio
+
+from answer_cache import AnswerCache, make_scope, normalize
+
+SCOPE = make_scope('kbase', ['b', 'a'])
+
+
+def test_scope_ignores_tag_order_and_duplicates():
+    assert make_scope('kbase', ['a', 'b', 'a']) == SCOPE
+
+
+def test_normalize_ignores_width_case_and_punctuation():
+    assert normalize('ＯＳＰＦ 路由，怎么 查询？') == normalize('ospf路由怎么查询') == 'ospf路由怎么查询'
+
+
+def test_exact_hit_after_normalization():
+    cache = AnswerCache()
+    cache.put(SCOPE, 'OSPF 路由怎么查询?', 'answer')
+    assert cache.lookup(SCOPE, 'ospf路由怎么查询？') == ('exact', 'answer')
+    assert cache.lookup(make_scope('other', ['a', 'b']), 'OSPF 路由怎么查询?') == (None, None)
+
+
+def test_near_hit_needs_similarity_threshold():
+    cache = AnswerCache(similarity=0.8)
+    cache.put(SCOPE, '北向接口如何查询全量资产', 'answer')
+    assert cache.lookup(SCOPE, '请问北向接口如何查询全量资产') == ('near', 'answer')
+    assert cache.lookup(SCOPE, '告警如何订阅') == (None, None)
+    assert AnswerCache(similarity=0.0).lookup(SCOPE, '请问北向接口如何查询全量资产') == (None, None)
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    cache = AnswerCache(ttl=10, similarity=0.8)
+    now = 1000.0
+    monkeypatch.setattr('answer_cache.time.time', lambda: now)
+    cache.put(SCOPE, 'question', 'answer')
+    now += 11
+    assert cache.lookup(SCOPE, 'question') == (None, None)
+    assert cache.stats()['entries'] == 0 and not cache._indexes
+
+
+def test_lru_eviction_removes_index_rows():
+    cache = AnswerCache(max_entries=2, similarity=0.8)
+    for question in ('first question', 'second question', 'third question'):
+        cache.put(SCOPE, question, question)
+    assert cache.lookup(SCOPE, 'first question') == (None, None)
+    assert cache.stats()['evictions'] == 1
+    assert sorted(key for key in cache._indexes[SCOPE].keys if key) == ['secondquestion', 'thirdquestion']
+
+
+def test_get_caches_only_successful_answers_and_coalesces():
+    async def main():
+        cache, calls = AnswerCache(), []
+
+        async def fetch(ok=True):
+            calls.append(ok)
+            await asyncio.sleep(0.01)
+            return ok, 'answer' if ok else 'error'
+
+        results = await asyncio.gather(*[cache.get(SCOPE, 'question', fetch) for _ in range(3)])
+        assert results == [(True, 'answer')] * 3 and len(calls) == 1
+        assert await cache.get(SCOPE, 'question', fetch) == (True, 'answer') and len(calls) == 1
+        assert await cache.get(SCOPE, 'other', lambda: fetch(False)) == (False, 'error')
+        assert await cache.get(SCOPE, 'other', lambda: fetch(False)) == (False, 'error')
+        return cache.stats(), len(calls)
+
+    stats, calls = asyncio.run(main())
+    assert calls == 3
+    assert (stats['exact_hits'], stats['coalesced'], stats['misses']) == (1, 2, 3)
+
+
+def test_ttl_zero_disables_the_cache():
+    async def fetch():
+        return True, 'answer'
+
+    cache = AnswerCache(ttl=0)
+    assert asyncio.run(cache.get(SCOPE, 'question', fetch)) == (True, 'answer')
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from http_client import HttpClient, Upstream
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+
+    async def text(self) -> str:
+        return str(self.status)
+
+
+class FakeSession:
+    """按顺序返回 outcomes 中的状态码或抛出其中的异常，记录请求次数."""
+
+    closed = False
+
+    def __init__(self, outcomes: list):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        yield FakeResponse(outcome)
+
+    async def close(self):
+        pass
+
+
+def run(method: str, outcomes: list, retries: int = 2):
+    client = HttpClient(backoff=0, upstreams={'test': Upstream(timeout=1.0, retries=retries)})
+    session = FakeSession(outcomes)
+
+    async def request():
+        client._session, client._semaphore = session, asyncio.Semaphore(client.concurrency)
+        return await client.request('test', method, 'http://upstream/')
+
+    try:
+        return asyncio.run(request()), session.calls
+    except Exception as error:
+        return error, session.calls
+
+
+def connector_error() -> aiohttp.ClientConnectorError:
+    return aiohttp.ClientConnectorError(None, OSError(111, 'Connection refused'))
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+@pytest.mark.parametrize('error', [connector_error, aiohttp.ConnectionTimeoutError])
+def test_connect_failures_are_retried_for_every_method(method, error):
+    result, calls = run(method, [error(), 200])
+    assert result.status == 200 and calls == 2
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+@pytest.mark.parametrize('error', [aiohttp.SocketTimeoutError, asyncio.TimeoutError])
+def test_read_timeouts_are_not_retried(method, error):
+    result, calls = run(method, [error(), 200])
+    assert isinstance(result, asyncio.TimeoutError) and calls == 1
+
+
+def test_connect_failures_raise_after_retries():
+    result, calls = run('POST', [aiohttp.ConnectionTimeoutError()], retries=2)
+    assert isinstance(result, aiohttp.ConnectionTimeoutError) and calls == 3
+
+
+@pytest.mark.parametrize('method, calls', [('GET', 2), ('POST', 1)])
+def test_disconnect_is_retried_only_when_idempotent(method, calls):
+    result, made = run(method, [aiohttp.ServerDisconnectedError(), 200])
+    assert made == calls
+    assert (result.status == 200) if method == 'GET' else isinstance(result, aiohttp.ServerDisconnectedError)
+
+
+@pytest.mark.parametrize('method, calls', [('GET', 3), ('POST', 1)])
+def test_server_errors_are_retried_only_when_idempotent(method, calls):
+    result, made = run(method, [503])
+    assert result.status == 503 and made == calls
+
+
+def test_client_errors_are_not_retried():
+    result, calls = run('GET', [404, 200])
+    assert result.status == 404 and calls == 1
+
+
+def with_server(handler, body):
+    """在本地启动一个 aiohttp 服务，调用 body(client, url) 后关闭."""
+    async def main():
+        app = web.Application()
+        app.router.add_route('*', '/', handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+        client = HttpClient(concurrency=4, backoff=0, upstreams={'test': Upstream(timeout=0.2, retries=2)})
+        try:
+            return await body(client, url)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_connections_are_reused():
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info('peername'))
+        return web.Response(text='ok')
+
+    async def body(client, url):
+        return [(await client.request('test', 'GET', url)).text for _ in range(5)]
+
+    assert with_server(handler, body) == ['ok'] * 5
+    assert len(peers) == 1
+
+
+def test_concurrency_is_limited():
+    current, peak = 0, 0
+
+    async def handler(request):
+        nonlocal current, peak
+        current += 1
+        peak = max(peak, current)
+        await asyncio.sleep(0.01)
+        current -= 1
+        return web.Response(text='ok')
+
+    async def body(client, url):
+        return await asyncio.gather(*[client.request('test', 'GET', url) for _ in range(20)])
+
+    assert len(with_server(handler, body)) == 20
+    assert peak == 4
+
+
+def test_slow_response_times_out_without_retry():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(1)
+        return web.Response(text='late')
+
+    async def body(client, url):
+        with pytest.raises(asyncio.TimeoutError):
+            await client.request('test', 'GET', url)
+
+    with_server(handler, body)
+    assert calls == 1
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_load():
+    async def main():
+        flights, calls = SingleFlight(), []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        results = await asyncio.gather(*[flights.run('key', load) for _ in range(5)])
+        return results, calls, flights
+
+    results, calls, flights = asyncio.run(main())
+    assert results == ['value'] * 5 and len(calls) == 1 and flights.coalesced == 4
+    assert not flights._inflight
+
+
+def test_exception_reaches_every_waiter():
+    async def main():
+        flights = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('upstream down')
+
+        return await asyncio.gather(*[flights.run('key', load) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    async def main():
+        flights, calls = SingleFlight(), []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.create_task(flights.run('key', load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.run('key', load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+
+
+def test_cancelled_waiter_does_not_affect_the_leader():
+    async def main():
+        flights = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return 'value'
+
+        leader = asyncio.create_task(flights.run('key', load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.run('key', load))
+        await asyncio.sleep(0.005)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == 'value'
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from snapshot_store import Snapshot, SnapshotStore, merge_records, write_snapshot
+
+ENTRIES = {('WSDL', f"getObject{i}", i % 2 == 0): f"definition {i} " * i for i in range(50)}
+
+
+def test_write_and_read_back(tmp_path):
+    path = str(tmp_path / 'inf.snapshot')
+    size = write_snapshot(path, ENTRIES)
+    assert size == os.path.getsize(path)
+    snapshot = Snapshot(path)
+    try:
+        assert len(snapshot) == len(ENTRIES)
+        assert all(snapshot.get(key) == text for key, text in ENTRIES.items())
+        assert snapshot.get(('WSDL', 'getObject1', False)) == ENTRIES[('WSDL', 'getObject1', False)]
+        assert snapshot.get(('WSDL', 'getObject1', True)) is None
+        assert dict(snapshot.items()) == ENTRIES
+    finally:
+        snapshot.close()
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / 'empty.snapshot')
+    write_snapshot(path, {})
+    snapshot = Snapshot(path)
+    assert len(snapshot) == 0 and snapshot.get(('WSDL', 'x', False)) is None
+    snapshot.close()
+
+
+@pytest.mark.parametrize('content', [b'', b'INFSNAP1', b'NOTASNAP' + bytes(40)])
+def test_invalid_file_is_rejected(tmp_path, content):
+    path = tmp_path / 'bad.snapshot'
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match='not a valid interface snapshot'):
+        Snapshot(str(path))
+
+
+def test_new_file_mode_follows_umask(tmp_path):
+    path = str(tmp_path / 'inf.snapshot')
+    write_snapshot(path, ENTRIES)
+    mask = os.umask(0)
+    os.umask(mask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~mask
+    assert os.listdir(tmp_path) == ['inf.snapshot']
+
+
+def test_merge_records_prefers_new():
+    old = [(b'a', b'1'), (b'c', b'3'), (b'e', b'5')]
+    new = [(b'b', b'x'), (b'c', b'y'), (b'f', b'z')]
+    assert list(merge_records(new, old)) == [(b'a', b'1'), (b'b', b'x'), (b'c', b'y'), (b'e', b'5'), (b'f', b'z')]
+    assert list(merge_records([], old)) == old and list(merge_records(new, [])) == new
+
+
+def test_merge_with_base_copies_old_entries(tmp_path):
+    path = str(tmp_path / 'inf.snapshot')
+    write_snapshot(path, ENTRIES)
+    base = Snapshot(path)
+    update = {('WSDL', 'getObject3', False): 'changed', ('REST', 'new', True): 'new'}
+    write_snapshot(path, update, base=base)
+    base.close()
+    merged = Snapshot(path)
+    assert dict(merged.items()) == {**ENTRIES, **update}
+    merged.close()
+
+
+def test_prefetch(tmp_path):
+    async def fetch(key):
+        await asyncio.sleep(0.001)
+        return key[1] != 'bad', f"def {key[1]}"
+
+    async def main():
+        store = SnapshotStore(str(tmp_path / 'inf.snapshot'))
+        first, second = await asyncio.gather(
+            store.prefetch([('WSDL', 'a', False), ('WSDL', 'bad', False), ('WSDL', 'a', False)], fetch),
+            store.prefetch([('WSDL', 'b', True)], fetch))
+        assert (first['fetched'], len(first['failed']), second['entries']) == (1, 1, 2)
+        assert store.get(('WSDL', 'a', False)) == 'def a' and store.get(('WSDL', 'b', True)) == 'def b'
+        replaced = await store.prefetch([('WSDL', 'c', False)], fetch, merge=False)
+        assert replaced['entries'] == 1 and store.get(('WSDL', 'a', False)) is None
+        return store.stats()
+
+    stats = asyncio.run(main())
+    assert (stats['entries'], stats['hits'], stats['misses']) == (1, 2, 1)
+
+
+def test_prefetch_needs_a_path():
+    with pytest.raises(ValueError, match='--snapshot_file'):
+        asyncio.run(SnapshotStore().prefetch([], None))